@@ -0,0 +1,474 @@
+#Several routes per request: k shortest loopless paths and dissimilar alternatives
+from typing import Callable, Collection, Iterator, List, Optional, Sequence, Tuple, Union
+import heapq
+import itertools
+import math
+from models.network import TrafficNetwork
+from models.compact import CompactNetwork
+from algos.pathfinding import _heuristic_to, _resolve_endpoints
+from algos.workspace import SearchWorkspace
+
+# how far past the best route k_shortest_paths grows its tree before the first spur searches
+_FIRST_REACH = 0.1
+
+def k_shortest_paths(network: Union[TrafficNetwork, CompactNetwork], start_id: str, end_id: str,
+                     k: int = 3, max_stretch: Optional[float] = None) -> List[Tuple[List[str], float]]:
+    """
+    The k cheapest loopless routes between two intersections (Yen's algorithm).
+
+    Every route after the first is found by spur searches: for each node of the previous
+    route, keep the route up to there and search on from it without the roads the
+    routes found so far take next. All spur searches are A* guided by one shortest path
+    tree grown backwards from the end, an exact lower bound on the remaining cost, so
+    they go nearly straight to the end and the tree is the only big search. The tree is
+    only grown as far as the routes being looked at cost: a bit past the best route at
+    first, further (replaying the spur searches) when that doesn't turn up enough routes.
+
+    Routes are sequences of intersections; parallel roads between the same pair don't
+    make different routes.
+
+    Args:
+        network: The traffic network, or its compiled form
+        start_id: ID of the starting intersection
+        end_id: ID of the destination intersection
+        k: how many routes to return at most
+        max_stretch: skip routes costing more than (1 + max_stretch) times the best one.
+            This also caps the backwards tree. Without it the tree still only grows as
+            far as the routes found need, but asking for more routes than exist makes it
+            cover everything reachable from the end.
+
+    Returns:
+        Up to k (path of intersection IDs, total cost) tuples, cheapest first
+
+    Raises:
+        ValueError: If start or end intersections don't exist, if no path exists or if k < 1
+    """
+    if k < 1:
+        raise ValueError("k must be at least 1")
+    compact = network if isinstance(network, CompactNetwork) else network.compile()
+    start, end = _resolve_endpoints(compact, start_id, end_id)
+    if start == end:
+        return [([start_id], 0)]
+
+    tree = _bounded_tree(compact, end, start, None)
+    if not tree.settled[start]:
+        raise ValueError(f"No path exists from {start_id} to {end_id}")
+    best_cost = tree.distances[start]
+    limit = math.inf if max_stretch is None else best_cost * (1 + max_stretch)
+    workspace = SearchWorkspace.for_thread()
+
+    #the tree only has to cover routes up to the cost being looked at (reach): it starts
+    #a little past the best route and grows when no candidate within reach is left
+    reach = min(limit, best_cost * (1 + _FIRST_REACH)) if best_cost > 0 else limit
+    tree.grow(reach)
+
+    first = tuple(tree.path_from(start))
+    # (nodes, prefix costs, index the route branched off its parent at)
+    found = [(first, _prefix_costs(compact, first), 0)]
+    candidates: List[Tuple[float, Tuple[int, ...], int]] = []
+    seen = {first}
+
+    def spur(position: int) -> None:
+        """
+        Yen's spur searches from found[position] within reach, candidates go on the heap.
+        """
+        nodes, prefix, deviation = found[position]
+        #spurs before the deviation point were already tried from the parent route
+        for i in range(deviation, len(nodes) - 1):
+            root = nodes[:i + 1]
+            taken = {route[i + 1] for route, _, _ in found[:position + 1] if route[:i + 1] == root}
+            path = _guided_search(compact, compact.weights, nodes[i], end, tree.bound, workspace,
+                                  blocked=root[:-1], forbidden=taken, budget=reach - prefix[i])
+            if path is None:
+                continue
+            candidate = root[:-1] + tuple(path)
+            if candidate in seen:
+                continue
+            seen.add(candidate)
+            heapq.heappush(candidates, (_prefix_costs(compact, candidate)[-1], candidate, i))
+
+    spur(0)
+    while len(found) < k:
+        #a candidate is only known to be the next route once nothing within reach is cheaper
+        while (not candidates or candidates[0][0] > reach) and reach < limit:
+            #once the tree has everything its bounds are exact, no point in small steps
+            reach = min(limit, best_cost + 2 * (reach - best_cost)) if tree.frontier < math.inf else limit
+            tree.grow(reach)
+            #replay every spur with the bigger budget, routes found before stay in seen
+            for position in range(len(found)):
+                spur(position)
+        if not candidates or candidates[0][0] > limit:
+            break
+        _, candidate, deviation = heapq.heappop(candidates)
+        found.append((candidate, _prefix_costs(compact, candidate), deviation))
+        spur(len(found) - 1)
+
+    return [(_ids(compact, nodes), prefix[-1]) for nodes, prefix, _ in found]
+
+
+def alternative_routes(network: Union[TrafficNetwork, CompactNetwork], start_id: str, end_id: str,
+                       count: int = 3, method: str = "plateau", max_stretch: float = 0.4,
+                       max_overlap: float = 0.6, penalty: float = 0.5) -> List[Tuple[List[str], float]]:
+    """
+    The best route plus up to count - 1 alternatives that are meaningfully different.
+
+    Two methods:
+        "plateau": grow one shortest path tree from the start and one backwards from the
+            end. Stretches of road that are on both trees (plateaus) are pieces a driver
+            would take on the way from start to end anyway; each gives the route start ->
+            plateau -> end. Long plateaus make natural alternatives and come first.
+            Costs two bounded searches in total.
+        "penalty": search again and again, each time making the roads of the route just
+            found more expensive (by the penalty factor) so the next search avoids them.
+            The searches are A* guided by a tree grown backwards from the end, which stays
+            a valid lower bound because penalties only raise costs.
+
+    Either way a route is only accepted if it costs at most (1 + max_stretch) times the
+    best one and at most max_overlap of its cost runs over roads of a route already
+    accepted. Fewer than count routes come back when not enough qualify.
+
+    Args:
+        network: The traffic network, or its compiled form
+        start_id: ID of the starting intersection
+        end_id: ID of the destination intersection
+        count: how many routes to return at most, the best one included
+        method: "plateau" or "penalty"
+        max_stretch: how much more expensive than the best an alternative may be
+        max_overlap: largest share of an alternative's cost allowed on roads of an
+            accepted route
+        penalty: weight increase for roads used by earlier routes, penalty method only
+
+    Returns:
+        List of (path of intersection IDs, total cost), the best route first
+
+    Raises:
+        ValueError: If start or end intersections don't exist, if no path exists or if
+            method or count are invalid
+    """
+    if method not in ("plateau", "penalty"):
+        raise ValueError(f"Unknown method {method}")
+    if count < 1:
+        raise ValueError("count must be at least 1")
+    compact = network if isinstance(network, CompactNetwork) else network.compile()
+    start, end = _resolve_endpoints(compact, start_id, end_id)
+    if start == end:
+        return [([start_id], 0)]
+
+    backward = _bounded_tree(compact, end, start, max_stretch)
+    if not backward.settled[start]:
+        raise ValueError(f"No path exists from {start_id} to {end_id}")
+    limit = backward.distances[start] * (1 + max_stretch)
+
+    #the best route always comes first, the methods only supply alternatives
+    best = tuple(backward.path_from(start))
+    if method == "plateau":
+        forward = _bounded_tree(compact, start, end, max_stretch)
+        candidates = itertools.chain([best], _plateau_routes(forward, backward, limit))
+    else:
+        candidates = itertools.chain([best], _penalty_routes(compact, start, end, best, backward, count, penalty))
+
+    accepted: List[Tuple[Tuple[int, ...], float, dict]] = []
+    for nodes in candidates:
+        edges = _edge_costs(compact, nodes)
+        cost = sum(edges.values())
+        if cost > limit and accepted:
+            continue
+        if any(_overlap(edges, cost, other) > max_overlap for _, _, other in accepted):
+            continue
+        accepted.append((nodes, _prefix_costs(compact, nodes)[-1], edges))
+        if len(accepted) == count:
+            break
+
+    return [(_ids(compact, nodes), cost) for nodes, cost, _ in accepted]
+
+
+class _Tree:
+    """
+    A shortest path tree from a root, grown as A* towards a target node. The search is
+    kept so the tree can be grown further later (see grow). Only distances of settled
+    nodes are final.
+    """
+
+    def __init__(self, compact: CompactNetwork, root: int, target: int):
+        n = compact.node_count
+        self.compact = compact
+        self.root = root
+        self.to_root = _heuristic_to(compact, root)
+        self.to_target = _heuristic_to(compact, target)
+        self.distances = [math.inf] * n
+        self.predecessors = [-1] * n
+        self.settled = bytearray(n)
+        self.order: List[int] = []
+        self.distances[root] = 0
+        self.queue = [(self.to_target(root), 0, root)]
+        # smallest key of a node not settled yet, inf once the search ran out
+        self.frontier = self.queue[0][0]
+
+    def grow(self, limit: float = math.inf, stop_at: int = -1) -> None:
+        """
+        Settle every node whose key (distance + estimate to target) is at most limit,
+        or stop right after settling stop_at.
+        """
+        offsets, targets, weights = self.compact.offsets, self.compact.targets, self.compact.weights
+        edge_open = self.compact.edge_open
+        distances, predecessors, settled = self.distances, self.predecessors, self.settled
+        to_target, queue = self.to_target, self.queue
+
+        while queue:
+            f_score, current_distance, current = queue[0]
+            if settled[current]:
+                heapq.heappop(queue)
+                continue
+            if f_score > limit:
+                break
+            heapq.heappop(queue)
+            settled[current] = 1
+            self.order.append(current)
+
+            for k in range(offsets[current], offsets[current + 1]):
+                if not edge_open[k]:
+                    continue
+                neighbor = targets[k]
+                if settled[neighbor]:
+                    continue
+                tentative = current_distance + weights[k]
+                if tentative < distances[neighbor]:
+                    distances[neighbor] = tentative
+                    predecessors[neighbor] = current
+                    heapq.heappush(queue, (tentative + to_target(neighbor), tentative, neighbor))
+            if current == stop_at:
+                break
+
+        while queue and settled[queue[0][2]]:
+            heapq.heappop(queue)
+        self.frontier = queue[0][0] if queue else math.inf
+
+    def bound(self, node: int) -> float:
+        """
+        Lower bound on a node's distance to the root: exact for settled nodes.
+        Any other node has distance + to_target >= frontier (or it would have been
+        settled), and its straight-line distance is a bound too. Mixed like this the
+        bound is still consistent, so A* towards the root can use it as heuristic as
+        long as the tree doesn't grow during that search.
+        """
+        if self.settled[node]:
+            return self.distances[node]
+        straight = self.to_root(node)
+        rest = self.frontier - self.to_target(node)
+        return rest if rest > straight else straight
+
+    def path_from(self, node: int) -> List[int]:
+        """
+        Tree path from a settled node to the root, node first.
+        """
+        path = [node]
+        predecessors = self.predecessors
+        while node != self.root:
+            node = predecessors[node]
+            path.append(node)
+        return path
+
+
+def _bounded_tree(compact: CompactNetwork, root: int, target: int, max_stretch: Optional[float]) -> _Tree:
+    """
+    A* from root towards target that keeps going after settling target, until every
+    node that can be on a route up to (1 + max_stretch) times the target's distance is
+    settled. With max_stretch None it stops at the target, grow() takes it further.
+    """
+    tree = _Tree(compact, root, target)
+    tree.grow(stop_at=target)
+    if max_stretch is not None and tree.settled[target]:
+        tree.grow(tree.distances[target] * (1 + max_stretch))
+    return tree
+
+
+def _guided_search(compact: CompactNetwork, weights: Sequence[float], source: int, target: int,
+                   bound: Callable[[int], float], workspace: SearchWorkspace, blocked: Collection[int] = (),
+                   forbidden: Collection[int] = (), budget: float = math.inf) -> Optional[List[int]]:
+    """
+    A* from source to target with a consistent heuristic from a tree grown at target.
+
+    Args:
+        weights: edge weights to use, compact.weights or a penalised copy of them
+        bound: lower bound on a node's distance to target
+        blocked: nodes the search may not enter
+        forbidden: nodes the first step out of source may not go to
+        budget: don't look at routes costing more than this
+
+    Returns:
+        Node indices from source to target, or None if there is no such route
+    """
+    offsets, targets, edge_open = compact.offsets, compact.targets, compact.edge_open
+    reached = workspace.begin(compact.node_count)
+    settled = reached + 1
+    stamps, g_scores, predecessors = workspace.stamps[0], workspace.g[0], workspace.predecessors[0]
+    estimates = workspace.estimates
+
+    #blocked nodes look settled, so they are never entered
+    for node in blocked:
+        stamps[node] = settled
+    stamps[source] = reached
+    g_scores[source] = 0
+    predecessors[source] = -1
+    estimates[source] = bound(source)
+    priority_queue = workspace.heaps[0]
+    priority_queue.append((estimates[source], source))
+
+    while priority_queue:
+        _, current = heapq.heappop(priority_queue)
+        if current == target:
+            path = [target]
+            while current != source:
+                current = predecessors[current]
+                path.append(current)
+            path.reverse()
+            return path
+        if stamps[current] == settled:
+            continue
+        stamps[current] = settled
+        current_distance = g_scores[current]
+
+        for k in range(offsets[current], offsets[current + 1]):
+            if not edge_open[k]:
+                continue
+            neighbor = targets[k]
+            stamp = stamps[neighbor]
+            if stamp == settled or (current == source and neighbor in forbidden):
+                continue
+            tentative = current_distance + weights[k]
+            if stamp != reached:
+                stamps[neighbor] = reached
+                estimates[neighbor] = estimate = bound(neighbor)
+            elif tentative < g_scores[neighbor]:
+                estimate = estimates[neighbor]
+            else:
+                continue
+            f_score = tentative + estimate
+            if f_score > budget or f_score == math.inf:
+                #leave it as reached with an infinite distance, a cheaper way in may still come
+                g_scores[neighbor] = math.inf
+                continue
+            g_scores[neighbor] = tentative
+            predecessors[neighbor] = current
+            heapq.heappush(priority_queue, (f_score, neighbor))
+
+    return None
+
+
+def _plateau_routes(forward: _Tree, backward: _Tree, limit: float) -> Iterator[Tuple[int, ...]]:
+    """
+    One via route per plateau (a chain of edges on both trees) within the cost limit,
+    longest plateau first. Via routes that would visit a node twice are dropped.
+    Routes are only built as they are asked for.
+    """
+    df, pf = forward.distances, forward.predecessors
+    dr, pr = backward.distances, backward.predecessors
+
+    plateaus = []
+    for node in forward.order:
+        if not backward.settled[node] or df[node] + dr[node] > limit:
+            continue
+        #only start walking at the first node of a plateau
+        parent = pf[node]
+        if parent != -1 and backward.settled[parent] and pr[parent] == node:
+            continue
+        last = node
+        while last != backward.root:
+            following = pr[last]
+            if not forward.settled[following] or pf[following] != last:
+                break
+            last = following
+        plateaus.append((-(df[last] - df[node]), df[node] + dr[node], node, last))
+
+    plateaus.sort()
+    for _, _, _, last in plateaus:
+        head = forward.path_from(last)
+        head.reverse()
+        nodes = tuple(head) + tuple(backward.path_from(last)[1:])
+        if len(set(nodes)) == len(nodes):
+            yield nodes
+
+
+def _penalty_routes(compact: CompactNetwork, start: int, end: int, best: Tuple[int, ...],
+                    backward: _Tree, count: int, penalty: float) -> List[Tuple[int, ...]]:
+    """
+    Routes from repeated searches with the roads of every route found so far penalised,
+    starting from the best route. Stops after a few searches.
+    """
+    penalised = compact.copy_costs()
+    weights, edge_roads, road_edges = penalised.weights, compact.edge_roads, compact.road_edges
+    workspace = SearchWorkspace.for_thread()
+
+    nodes = best
+    routes = []
+    seen = {best}
+    for _ in range(count * 3):
+        #make every road of the last route more expensive, both directions
+        for k in _path_edges(compact, nodes):
+            road = edge_roads[k]
+            for entry in (road_edges[2 * road], road_edges[2 * road + 1]):
+                weights[entry] *= 1 + penalty
+
+        path = _guided_search(penalised, weights, start, end, backward.bound, workspace)
+        if path is None:
+            break
+        nodes = tuple(path)
+        if nodes not in seen:
+            seen.add(nodes)
+            routes.append(nodes)
+            if len(routes) >= count * 2 - 1:
+                break
+    return routes
+
+
+def _path_edges(compact: CompactNetwork, nodes: Sequence[int]) -> List[int]:
+    """
+    CSR entries of every open road between consecutive nodes (parallel roads included).
+    """
+    offsets, targets, edge_open = compact.offsets, compact.targets, compact.edge_open
+    entries = []
+    for u, v in zip(nodes, nodes[1:]):
+        for k in range(offsets[u], offsets[u + 1]):
+            if targets[k] == v and edge_open[k]:
+                entries.append(k)
+    return entries
+
+
+def _cheapest_edge(compact: CompactNetwork, u: int, v: int) -> float:
+    weights, targets, edge_open = compact.weights, compact.targets, compact.edge_open
+    best = math.inf
+    for k in range(compact.offsets[u], compact.offsets[u + 1]):
+        if targets[k] == v and edge_open[k] and weights[k] < best:
+            best = weights[k]
+    return best
+
+
+def _prefix_costs(compact: CompactNetwork, nodes: Sequence[int]) -> List[float]:
+    """
+    Cost from the first node to each node of a route, summed in route order like a search does.
+    """
+    costs = [0]
+    for u, v in zip(nodes, nodes[1:]):
+        costs.append(costs[-1] + _cheapest_edge(compact, u, v))
+    return costs
+
+
+def _edge_costs(compact: CompactNetwork, nodes: Sequence[int]) -> dict:
+    """
+    (smaller node, larger node) -> cost, for each step of a route.
+    """
+    return {(u, v) if u < v else (v, u): _cheapest_edge(compact, u, v) for u, v in zip(nodes, nodes[1:])}
+
+
+def _overlap(edges: dict, cost: float, other: dict) -> float:
+    """
+    Share of a route's cost that runs over another route's roads.
+    """
+    if cost <= 0:
+        return 1.0
+    return sum(edge_cost for edge, edge_cost in edges.items() if edge in other) / cost
+
+
+def _ids(compact: CompactNetwork, nodes: Sequence[int]) -> List[str]:
+    node_ids = compact.node_ids
+    return [node_ids[node] for node in nodes]
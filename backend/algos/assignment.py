@@ -0,0 +1,212 @@
+#Static traffic assignment (user equilibrium) with MSA or Frank-Wolfe
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Tuple, Union
+import heapq
+import math
+from models.network import TrafficNetwork
+from algos.pathfinding import dijkstra_tree, _resolve_all
+
+class AssignmentResult(NamedTuple):
+    """
+    Outcome of assign_traffic.
+    volumes maps road ID -> assigned volume (also written to road.volume), gaps holds
+    the relative gap measured before each iteration's update.
+    """
+    volumes: Dict[str, float]
+    gaps: List[float]
+    iterations: int
+    converged: bool
+
+def assign_traffic(network: TrafficNetwork,
+                   demand: Union[Dict[Tuple[str, str], float], Iterable[Tuple[str, str, float]]],
+                   method: str = "frank-wolfe", max_iterations: int = 50, tolerance: float = 1e-4,
+                   formula=None) -> AssignmentResult:
+    """
+    Spread an origin/destination demand matrix over the network until no driver can
+    switch to a faster route (Wardrop user equilibrium).
+
+    Every iteration:
+        1. sets road.volume from the current flows and reweights every road in place
+           with recompute_weights (the adjacency is never rebuilt),
+        2. runs one Dijkstra per origin (not one search per pair) and loads all of that
+           origin's demand onto its shortest path tree (all-or-nothing),
+        3. moves the flows towards that loading, by 1 / (iteration + 1) for "msa" or by a
+           line search step for "frank-wolfe".
+    It stops when the relative gap (total travel cost over shortest-path cost, minus 1)
+    falls below tolerance.
+
+    Volumes only change costs with a volume based formula such as BPRWeight: pass one as
+    formula or set network.weight_formula first.
+
+    Args:
+        network: The traffic network, updated in place with the final volumes and weights
+        demand: {(origin_id, destination_id): flow} or (origin_id, destination_id, flow) triples
+        method: "frank-wolfe" or "msa"
+        max_iterations: upper bound on iterations
+        tolerance: relative gap to stop at
+        formula: optional weight formula to switch the network to (see models.weights)
+
+    Returns:
+        An AssignmentResult
+
+    Raises:
+        ValueError: If the method is unknown, an intersection doesn't exist or a
+            destination can't be reached from its origin
+    """
+    if method not in ("frank-wolfe", "msa"):
+        raise ValueError(f"Unknown assignment method {method}")
+    if formula is not None:
+        network.weight_formula = formula
+
+    compact = network.compile()
+    road_count = len(compact.road_ids)
+    roads = [network.roads[road_id] for road_id in compact.road_ids]
+
+    #group demand by origin so each origin needs one tree per iteration
+    items = demand.items() if isinstance(demand, dict) else (((o, d), f) for o, d, f in demand)
+    by_origin: Dict[int, Dict[int, float]] = {}
+    for (origin_id, destination_id), flow in items:
+        origin, destination = _resolve_all(compact, [origin_id, destination_id], "Demand")
+        if flow and origin != destination:
+            row = by_origin.setdefault(origin, {})
+            row[destination] = row.get(destination, 0.0) + flow
+
+    # the cost model the line search evaluates, fixed for the whole run
+    distances, delays = _road_lengths_and_delays(network, compact)
+
+    volumes = array('d', bytes(8 * road_count))
+    _set_volumes(network, roads, volumes)
+    target, _ = _all_or_nothing(compact, by_origin)
+    volumes = target
+
+    gaps = []
+    converged = False
+    iteration = 0
+    for iteration in range(1, max_iterations + 1):
+        _set_volumes(network, roads, volumes)
+        target, shortest_cost = _all_or_nothing(compact, by_origin)
+
+        weights = compact.weights
+        road_edges = compact.road_edges
+        total_cost = sum(volumes[r] * weights[road_edges[2 * r]] for r in range(road_count))
+        gap = total_cost / shortest_cost - 1 if shortest_cost > 0 else 0.0
+        gaps.append(gap)
+        if gap <= tolerance:
+            converged = True
+            break
+
+        if method == "msa":
+            step = 1 / (iteration + 1)
+        else:
+            step = _line_search(network.weight_formula, roads, distances, delays, volumes, target)
+        volumes = array('d', (x + step * (y - x) for x, y in zip(volumes, target)))
+
+    if not converged:
+        _set_volumes(network, roads, volumes)
+
+    return AssignmentResult({road.id: volumes[r] for r, road in enumerate(roads)}, gaps, iteration, converged)
+
+
+def _set_volumes(network: TrafficNetwork, roads: List, volumes: array) -> None:
+    """
+    Write volumes onto the roads and reweight the whole network in one in-place pass.
+    """
+    for road, volume in zip(roads, volumes):
+        road.volume = volume
+    network.recompute_weights()
+
+
+def _all_or_nothing(compact, by_origin: Dict[int, Dict[int, float]]) -> Tuple[array, float]:
+    """
+    Load every origin's demand onto its current shortest path tree.
+
+    Returns:
+        Tuple of (volume per road index, total demand-weighted shortest path cost)
+    """
+    offsets, targets, weights = compact.offsets, compact.targets, compact.weights
+    edge_open, edge_roads = compact.edge_open, compact.edge_roads
+    loads = array('d', bytes(8 * len(compact.road_ids)))
+    shortest_cost = 0.0
+
+    for origin, row in by_origin.items():
+        distances, predecessors = dijkstra_tree(compact, origin, stop_at=row.keys())
+
+        #push flow from the farthest nodes up the tree, so each tree edge is loaded once
+        pending: Dict[int, float] = {}
+        heap = []
+        for destination, flow in row.items():
+            if distances[destination] == math.inf:
+                raise ValueError(f"No path exists from {compact.node_ids[origin]} to {compact.node_ids[destination]}")
+            shortest_cost += flow * distances[destination]
+            if destination not in pending:
+                heapq.heappush(heap, (-distances[destination], destination))
+                pending[destination] = 0.0
+            pending[destination] += flow
+
+        while heap:
+            _, node = heapq.heappop(heap)
+            if node == origin:
+                continue
+            flow = pending.pop(node)
+            parent = predecessors[node]
+
+            #the tree used the cheapest open road from parent to node
+            best = -1
+            for k in range(offsets[parent], offsets[parent + 1]):
+                if targets[k] == node and edge_open[k] and (best == -1 or weights[k] < weights[best]):
+                    best = k
+            loads[edge_roads[best]] += flow
+
+            if parent not in pending:
+                heapq.heappush(heap, (-distances[parent], parent))
+                pending[parent] = 0.0
+            pending[parent] += flow
+
+    return loads, shortest_cost
+
+
+def _road_lengths_and_delays(network: TrafficNetwork, compact) -> Tuple[List[float], List[float]]:
+    """
+    Length of every road and the intersection delay charged on it, by road index.
+    """
+    xs, ys, targets, road_edges = compact.xs, compact.ys, compact.targets, compact.road_edges
+    node_delays = [network.intersections[node_id].delay for node_id in compact.node_ids]
+    lengths, delays = [], []
+    for r in range(len(compact.road_ids)):
+        #the two entries point at the two endpoints in no particular order, both sums are symmetric
+        target, source = targets[road_edges[2 * r]], targets[road_edges[2 * r + 1]]
+        lengths.append(math.hypot(xs[target] - xs[source], ys[target] - ys[source]))
+        delays.append((node_delays[source] + node_delays[target]) / 2)
+    return lengths, delays
+
+
+def _line_search(formula, roads: List, distances: List[float], delays: List[float],
+                 volumes: array, target: array, steps: int = 24) -> float:
+    """
+    Frank-Wolfe step size: bisect for the point along volumes -> target where the
+    direction stops lowering the Beckmann objective, i.e. sum((y - x) * cost(x + step * (y - x))) = 0.
+    Road volumes are restored before returning.
+    """
+    saved = [road.volume for road in roads]
+    direction = [y - x for x, y in zip(volumes, target)]
+
+    def slope(step):
+        for road, x, d in zip(roads, volumes, direction):
+            road.volume = x + step * d
+        costs = formula.batch(distances, roads)
+        return sum(d * (c + delay) for d, c, delay in zip(direction, costs, delays))
+
+    low, high = 0.0, 1.0
+    if slope(high) <= 0:
+        low = high
+    else:
+        for _ in range(steps):
+            middle = (low + high) / 2
+            if slope(middle) > 0:
+                high = middle
+            else:
+                low = middle
+
+    for road, volume in zip(roads, saved):
+        road.volume = volume
+    return low
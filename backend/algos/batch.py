@@ -0,0 +1,120 @@
+#Batch routing of many (start, end) pairs across a pool of worker processes
+from collections import deque
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+import multiprocessing
+import os
+from models.network import TrafficNetwork
+from models.compact import CompactNetwork
+from algos.pathfinding import a_star_shortest_path
+
+class RouteResult(NamedTuple):
+    """
+    Outcome of one pair in route_many.
+    On success error is None, otherwise path is None, cost is inf and error holds
+    the ValueError message a_star_shortest_path raised.
+    """
+    start_id: str
+    end_id: str
+    path: Optional[List[str]]
+    cost: float
+    error: Optional[str]
+
+# the network (and search options) a worker process routes on, set by _init_worker
+_worker_state = None
+
+def route_many(network: Union[TrafficNetwork, CompactNetwork], pairs: Iterable[Tuple[str, str]],
+               workers: Optional[int] = None, chunksize: int = 256,
+               **search_options) -> Iterator[RouteResult]:
+    """
+    Route a large batch of pairs in parallel, streaming results back in input order.
+
+    The network is compiled once and handed to each worker process once: on platforms
+    with fork the workers inherit the compact snapshot directly, elsewhere it is sent
+    to each worker when it starts. Pairs then travel in chunks, and only a few chunks
+    per worker are in flight at a time, so pairs can be a lazy iterator of any length.
+
+    A pair that fails (unknown intersection, no path) produces a RouteResult with its
+    error instead of aborting the whole batch.
+
+    Args:
+        network: The traffic network, or its compiled form
+        pairs: (start_id, end_id) pairs
+        workers: number of processes, defaults to os.cpu_count(); 1 routes in this process
+        chunksize: pairs per task sent to a worker
+        search_options: extra keyword arguments for a_star_shortest_path
+
+    Returns:
+        An iterator of RouteResult, one per pair, in the same order as pairs
+    """
+    compact = network if isinstance(network, CompactNetwork) else network.compile()
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1:
+        for start_id, end_id in pairs:
+            yield _route_one(compact, search_options, start_id, end_id)
+        return
+
+    #the state goes to each worker through the initializer rather than a global set here,
+    #so concurrent route_many calls (e.g. from several service threads) can't swap networks
+    state = (compact, search_options)
+    if "fork" in multiprocessing.get_all_start_methods():
+        #forked children get initargs as a copy-on-write view of the snapshot, nothing is pickled
+        context = multiprocessing.get_context("fork")
+    else:
+        context = multiprocessing.get_context()
+    pool = context.Pool(workers, initializer=_init_worker, initargs=(state,))
+
+    max_pending = workers * 4
+    try:
+        pending = deque()
+        for chunk in _chunks(pairs, chunksize):
+            pending.append(pool.apply_async(_route_chunk, (chunk,)))
+            if len(pending) >= max_pending:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _init_worker(state) -> None:
+    """
+    Pool initializer, stores the network and search options in the worker process.
+    """
+    global _worker_state
+    _worker_state = state
+
+
+def _route_chunk(chunk: List[Tuple[str, str]]) -> List[RouteResult]:
+    """
+    Route one chunk of pairs inside a worker.
+    """
+    compact, search_options = _worker_state
+    return [_route_one(compact, search_options, start_id, end_id) for start_id, end_id in chunk]
+
+
+def _route_one(compact: CompactNetwork, search_options: dict, start_id: str, end_id: str) -> RouteResult:
+    """
+    Route one pair, turning a ValueError into an error result.
+    """
+    try:
+        path, cost = a_star_shortest_path(compact, start_id, end_id, **search_options)
+    except ValueError as error:
+        return RouteResult(start_id, end_id, None, float("inf"), str(error))
+    return RouteResult(start_id, end_id, path, cost, None)
+
+
+def _chunks(pairs: Iterable[Tuple[str, str]], size: int) -> Iterator[List[Tuple[str, str]]]:
+    """
+    Split an iterable of pairs into lists of at most size pairs, lazily.
+    """
+    chunk = []
+    for pair in pairs:
+        chunk.append(tuple(pair))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,123 @@
+#LRU cache of route results in front of a_star_shortest_path
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import time
+from models.network import TrafficNetwork
+from models.compact import CompactNetwork
+from algos.pathfinding import a_star_shortest_path
+
+class RouteCache:
+    """
+    Least-recently-used cache of (path, cost) results for one network.
+
+    Entries are keyed on (start_id, end_id) and belong to one network.version. Every
+    mutation of the network (add_road, close_road, update_congestion, ...) bumps its
+    version, so a route computed before a change is never served after it: when the
+    cache notices a new version it drops all older entries at once.
+
+    Failed searches (ValueError) are not cached.
+    """
+
+    def __init__(self, network: Union[TrafficNetwork, CompactNetwork], maxsize: int = 1024,
+                 ttl: Optional[float] = None, clock: Callable[[], float] = time.monotonic,
+                 **search_options):
+        """
+        Args:
+            network: the network to route on
+            maxsize: max number of routes kept, least recently used ones are evicted first
+            ttl: optional max age of an entry in seconds
+            clock: time source for ttl, mostly useful for tests
+            search_options: extra keyword arguments for a_star_shortest_path
+                (e.g. algorithm="bidirectional", landmarks=...)
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.network = network
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.search_options = search_options
+
+        # (start_id, end_id) -> (path, cost, stored_at), oldest first
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[List[str], float, float]]" = OrderedDict()
+        self._version = network.version
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def route(self, start_id: str, end_id: str) -> Tuple[List[str], float]:
+        """
+        Shortest path between two intersections, served from the cache when possible.
+        Same contract as a_star_shortest_path.
+
+        Args:
+            start_id: ID of the starting intersection
+            end_id: ID of the destination intersection
+
+        Returns:
+            Tuple of (path of intersection IDs, total path cost)
+
+        Raises:
+            ValueError: If start or end intersections don't exist or if no path exists
+        """
+        self._check_version()
+        key = (start_id, end_id)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            path, cost, stored_at = entry
+            if self.ttl is not None and self.clock() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                # hand out a copy so callers can't corrupt the cached path
+                return list(path), cost
+
+        self.misses += 1
+        path, cost = a_star_shortest_path(self.network, start_id, end_id, **self.search_options)
+
+        self._entries[key] = (list(path), cost, self.clock())
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return path, cost
+
+    def clear(self) -> None:
+        """
+        Drop every cached route (counters are kept).
+        """
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Counters for dashboards.
+
+        Returns:
+            Dictionary with hits, misses, evictions, expirations, invalidations and size
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "size": len(self._entries)
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self) -> None:
+        """
+        Drop everything if the network changed since the entries were stored.
+        """
+        version = self.network.version
+        if version != self._version:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._version = version
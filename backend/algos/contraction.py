@@ -0,0 +1,381 @@
+#Contraction Hierarchies: preprocess once, then answer point-to-point queries very fast
+from array import array
+from typing import Dict, List, Tuple, Union
+import heapq
+import json
+import math
+import struct
+from models.network import TrafficNetwork
+from models.compact import CompactNetwork
+
+# file header: magic, format version, node count, upward edge count, network version, id blob size
+_MAGIC = b"TSCH"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sIqqqq")
+
+class ContractionHierarchy:
+    """
+    A Contraction Hierarchy over the open roads of a network.
+
+    Preprocessing contracts intersections one at a time in order of importance. When a
+    node is removed, a shortcut is added between two of its neighbors whenever the path
+    through it is the only shortest one (checked with a small "witness" search). The result
+    is stored as an upward graph: every edge points from the lower ranked node to the higher.
+
+    A query is a bidirectional Dijkstra where both sides only go upward, which touches a
+    tiny part of the graph. Shortcuts remember the node they bypass so the answer can be
+    unpacked back into the real sequence of intersections.
+
+    The hierarchy is a snapshot of the weights at build time: rebuild it (or use
+    a_star_shortest_path) once congestion or closures change. is_stale() tells you when.
+    """
+
+    def __init__(self, node_ids: List[str], rank: array, up_offsets: array, up_targets: array,
+                 up_weights: array, up_middles: array, version: int = 0):
+        """
+        Initialize a hierarchy from prebuilt arrays.
+        Normally you want ContractionHierarchy.build or ContractionHierarchy.load instead.
+
+        Args:
+            node_ids: intersection ID for each node index
+            rank: contraction order of each node (higher = more important)
+            up_offsets: CSR row offsets of the upward graph, length n + 1
+            up_targets: higher ranked endpoint of each upward edge
+            up_weights: weight of each upward edge
+            up_middles: node bypassed by each shortcut, -1 for a real road
+            version: network version the hierarchy was built from
+        """
+        self.node_ids = node_ids
+        self.rank = rank
+        self.up_offsets = up_offsets
+        self.up_targets = up_targets
+        self.up_weights = up_weights
+        self.up_middles = up_middles
+        self.version = version
+        self.node_index: Dict[str, int] = {node_id: i for i, node_id in enumerate(node_ids)}
+
+    @classmethod
+    def build(cls, network: Union[TrafficNetwork, CompactNetwork], witness_limit: int = 64) -> 'ContractionHierarchy':
+        """
+        Run the contraction preprocessing.
+
+        Args:
+            network: the network to preprocess, a TrafficNetwork is compiled first
+            witness_limit: max nodes a witness search may settle. Lower is faster to build
+                but adds more (harmless) shortcuts.
+
+        Returns:
+            A new ContractionHierarchy
+        """
+        compact = network if isinstance(network, CompactNetwork) else network.compile()
+        n = compact.node_count
+
+        #working graph among the nodes not contracted yet: neighbor -> [weight, middle]
+        graph: List[Dict[int, List[float]]] = [dict() for _ in range(n)]
+        for u in range(n):
+            for k in range(compact.offsets[u], compact.offsets[u + 1]):
+                if not compact.edge_open[k]:
+                    continue
+                v = compact.targets[k]
+                if v == u:
+                    continue
+                w = compact.weights[k]
+                # parallel roads: only the cheapest one matters for routing
+                if v not in graph[u] or w < graph[u][v][0]:
+                    graph[u][v] = [w, -1]
+
+        contracted = bytearray(n)
+        contracted_neighbors = [0] * n
+        rank = array('i', bytes(4 * n))
+        upward: List[List[Tuple[int, float, int]]] = [[] for _ in range(n)]
+
+        def priority(v):
+            shortcuts = _needed_shortcuts(graph, v, witness_limit)
+            return len(shortcuts) - len(graph[v]) + contracted_neighbors[v]
+
+        queue = [(priority(v), v) for v in range(n)]
+        heapq.heapify(queue)
+
+        next_rank = 0
+        while queue:
+            _, v = heapq.heappop(queue)
+            if contracted[v]:
+                continue
+
+            #lazy update: the priority may be out of date, re-queue if it got worse
+            current = priority(v)
+            if queue and current > queue[0][0]:
+                heapq.heappush(queue, (current, v))
+                continue
+
+            for u, w, weight in _needed_shortcuts(graph, v, witness_limit):
+                existing = graph[u].get(w)
+                if existing is None or weight < existing[0]:
+                    graph[u][w] = [weight, v]
+                    graph[w][u] = [weight, v]
+
+            #every remaining neighbor outranks v, so these become v's upward edges
+            for u, (weight, middle) in graph[v].items():
+                upward[v].append((u, weight, middle))
+                del graph[u][v]
+                contracted_neighbors[u] += 1
+            graph[v] = {}
+
+            contracted[v] = 1
+            rank[v] = next_rank
+            next_rank += 1
+
+        up_offsets = array('q', [0])
+        up_targets = array('i')
+        up_weights = array('d')
+        up_middles = array('i')
+        for v in range(n):
+            for u, weight, middle in upward[v]:
+                up_targets.append(u)
+                up_weights.append(weight)
+                up_middles.append(middle)
+            up_offsets.append(len(up_targets))
+
+        return cls(list(compact.node_ids), rank, up_offsets, up_targets, up_weights, up_middles,
+                   compact.version)
+
+    def is_stale(self, network: Union[TrafficNetwork, CompactNetwork]) -> bool:
+        """
+        Check whether the network changed since the hierarchy was built.
+
+        Args:
+            network: the network the hierarchy was built from
+
+        Returns:
+            True if the hierarchy should be rebuilt
+        """
+        return network.version != self.version
+
+    def query(self, start_id: str, end_id: str) -> Tuple[List[str], float]:
+        """
+        Shortest path between two intersections, same contract as a_star_shortest_path.
+
+        Args:
+            start_id: ID of the starting intersection
+            end_id: ID of the destination intersection
+
+        Returns:
+            Tuple of (path of intersection IDs, total path cost)
+
+        Raises:
+            ValueError: If start or end intersections don't exist or if no path exists
+        """
+        start = self.node_index.get(start_id)
+        end = self.node_index.get(end_id)
+        if start is None:
+            raise ValueError(f"Start intersection {start_id} does not exist")
+        if end is None:
+            raise ValueError(f"End intersection {end_id} does not exist")
+        if start == end:
+            return [start_id], 0
+
+        offsets, targets, weights = self.up_offsets, self.up_targets, self.up_weights
+
+        #index 0 searches up from the start, index 1 up from the end
+        distances = ({start: 0}, {end: 0})
+        predecessors = ({}, {})
+        settled = (set(), set())
+        queues = ([(0, start)], [(0, end)])
+        best_cost = math.inf
+        meeting = -1
+
+        while True:
+            #a side is done once its smallest key can't beat the best meeting
+            forward_top = queues[0][0][0] if queues[0] else math.inf
+            reverse_top = queues[1][0][0] if queues[1] else math.inf
+            if forward_top >= best_cost and reverse_top >= best_cost:
+                break
+            side = 0 if forward_top <= reverse_top else 1
+
+            current_distance, current = heapq.heappop(queues[side])
+            if current in settled[side]:
+                continue
+            settled[side].add(current)
+
+            other = distances[1 - side].get(current)
+            if other is not None and current_distance + other < best_cost:
+                best_cost = current_distance + other
+                meeting = current
+
+            own = distances[side]
+            first, last = offsets[current], offsets[current + 1]
+
+            #stall on demand: if a higher node already reaches us more cheaply, this
+            #node can't be on a shortest up-path, so don't expand it
+            stalled = False
+            for k in range(first, last):
+                if own.get(targets[k], math.inf) + weights[k] < current_distance:
+                    stalled = True
+                    break
+            if stalled:
+                continue
+
+            for k in range(first, last):
+                neighbor = targets[k]
+                tentative = current_distance + weights[k]
+                if tentative < own.get(neighbor, math.inf):
+                    own[neighbor] = tentative
+                    predecessors[side][neighbor] = current
+                    heapq.heappush(queues[side], (tentative, neighbor))
+
+        if meeting == -1:
+            raise ValueError(f"No path exists from {start_id} to {end_id}")
+
+        #chain of hierarchy nodes start -> meeting -> end
+        up_chain = [meeting]
+        while up_chain[-1] != start:
+            up_chain.append(predecessors[0][up_chain[-1]])
+        up_chain.reverse()
+        current = meeting
+        while current != end:
+            current = predecessors[1][current]
+            up_chain.append(current)
+
+        #expand each shortcut into the roads it stands for
+        path = [start]
+        for a, b in zip(up_chain, up_chain[1:]):
+            path.extend(self._unpack(a, b))
+
+        return [self.node_ids[i] for i in path], best_cost
+
+    def _unpack(self, a: int, b: int) -> List[int]:
+        """
+        Expand the hierarchy edge a-b into original nodes.
+
+        Returns:
+            The nodes after a, up to and including b
+        """
+        result = []
+        stack = [(a, b)]
+        while stack:
+            u, v = stack.pop()
+            middle = self._middle(u, v)
+            if middle == -1:
+                result.append(v)
+            else:
+                # push the second half first so the first half is expanded first
+                stack.append((middle, v))
+                stack.append((u, middle))
+        return result
+
+    def _middle(self, u: int, v: int) -> int:
+        """
+        The node bypassed by the hierarchy edge between u and v, -1 for a real road.
+        The edge is stored on whichever endpoint was contracted first.
+        """
+        low, high = (u, v) if self.rank[u] < self.rank[v] else (v, u)
+        for k in range(self.up_offsets[low], self.up_offsets[low + 1]):
+            if self.up_targets[k] == high:
+                return self.up_middles[k]
+        raise ValueError(f"Hierarchy has no edge between {self.node_ids[u]} and {self.node_ids[v]}")
+
+    def save(self, path: str) -> None:
+        """
+        Write the hierarchy to a binary file so workers can skip preprocessing.
+
+        Args:
+            path: file to write
+        """
+        ids_blob = json.dumps(self.node_ids).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(self.node_ids), len(self.up_targets),
+                                 self.version, len(ids_blob)))
+            f.write(ids_blob)
+            for values in (self.rank, self.up_offsets, self.up_targets, self.up_weights, self.up_middles):
+                values.tofile(f)
+
+    @classmethod
+    def load(cls, path: str) -> 'ContractionHierarchy':
+        """
+        Read a hierarchy written by save().
+
+        Args:
+            path: file to read
+
+        Returns:
+            The loaded ContractionHierarchy
+
+        Raises:
+            ValueError: If the file is not a hierarchy or uses an unknown format version
+        """
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) != _HEADER.size:
+                raise ValueError(f"{path} is not a contraction hierarchy file")
+            magic, format_version, n, m, version, ids_size = _HEADER.unpack(header)
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a contraction hierarchy file")
+            if format_version != _FORMAT_VERSION:
+                raise ValueError(f"Unsupported contraction hierarchy format {format_version}")
+
+            node_ids = json.loads(f.read(ids_size).decode("utf-8"))
+            arrays = []
+            for typecode, length in (('i', n), ('q', n + 1), ('i', m), ('d', m), ('i', m)):
+                values = array(typecode)
+                values.fromfile(f, length)
+                arrays.append(values)
+
+        return cls(node_ids, *arrays, version=version)
+
+
+def _needed_shortcuts(graph: List[Dict[int, List[float]]], v: int, witness_limit: int) -> List[Tuple[int, int, float]]:
+    """
+    Work out which shortcuts contracting v would need.
+
+    For each pair of neighbors u, w the path u-v-w must be kept as a shortcut unless a
+    witness search from u (avoiding v) finds something at least as short.
+
+    Args:
+        graph: the working graph of uncontracted nodes
+        v: the node to contract
+        witness_limit: max nodes a witness search may settle
+
+    Returns:
+        List of (u, w, weight) shortcuts, each unordered pair once
+    """
+    neighbors = list(graph[v].items())
+    shortcuts = []
+    for i, (u, (weight_u, _)) in enumerate(neighbors):
+        later = neighbors[i + 1:]
+        if not later:
+            break
+        limit = weight_u + max(weight_w for _, (weight_w, _) in later)
+        witness = _witness_search(graph, u, v, limit, witness_limit)
+        for w, (weight_w, _) in later:
+            through_v = weight_u + weight_w
+            if witness.get(w, math.inf) > through_v:
+                shortcuts.append((u, w, through_v))
+    return shortcuts
+
+
+def _witness_search(graph: List[Dict[int, List[float]]], source: int, excluded: int,
+                    limit: float, settle_limit: int) -> Dict[int, float]:
+    """
+    Bounded Dijkstra from source that never passes through excluded.
+
+    Returns:
+        Distances found, a missing entry means "no witness found"
+    """
+    distances = {source: 0}
+    settled = 0
+    queue = [(0, source)]
+    while queue and settled < settle_limit:
+        current_distance, current = heapq.heappop(queue)
+        if current_distance > distances.get(current, math.inf):
+            continue
+        if current_distance > limit:
+            break
+        settled += 1
+        for neighbor, (weight, _) in graph[current].items():
+            if neighbor == excluded:
+                continue
+            tentative = current_distance + weight
+            if tentative < distances.get(neighbor, math.inf):
+                distances[neighbor] = tentative
+                heapq.heappush(queue, (tentative, neighbor))
+    return distances
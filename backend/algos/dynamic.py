@@ -0,0 +1,324 @@
+#Shortest path trees that are repaired in place when roads close, reopen or change weight
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import math
+from models.network import TrafficNetwork
+from algos.pathfinding import dijkstra_tree, _resolve_endpoints, _unwind_path
+
+class DynamicRoutes:
+    """
+    Keeps registered routes up to date as the network changes, without searching
+    from scratch.
+
+    One full shortest path tree is kept per registered origin (routes from the same
+    origin share it). When roads change only the part of each tree that can be affected
+    is recomputed:
+        - a road that got more expensive (or closed) only matters if it is a tree edge,
+          then the subtree below it is cut off and re-attached from its untouched
+          neighbours,
+        - a road that got cheaper (or reopened) is relaxed from both ends and the
+          improvement is pushed outwards.
+    Every change method returns the IDs of the registered routes whose path changed,
+    so reroutes only go to the clients that need them. A route whose path stays the same
+    but gets slower is not reported.
+
+    Make changes through close_roads / reopen_roads / update_congestion here, or make
+    them on the network and call refresh() afterwards.
+    """
+
+    def __init__(self, network: TrafficNetwork):
+        """
+        Args:
+            network: The traffic network to follow
+        """
+        self.network = network
+        self._compact = None
+
+        # origin node -> [distances, predecessors]
+        self._trees: Dict[int, List[list]] = {}
+
+        # route ID -> (origin node, destination node), and its current path as node indices
+        self._routes: Dict[str, Tuple[int, int]] = {}
+        self._paths: Dict[str, Optional[Tuple[int, ...]]] = {}
+
+        self._sync_structure()
+
+    def register(self, route_id: str, origin_id: str, destination_id: str) -> Tuple[List[str], float]:
+        """
+        Start following a route. Registering an existing route ID replaces it.
+
+        Args:
+            route_id: any ID the caller uses for this route (e.g. a client ID)
+            origin_id: ID of the starting intersection
+            destination_id: ID of the destination intersection
+
+        Returns:
+            Tuple of (path of intersection IDs, total path cost)
+
+        Raises:
+            ValueError: If an intersection doesn't exist or no path exists right now
+                (the route stays registered and is reported once a path appears)
+        """
+        self._check_structure()
+        origin, destination = _resolve_endpoints(self._compact, origin_id, destination_id)
+        if route_id in self._routes:
+            self.unregister(route_id)
+        if origin not in self._trees:
+            self._trees[origin] = list(dijkstra_tree(self._compact, origin))
+
+        self._routes[route_id] = (origin, destination)
+        self._paths[route_id] = self._path(origin, destination)
+        return self.route(route_id)
+
+    def unregister(self, route_id: str) -> None:
+        """
+        Stop following a route, dropping its origin's tree if nothing else uses it.
+        """
+        origin, _ = self._routes.pop(route_id)
+        del self._paths[route_id]
+        if all(other != origin for other, _ in self._routes.values()):
+            del self._trees[origin]
+
+    def route(self, route_id: str) -> Tuple[List[str], float]:
+        """
+        Current path and cost of a registered route.
+
+        Returns:
+            Tuple of (path of intersection IDs, total path cost)
+
+        Raises:
+            ValueError: If the route isn't registered or currently has no path
+        """
+        if route_id not in self._routes:
+            raise ValueError(f"Route {route_id} is not registered")
+        origin, destination = self._routes[route_id]
+        distances, predecessors = self._trees[origin]
+        compact = self._compact
+        if distances[destination] == math.inf:
+            raise ValueError(f"No path exists from {compact.node_ids[origin]} to {compact.node_ids[destination]}")
+        return _unwind_path(compact, predecessors, origin, destination), distances[destination]
+
+    def close_roads(self, road_ids: Iterable[str]) -> Set[str]:
+        """
+        Close roads on the network and repair the trees.
+
+        Returns:
+            IDs of the registered routes whose path changed
+        """
+        road_ids = list(road_ids)
+        self.network.close_roads(road_ids)
+        return self._changed(road_ids)
+
+    def reopen_roads(self, road_ids: Iterable[str]) -> Set[str]:
+        """
+        Reopen roads on the network and repair the trees.
+
+        Returns:
+            IDs of the registered routes whose path changed
+        """
+        road_ids = list(road_ids)
+        self.network.reopen_roads(road_ids)
+        return self._changed(road_ids)
+
+    def update_congestion(self, updates: Dict[str, float]) -> Set[str]:
+        """
+        Change road congestion on the network and repair the trees.
+
+        Returns:
+            IDs of the registered routes whose path changed
+        """
+        self.network.update_congestion(updates)
+        return self._changed(updates.keys())
+
+    def refresh(self) -> Set[str]:
+        """
+        Pick up changes made directly on the network since the last update.
+        Closures and weight changes are found by comparing against the weights the trees
+        were built on (one pass over the arrays) and repaired like the other methods.
+        New roads or intersections need every tree rebuilt.
+
+        Returns:
+            IDs of the registered routes whose path changed
+        """
+        if self.network.compile() is not self._compact:
+            return self._rebuild()
+
+        compact = self._compact
+        weights, edge_open, road_edges = compact.weights, compact.edge_open, compact.road_edges
+        changed = [r for r in range(len(compact.road_ids))
+                   if self._open[road_edges[2 * r]] != edge_open[road_edges[2 * r]]
+                   or self._weights[road_edges[2 * r]] != weights[road_edges[2 * r]]]
+        return self._repair(changed)
+
+    def _changed(self, road_ids: Iterable[str]) -> Set[str]:
+        """
+        Repair after the given roads were changed on the network.
+        """
+        if self.network.compile() is not self._compact:
+            return self._rebuild()
+        road_index = self._compact.road_index
+        return self._repair([road_index[road_id] for road_id in road_ids if road_id in road_index])
+
+    def _repair(self, road_indices: List[int]) -> Set[str]:
+        """
+        Update every tree for changed roads and report the routes whose path changed.
+        """
+        compact = self._compact
+        weights, edge_open, road_edges, targets = compact.weights, compact.edge_open, compact.road_edges, compact.targets
+
+        # (one end, other end, old cost, new cost), inf for closed
+        changes = []
+        for r in road_indices:
+            forward, backward = road_edges[2 * r], road_edges[2 * r + 1]
+            old = self._weights[forward] if self._open[forward] else math.inf
+            new = weights[forward] if edge_open[forward] else math.inf
+            self._weights[forward] = self._weights[backward] = weights[forward]
+            self._open[forward] = self._open[backward] = edge_open[forward]
+            if old != new:
+                changes.append((targets[backward], targets[forward], old, new))
+        if not changes:
+            return set()
+
+        touched = {origin: self._repair_tree(tree, changes) for origin, tree in self._trees.items()}
+
+        changed_routes = set()
+        for route_id, (origin, destination) in self._routes.items():
+            nodes = touched[origin]
+            if not nodes:
+                continue
+            old_path = self._paths[route_id]
+            if old_path is not None and destination not in nodes and not any(node in nodes for node in old_path):
+                continue
+            new_path = self._path(origin, destination)
+            if new_path != old_path:
+                self._paths[route_id] = new_path
+                changed_routes.add(route_id)
+        return changed_routes
+
+    def _repair_tree(self, tree: List[list], changes: List[Tuple[int, int, float, float]]) -> Set[int]:
+        """
+        Fix one tree in place after road cost changes.
+
+        Returns:
+            Nodes whose distance or predecessor may have changed
+        """
+        compact = self._compact
+        offsets, targets, weights, edge_open = compact.offsets, compact.targets, compact.weights, compact.edge_open
+        distances, predecessors = tree
+
+        #cut off the subtrees hanging from tree edges that got worse
+        stack = []
+        for a, b, old, new in changes:
+            if new > old:
+                if predecessors[b] == a:
+                    stack.append(b)
+                if predecessors[a] == b:
+                    stack.append(a)
+        affected = set()
+        while stack:
+            node = stack.pop()
+            if node in affected:
+                continue
+            affected.add(node)
+            for k in range(offsets[node], offsets[node + 1]):
+                child = targets[k]
+                if predecessors[child] == node and child not in affected:
+                    stack.append(child)
+
+        for node in affected:
+            distances[node] = math.inf
+            predecessors[node] = -1
+
+        #re-attach each cut node to its best untouched neighbour
+        priority_queue = []
+        for node in affected:
+            for k in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[k]
+                if edge_open[k] and neighbor not in affected and distances[neighbor] + weights[k] < distances[node]:
+                    distances[node] = distances[neighbor] + weights[k]
+                    predecessors[node] = neighbor
+            if distances[node] < math.inf:
+                priority_queue.append((distances[node], node))
+
+        #roads that got cheaper may offer a shortcut in either direction
+        touched = set(affected)
+        for a, b, old, new in changes:
+            if new < old:
+                for u, v in ((a, b), (b, a)):
+                    if distances[u] + new < distances[v]:
+                        distances[v] = distances[u] + new
+                        predecessors[v] = u
+                        touched.add(v)
+                        priority_queue.append((distances[v], v))
+
+        # then the usual Dijkstra relaxation, starting from those nodes
+        heapq.heapify(priority_queue)
+        while priority_queue:
+            current_distance, current = heapq.heappop(priority_queue)
+            if current_distance > distances[current]:
+                continue
+            for k in range(offsets[current], offsets[current + 1]):
+                if not edge_open[k]:
+                    continue
+                neighbor = targets[k]
+                tentative = current_distance + weights[k]
+                if tentative < distances[neighbor]:
+                    distances[neighbor] = tentative
+                    predecessors[neighbor] = current
+                    touched.add(neighbor)
+                    heapq.heappush(priority_queue, (tentative, neighbor))
+
+        return touched
+
+    def _path(self, origin: int, destination: int) -> Optional[Tuple[int, ...]]:
+        """
+        Path of node indices in origin's tree, or None if destination isn't reached.
+        """
+        distances, predecessors = self._trees[origin]
+        if distances[destination] == math.inf:
+            return None
+        path = [destination]
+        while path[-1] != origin:
+            path.append(predecessors[path[-1]])
+        path.reverse()
+        return tuple(path)
+
+    def _check_structure(self) -> None:
+        if self.network.compile() is not self._compact:
+            self._rebuild()
+
+    def _sync_structure(self) -> None:
+        """
+        Take a fresh compiled view and copy the costs the trees are built on.
+        """
+        self._compact = self.network.compile()
+        self._weights = list(self._compact.weights)
+        self._open = bytearray(self._compact.edge_open)
+
+    def _rebuild(self) -> Set[str]:
+        """
+        Recompute every tree after a structural change to the network.
+        Node indices may have moved, so routes are re-resolved by their IDs.
+        """
+        old_compact = self._compact
+        old_paths = {route_id: None if path is None else [old_compact.node_ids[n] for n in path]
+                     for route_id, path in self._paths.items()}
+        endpoints = {route_id: (old_compact.node_ids[o], old_compact.node_ids[d])
+                     for route_id, (o, d) in self._routes.items()}
+
+        self._sync_structure()
+        self._trees.clear()
+        self._routes.clear()
+        self._paths.clear()
+
+        changed = set()
+        for route_id, (origin_id, destination_id) in endpoints.items():
+            origin, destination = _resolve_endpoints(self._compact, origin_id, destination_id)
+            if origin not in self._trees:
+                self._trees[origin] = list(dijkstra_tree(self._compact, origin))
+            self._routes[route_id] = (origin, destination)
+            path = self._path(origin, destination)
+            self._paths[route_id] = path
+            if (None if path is None else [self._compact.node_ids[n] for n in path]) != old_paths[route_id]:
+                changed.add(route_id)
+        return changed
@@ -0,0 +1,161 @@
+#ALT preprocessing: A*, Landmarks and the Triangle inequality
+from array import array
+from typing import Callable, List, Optional, Union
+import math
+from models.network import TrafficNetwork
+from models.compact import CompactNetwork
+from algos.pathfinding import dijkstra_tree
+
+class LandmarkIndex:
+    """
+    Distance tables from a few landmark intersections, used as an A* heuristic.
+
+    For any landmark L the triangle inequality gives d(v, t) >= |d(L, t) - d(L, v)|
+    (the network is undirected), so the max over all landmarks is a lower bound on
+    the remaining cost. Unlike the straight-line distance it already accounts for
+    congestion and detours, so A* settles far fewer nodes.
+
+    The tables are only valid for the weights they were computed with. After a
+    congestion update call refresh(); heuristic_to() also refreshes on its own when
+    it notices the network version moved, so a stale table is never used.
+    """
+
+    def __init__(self, network: Union[TrafficNetwork, CompactNetwork], count: int = 8):
+        """
+        Pick landmarks and compute their distance tables.
+
+        Args:
+            network: the network to preprocess, a TrafficNetwork is compiled first
+            count: how many landmarks to use (more = tighter bounds, more memory)
+        """
+        self.network = network
+        self.count = count
+
+        # landmarks are kept by intersection ID so they survive a recompile
+        self.landmark_ids: List[str] = []
+
+        # one array of distances per landmark, indexed by node index
+        self.tables: List[array] = []
+
+        self.compact: Optional[CompactNetwork] = None
+        self.version = -1
+        self.refresh()
+
+    def _current_compact(self) -> CompactNetwork:
+        if isinstance(self.network, CompactNetwork):
+            return self.network
+        return self.network.compile()
+
+    @property
+    def is_stale(self) -> bool:
+        """True if the network changed since the tables were computed."""
+        compact = self._current_compact()
+        return compact is not self.compact or compact.version != self.version
+
+    def refresh(self) -> None:
+        """
+        Recompute the distance tables against the current weights.
+        Landmarks are only reselected if the set of intersections changed.
+        """
+        compact = self._current_compact()
+        if self.compact is None or compact.node_ids != self.compact.node_ids:
+            self.landmark_ids = _select_landmarks(compact, self.count)
+
+        self.tables = []
+        for landmark_id in self.landmark_ids:
+            distances, _ = dijkstra_tree(compact, compact.index_of(landmark_id))
+            self.tables.append(array('d', distances))
+
+        self.compact = compact
+        self.version = compact.version
+
+    def lower_bound(self, source_id: str, target_id: str) -> float:
+        """
+        Landmark lower bound on the shortest path cost between two intersections.
+
+        Args:
+            source_id: ID of the first intersection
+            target_id: ID of the second intersection
+
+        Returns:
+            A cost that the real shortest path is guaranteed not to beat
+        """
+        compact = self._current_compact()
+        bound = self.heuristic_to(compact, compact.index_of(target_id))
+        return bound(compact.index_of(source_id))
+
+    def heuristic_to(self, compact: CompactNetwork, goal: int) -> Callable[[int], float]:
+        """
+        Build the landmark heuristic towards one goal node.
+
+        Args:
+            compact: the compiled network the search runs on
+            goal: node index of the goal
+
+        Returns:
+            A function mapping a node index to a lower bound on its distance to goal
+        """
+        if self.is_stale or compact is not self.compact:
+            self.refresh()
+            if compact is not self.compact:
+                raise ValueError("Landmark index was built for a different network")
+
+        # landmarks that can't reach the goal say nothing useful about it
+        goal_rows = [(table, table[goal]) for table in self.tables if table[goal] != math.inf]
+
+        def bound(i):
+            best = 0.0
+            for table, to_goal in goal_rows:
+                diff = to_goal - table[i]
+                if diff < 0:
+                    diff = -diff
+                if diff > best and diff != math.inf:
+                    best = diff
+            return best
+        return bound
+
+
+def _select_landmarks(compact: CompactNetwork, count: int) -> List[str]:
+    """
+    Farthest-point landmark selection.
+    Start from the node farthest from an arbitrary node, then keep adding the node whose
+    distance to its nearest chosen landmark is largest. Landmarks end up spread along the
+    edge of the network, which is where they give the tightest bounds.
+
+    Args:
+        compact: the compiled network
+        count: how many landmarks to pick
+
+    Returns:
+        The IDs of the chosen intersections
+    """
+    n = compact.node_count
+    if n == 0:
+        return []
+
+    distances, _ = dijkstra_tree(compact, 0)
+    chosen = [_farthest(distances, 0)]
+    nearest = list(dijkstra_tree(compact, chosen[0])[0])
+
+    while len(chosen) < min(count, n):
+        candidate = _farthest(nearest, chosen[-1])
+        if candidate in chosen:
+            break
+        chosen.append(candidate)
+        distances, _ = dijkstra_tree(compact, candidate)
+        nearest = [d if d < m else m for d, m in zip(distances, nearest)]
+
+    return [compact.node_ids[i] for i in chosen]
+
+
+def _farthest(distances: List[float], default: int) -> int:
+    """
+    Index of the largest finite distance, or default if nothing else is reachable.
+    """
+    best = default
+    best_distance = 0.0
+    for i, d in enumerate(distances):
+        if d != math.inf and d > best_distance:
+            best = i
+            best_distance = d
+    return best
@@ -0,0 +1,394 @@
+#Geographic partitioning of a network into cells, with a boundary overlay for stitched queries
+from typing import Dict, List, Optional, Tuple
+import heapq
+import json
+import math
+import multiprocessing
+import os
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+from models.snapshot import save_snapshot, load_snapshot
+from algos.pathfinding import dijkstra_tree, _unwind_path
+
+_MANIFEST = "manifest.json"
+_MANIFEST_FORMAT = 1
+
+class PartitionedNetwork:
+    """
+    A network split into square geographic cells.
+
+    Each cell is an ordinary TrafficNetwork holding the intersections inside it and the
+    roads with both ends inside it, so it can be saved, loaded and searched on its own.
+    Roads crossing between cells are cut; their endpoints are the cell's boundary nodes.
+    The overlay graph connects boundary nodes with
+        - the cut roads themselves, and
+        - for every cell, the shortest in-cell distance between each pair of its boundary nodes,
+    which is all a router needs to stitch a cross-cell route together from per-cell searches.
+
+    Costs are the road weights at partitioning time.
+    """
+
+    def __init__(self, cell_size: float, cell_of: Dict[str, str], boundary: Dict[str, List[str]],
+                 overlay: Dict[str, List[Tuple[str, float, Optional[str]]]],
+                 cells: Optional[Dict[str, TrafficNetwork]] = None,
+                 cell_paths: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            cell_size: side of a cell, in coordinate units
+            cell_of: intersection ID -> cell ID
+            boundary: cell ID -> its boundary intersection IDs
+            overlay: boundary intersection ID -> list of (neighbor ID, cost, cell ID or None for a cut road)
+            cells: cell ID -> the cell's network, when held in memory
+            cell_paths: cell ID -> snapshot file, when saved
+        """
+        self.cell_size = cell_size
+        self.cell_of = cell_of
+        self.boundary = boundary
+        self.overlay = overlay
+        self.cells = cells
+        self.cell_paths = cell_paths
+
+    def save(self, directory: str) -> None:
+        """
+        Write every cell as a snapshot plus a manifest with the overlay into a directory.
+        Each cell file can then be loaded on its own (see ProcessTransport).
+
+        Args:
+            directory: where to write, created if needed
+        """
+        os.makedirs(directory, exist_ok=True)
+        cell_files = {}
+        for cell_id, cell in self.cells.items():
+            cell_files[cell_id] = f"cell_{cell_id}.tsnp"
+            save_snapshot(cell, os.path.join(directory, cell_files[cell_id]))
+
+        overlay = [[node_id, neighbor_id, cost, cell_id]
+                   for node_id, entries in self.overlay.items() for neighbor_id, cost, cell_id in entries]
+        manifest = {
+            "format": _MANIFEST_FORMAT,
+            "cell_size": self.cell_size,
+            "cells": cell_files,
+            "cell_of": self.cell_of,
+            "boundary": self.boundary,
+            "overlay": overlay,
+        }
+        with open(os.path.join(directory, _MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        self.cell_paths = {cell_id: os.path.join(directory, name) for cell_id, name in cell_files.items()}
+
+    @classmethod
+    def load(cls, directory: str) -> 'PartitionedNetwork':
+        """
+        Read a saved partition's manifest. Cells are not loaded, only their paths recorded.
+
+        Raises:
+            ValueError: If the directory holds no partition or an unknown format
+        """
+        path = os.path.join(directory, _MANIFEST)
+        if not os.path.exists(path):
+            raise ValueError(f"{directory} does not hold a partitioned network")
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != _MANIFEST_FORMAT:
+            raise ValueError(f"Unsupported partition format {manifest.get('format')}")
+
+        overlay: Dict[str, List[Tuple[str, float, Optional[str]]]] = {}
+        for node_id, neighbor_id, cost, cell_id in manifest["overlay"]:
+            overlay.setdefault(node_id, []).append((neighbor_id, cost, cell_id))
+        cell_paths = {cell_id: os.path.join(directory, name) for cell_id, name in manifest["cells"].items()}
+        return cls(manifest["cell_size"], manifest["cell_of"], manifest["boundary"], overlay,
+                   cell_paths=cell_paths)
+
+
+def partition_network(network: TrafficNetwork, cell_size: float) -> PartitionedNetwork:
+    """
+    Split a network into square cells of a given size by intersection coordinates.
+
+    Args:
+        network: the full network
+        cell_size: side of a cell, in coordinate units
+
+    Returns:
+        A PartitionedNetwork with every cell held in memory
+
+    Raises:
+        ValueError: If cell_size isn't positive
+    """
+    if cell_size <= 0:
+        raise ValueError("cell_size must be positive")
+
+    cell_of = {}
+    cells: Dict[str, TrafficNetwork] = {}
+    for intersection in network.intersections.values():
+        cell_id = f"{math.floor(intersection.x / cell_size)}_{math.floor(intersection.y / cell_size)}"
+        cell_of[intersection.id] = cell_id
+        if cell_id not in cells:
+            cells[cell_id] = TrafficNetwork()
+        copy = Intersection(intersection.id, intersection.x, intersection.y, intersection.name)
+        copy.congestion = intersection.congestion
+        copy.delay = intersection.delay
+        cells[cell_id].add_intersection(copy)
+
+    overlay: Dict[str, List[Tuple[str, float, Optional[str]]]] = {}
+    boundary_sets: Dict[str, set] = {cell_id: set() for cell_id in cells}
+    internal: Dict[str, list] = {cell_id: [] for cell_id in cells}
+    for road in network.roads.values():
+        source_cell, target_cell = cell_of[road.source_id], cell_of[road.target_id]
+        if source_cell == target_cell:
+            internal[source_cell].append(road)
+            continue
+        #cut road: both ends become boundary nodes, the road itself goes in the overlay
+        boundary_sets[source_cell].add(road.source_id)
+        boundary_sets[target_cell].add(road.target_id)
+        if road.is_open:
+            overlay.setdefault(road.source_id, []).append((road.target_id, road.weight, None))
+            overlay.setdefault(road.target_id, []).append((road.source_id, road.weight, None))
+
+    for cell_id, roads in internal.items():
+        # weights are carried over as they are, so cells agree with the full network
+        cells[cell_id].add_roads([Road.from_dict(road.to_dict()) for road in roads], compute_weights=False)
+
+    boundary = {cell_id: sorted(nodes) for cell_id, nodes in boundary_sets.items()}
+    for cell_id, nodes in boundary.items():
+        if len(nodes) < 2:
+            continue
+        compact = cells[cell_id].compile()
+        indices = [compact.index_of(node_id) for node_id in nodes]
+        for node_id, index in zip(nodes, indices):
+            distances, _ = dijkstra_tree(compact, index, stop_at=indices)
+            for other_id, other in zip(nodes, indices):
+                if other != index and distances[other] < math.inf:
+                    overlay.setdefault(node_id, []).append((other_id, distances[other], cell_id))
+
+    return PartitionedNetwork(cell_size, cell_of, boundary, overlay, cells=cells)
+
+
+class CellWorker:
+    """
+    Answers search requests for one cell. Requests and responses are plain dicts so
+    they can cross any transport:
+        {"op": "distances", "source": id, "targets": [ids]} -> {"distances": [costs]}
+        {"op": "path", "source": id, "target": id}           -> {"path": [ids], "cost": cost}
+    Failures come back as {"error": message}.
+    """
+
+    def __init__(self, network: TrafficNetwork):
+        self.network = network
+
+    def handle(self, request: dict) -> dict:
+        compact = self.network.compile()
+        source = compact.index_of(request.get("source"))
+        if source is None:
+            return {"error": f"Intersection {request.get('source')} is not in this cell"}
+
+        if request.get("op") == "distances":
+            targets = [compact.index_of(target_id) for target_id in request["targets"]]
+            if any(target is None for target in targets):
+                return {"error": "Unknown target intersection"}
+            distances, _ = dijkstra_tree(compact, source, stop_at=targets)
+            return {"distances": [distances[target] for target in targets]}
+
+        if request.get("op") == "path":
+            target = compact.index_of(request["target"])
+            if target is None:
+                return {"error": f"Intersection {request['target']} is not in this cell"}
+            distances, predecessors = dijkstra_tree(compact, source, stop_at=[target])
+            if distances[target] == math.inf:
+                return {"error": f"No path exists from {request['source']} to {request['target']}"}
+            return {"path": _unwind_path(compact, predecessors, source, target), "cost": distances[target]}
+
+        return {"error": f"Unknown op {request.get('op')}"}
+
+
+class LocalTransport:
+    """
+    Talks to in-process cell workers, passing every request and response through JSON
+    as a stand-in for a real network transport.
+    """
+
+    def __init__(self, workers: Dict[str, CellWorker]):
+        self.workers = workers
+
+    @classmethod
+    def for_partition(cls, partitioned: PartitionedNetwork) -> 'LocalTransport':
+        """
+        Workers for every in-memory cell of a partition.
+        """
+        return cls({cell_id: CellWorker(cell) for cell_id, cell in partitioned.cells.items()})
+
+    def request(self, cell_id: str, request: dict) -> dict:
+        response = self.workers[cell_id].handle(json.loads(json.dumps(request)))
+        return json.loads(json.dumps(response))
+
+    def close(self) -> None:
+        pass
+
+
+class ProcessTransport:
+    """
+    One worker process per cell, each loading only its own cell snapshot, so memory and
+    search load are spread over processes. Requests travel over a pipe per worker.
+    """
+
+    def __init__(self, cell_paths: Dict[str, str]):
+        """
+        Args:
+            cell_paths: cell ID -> snapshot file (PartitionedNetwork.cell_paths after save/load)
+        """
+        self._connections = {}
+        self._processes = []
+        for cell_id, path in cell_paths.items():
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_serve_cell, args=(path, child), daemon=True)
+            process.start()
+            child.close()
+            self._connections[cell_id] = parent
+            self._processes.append(process)
+
+    def request(self, cell_id: str, request: dict) -> dict:
+        connection = self._connections[cell_id]
+        connection.send(request)
+        return connection.recv()
+
+    def close(self) -> None:
+        """
+        Stop every worker process.
+        """
+        for connection in self._connections.values():
+            connection.send(None)
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = {}
+        self._processes = []
+
+    def __enter__(self) -> 'ProcessTransport':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _serve_cell(path: str, connection) -> None:
+    """
+    Worker process loop: load one cell and answer requests until told to stop.
+    """
+    worker = CellWorker(load_snapshot(path))
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        connection.send(worker.handle(request))
+    connection.close()
+
+
+class PartitionedRouter:
+    """
+    Answers shortest path queries over a partitioned network by stitching per-cell
+    searches (run wherever the transport sends them) together over the overlay graph.
+    """
+
+    def __init__(self, partitioned: PartitionedNetwork, transport):
+        """
+        Args:
+            partitioned: the partition (cells don't need to be in memory)
+            transport: LocalTransport, ProcessTransport or anything with request(cell_id, dict)
+        """
+        self.partitioned = partitioned
+        self.transport = transport
+
+    def route(self, start_id: str, end_id: str) -> Tuple[List[str], float]:
+        """
+        Shortest path between two intersections anywhere in the partition.
+
+        Returns:
+            Tuple of (path of intersection IDs, total path cost)
+
+        Raises:
+            ValueError: If start or end intersections don't exist or if no path exists
+        """
+        partitioned = self.partitioned
+        start_cell = partitioned.cell_of.get(start_id)
+        end_cell = partitioned.cell_of.get(end_id)
+        if start_cell is None:
+            raise ValueError(f"Start intersection {start_id} does not exist")
+        if end_cell is None:
+            raise ValueError(f"End intersection {end_id} does not exist")
+        if start_id == end_id:
+            return [start_id], 0
+
+        exits = partitioned.boundary[start_cell]
+        entries = partitioned.boundary[end_cell]
+
+        #leg out of the start cell (and straight to the end if it's in the same cell)
+        targets = exits + [end_id] if start_cell == end_cell else exits
+        from_start = self._request(start_cell, {"op": "distances", "source": start_id, "targets": targets})["distances"]
+        best_cost = from_start[-1] if start_cell == end_cell else math.inf
+        best_entry = None
+
+        to_end = dict(zip(entries, self._request(end_cell, {"op": "distances", "source": end_id,
+                                                             "targets": entries})["distances"]))
+
+        #Dijkstra over the overlay, seeded with the start cell's boundary
+        distances: Dict[str, float] = {}
+        predecessors: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        settled = set()
+        priority_queue = []
+        for node_id, cost in zip(exits, from_start):
+            if cost < distances.get(node_id, math.inf):
+                distances[node_id] = cost
+                predecessors[node_id] = (None, start_cell)
+                heapq.heappush(priority_queue, (cost, node_id))
+
+        while priority_queue:
+            current_distance, current = heapq.heappop(priority_queue)
+            if current_distance >= best_cost:
+                break
+            if current in settled:
+                continue
+            settled.add(current)
+
+            if current in to_end and current_distance + to_end[current] < best_cost:
+                best_cost = current_distance + to_end[current]
+                best_entry = current
+
+            for neighbor, cost, cell_id in partitioned.overlay.get(current, ()):
+                tentative = current_distance + cost
+                if tentative < distances.get(neighbor, math.inf):
+                    distances[neighbor] = tentative
+                    predecessors[neighbor] = (current, cell_id)
+                    heapq.heappush(priority_queue, (tentative, neighbor))
+
+        if best_cost == math.inf:
+            raise ValueError(f"No path exists from {start_id} to {end_id}")
+        if best_entry is None:
+            return self._request(start_cell, {"op": "path", "source": start_id, "target": end_id})["path"], best_cost
+
+        #unpack: overlay hops back to the start cell, then expand each one
+        hops = []
+        node_id = best_entry
+        while True:
+            previous, cell_id = predecessors[node_id]
+            hops.append((previous, node_id, cell_id))
+            if previous is None:
+                break
+            node_id = previous
+        hops.reverse()
+
+        path = [start_id]
+        for previous, node_id, cell_id in hops:
+            source = start_id if previous is None else previous
+            if cell_id is None:
+                path.append(node_id)
+            elif source != node_id:
+                path.extend(self._request(cell_id, {"op": "path", "source": source, "target": node_id})["path"][1:])
+        if best_entry != end_id:
+            path.extend(self._request(end_cell, {"op": "path", "source": best_entry, "target": end_id})["path"][1:])
+        return path, best_cost
+
+    def _request(self, cell_id: str, request: dict) -> dict:
+        response = self.transport.request(cell_id, request)
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response
@@ -1,134 +1,539 @@
 #Implementing the A* algorithm for faster pathfinding
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Union, Callable, Iterable, Sequence
 import heapq
 import math
+import time
 from models.network import TrafficNetwork
+from models.compact import CompactNetwork
+from algos.stats import SearchRecord, _HeapProbe
+from algos.workspace import SearchWorkspace
 
-def a_star_shortest_path(network: TrafficNetwork, start_id: str, end_id: str) -> Tuple[List[str], float]:
+def a_star_shortest_path(network: Union[TrafficNetwork, CompactNetwork], start_id: str, end_id: str,
+                         algorithm: str = "astar", landmarks=None, stats=None,
+                         workspace: Optional[SearchWorkspace] = None) -> Tuple[List[str], float]:
     """
     Args:
-        network: The traffic network
+        network: The traffic network, or its compiled form from TrafficNetwork.compile()
         start_id: ID of the starting intersection
         end_id: ID of the destination intersection
+        algorithm: "astar" for the forward search, or "bidirectional" to search from
+            both ends at once (settles far fewer nodes on long routes).
+        landmarks: Optional LandmarkIndex (see algos.landmarks). When given, the heuristic
+            is the max of the Euclidean and landmark lower bounds, which is much tighter on
+            congested networks.
+        stats: Optional SearchStats (see algos.stats) to record this search's effort,
+            phase timings and heuristic quality into. Without it nothing is measured.
+        workspace: Optional SearchWorkspace (see algos.workspace) for the search to keep
+            its per-node arrays in. By default each thread reuses its own.
         
     Returns:
         Tuple containing:
         - List of intersection IDs representing the path
         - Total path cost/weight
         
+    Raises:
+        ValueError: If start or end intersections don't exist, if no path exists
+            or if the algorithm is unknown
+    """
+    if algorithm not in ("astar", "bidirectional"):
+        raise ValueError(f"Unknown algorithm {algorithm}")
+
+    #every search runs on the compiled arrays, which TrafficNetwork caches and patches in
+    #place, so the per-node bookkeeping comes from a reused SearchWorkspace every time
+    compact = network if isinstance(network, CompactNetwork) else network.compile()
+    if algorithm == "bidirectional":
+        return _bidirectional_a_star(compact, start_id, end_id, landmarks, stats, workspace)
+    return _a_star_compact(compact, start_id, end_id, landmarks, stats, workspace)
+
+
+def _a_star_compact(compact: CompactNetwork, start_id: str, end_id: str,
+                    landmarks=None, stats=None, workspace: Optional[SearchWorkspace] = None) -> Tuple[List[str], float]:
+    """
+    A* over the CSR arrays of a CompactNetwork, the forward search behind
+    a_star_shortest_path. It works on integer node indices, so the bookkeeping is the
+    generation-stamped lists of a SearchWorkspace instead of per-call dicts.
+
+    Args:
+        compact: The compiled network
+        start_id: ID of the starting intersection
+        end_id: ID of the destination intersection
+        landmarks: Optional LandmarkIndex for a tighter heuristic
+        stats: Optional SearchStats to record into
+        workspace: Optional SearchWorkspace, the thread's own by default
+
+    Returns:
+        Tuple of (path of intersection IDs, total path cost)
+
     Raises:
         ValueError: If start or end intersections don't exist or if no path exists
     """
-    #Verification for start and end ids 
-    if start_id not in network.intersections:
-        raise ValueError(f"Start intersection {start_id} does not exist")
-    if end_id not in network.intersections:
-        raise ValueError(f"End intersection {end_id} does not exist")
-    
-    #The end intersection (goal) that will be used for the heuristic 
-    end_intersection = network.intersections[end_id]
-    
-    #Heuristic function
-    def heuristic(intersection_id):
-        """
-        Using the manhattan distance
-        Calculate straight-line distance to goal as heuristic
-
-        Args:
-            intersection_id: The id for the current intersection
-
-        Returns: 
-            euclidean distance to the end interection from the provided intersection
-        """
-        current = network.intersections[intersection_id]
-        # Euclidean distance formula
-        return math.sqrt(
-            (current.x - end_intersection.x) ** 2 + 
-            (current.y - end_intersection.y) ** 2
-        )
-    
-
-    """
-    A* will use a priority queue for A* algorithm:
-        It has the format: (f_score, current_distance, intersection_id)
-        Will use the current_distance as a tie-breaker for equal f_scores
-        f_score = current_distance (g_score) + heuristic
-    """ 
-    start_f_score = heuristic(start_id)
-    priority_queue = [(start_f_score, 0, start_id)]
-    
-    #Dictionary to keep track of g_scores (distance from start)
-    g_scores = {start_id: 0}
-    
-    #Dictionary to keep track of f_scores (g_score + heuristic)
-    f_scores = {start_id: start_f_score}
-    
-    #Dictionary to keep track of predecessors for path reconstruction
-    predecessors = {}
-    
-    #Set to keep track of visited nodes
-    visited = set()
-    
+    if stats is not None:
+        setup_started = time.perf_counter()
+
+    start, end = _resolve_endpoints(compact, start_id, end_id)
+    algorithm = "astar" if landmarks is None else "astar_landmarks"
+    if start == end:
+        if stats is not None:
+            _record_search(stats, algorithm, _HeapProbe(), (setup_started,) * 3, 0, 0, 0.0, False)
+        return [start_id], 0
+
+    offsets, targets, weights = compact.offsets, compact.targets, compact.weights
+    edge_open = compact.edge_open
+    heuristic = _heuristic_to(compact, end, landmarks)
+
+    #a node's stamp says whether it is reached or settled in this search (see SearchWorkspace)
+    if workspace is None:
+        workspace = SearchWorkspace.for_thread()
+    reached = workspace.begin(compact.node_count)
+    settled = reached + 1
+    stamps, g_scores, predecessors = workspace.stamps[0], workspace.g[0], workspace.predecessors[0]
+    #heuristic of every reached node, worked out once when it is first reached
+    estimates = workspace.estimates
+
+    stamps[start] = reached
+    g_scores[start] = 0
+    predecessors[start] = -1
+    estimates[start] = heuristic(start)
+    priority_queue = workspace.heaps[0]
+    priority_queue.append((estimates[start], 0, start))
+
+    probe, push, pop = _heap_operations(stats, priority_queue)
+    if probe is not None:
+        estimate = priority_queue[0][0]
+        search_started = time.perf_counter()
+
     while priority_queue:
-        #Get the intersection with the smallest f_score
-        current_f_score, current_distance, current_id = heapq.heappop(priority_queue)
-        
-        #If we've reached the destination, we can stop
-        if current_id == end_id:
+        _, current_distance, current = pop(priority_queue)
+
+        if current == end:
             break
-            
-        #Skip if we've already processed this intersection
-        if current_id in visited:
+        if stamps[current] == settled:
             continue
-            
-        #Mark as visited
-        visited.add(current_id)
-        
-        #Check all neighbors
-        for neighbor_id, weight in network.adjacency_list[current_id]:
-            #Skip if neighbor has been visited
-            if neighbor_id in visited:
+        stamps[current] = settled
+
+        for k in range(offsets[current], offsets[current + 1]):
+            #closed roads stay in the arrays, masked out
+            if not edge_open[k]:
+                continue
+            neighbor = targets[k]
+            stamp = stamps[neighbor]
+            if stamp < reached:
+                #first time this search sees the neighbor
+                tentative_g_score = current_distance + weights[k]
+                stamps[neighbor] = reached
+                estimates[neighbor] = estimate_here = heuristic(neighbor)
+            elif stamp == reached:
+                tentative_g_score = current_distance + weights[k]
+                if not tentative_g_score < g_scores[neighbor]:
+                    continue
+                estimate_here = estimates[neighbor]
+            else:
+                #settled
                 continue
-                
-            #Calculate new g_score (distance from start)
-            tentative_g_score = current_distance + weight
-            
-            #If we found a shorter path to the neighbor
-            if neighbor_id not in g_scores or tentative_g_score < g_scores[neighbor_id]:
-                #Update predecessor
-                predecessors[neighbor_id] = current_id
-                
-                #Update g_score
-                g_scores[neighbor_id] = tentative_g_score
-                
-                #Calculate and update f_score
-                f_score = tentative_g_score + heuristic(neighbor_id)
-                f_scores[neighbor_id] = f_score
-                
-                #Add to priority queue
-                heapq.heappush(priority_queue, (f_score, tentative_g_score, neighbor_id))
-    
-    #If we couldn't reach the destination
-    if end_id not in predecessors and start_id != end_id:
+            predecessors[neighbor] = current
+            g_scores[neighbor] = tentative_g_score
+            push(priority_queue, (tentative_g_score + estimate_here, tentative_g_score, neighbor))
+
+    if probe is not None:
+        timings = (setup_started, search_started, time.perf_counter())
+
+    if stamps[end] != reached:
+        if probe is not None:
+            _record_search(stats, algorithm, probe, timings, stamps.count(settled), math.inf, estimate, False)
         raise ValueError(f"No path exists from {start_id} to {end_id}")
-    
-    #Reconstruct the path
-    path = []
-    current = end_id
-    
-    #If start and end are the same, return a single-node path
-    if start_id == end_id:
+
+    #read out before anything else (a stats callback, say) can reuse the workspace
+    path, cost = _unwind_path(compact, predecessors, start, end), g_scores[end]
+    if probe is not None:
+        _record_search(stats, algorithm, probe, timings, stamps.count(settled), cost, estimate, True)
+    return path, cost
+
+
+def _bidirectional_a_star(compact: CompactNetwork, start_id: str, end_id: str,
+                          landmarks=None, stats=None,
+                          workspace: Optional[SearchWorkspace] = None) -> Tuple[List[str], float]:
+    """
+    Bidirectional A* over a CompactNetwork.
+
+    A forward search from the start and a reverse search from the end run in turn
+    (always expanding the smaller frontier). They share the consistent "average"
+    potential p(v) = (h_end(v) - h_start(v)) / 2, the forward search uses p and the
+    reverse one -p, which keeps both searches' reduced edge costs non-negative.
+    With those keys the best meeting cost mu is final once
+    top_forward + top_reverse >= mu.
+
+    The network is undirected, so the reverse search walks the same CSR arrays.
+
+    Args:
+        compact: The compiled network
+        start_id: ID of the starting intersection
+        end_id: ID of the destination intersection
+        landmarks: Optional LandmarkIndex for tighter potentials
+        stats: Optional SearchStats to record into
+        workspace: Optional SearchWorkspace, the thread's own by default
+
+    Returns:
+        Tuple of (path of intersection IDs, total path cost)
+
+    Raises:
+        ValueError: If start or end intersections don't exist or if no path exists
+    """
+    if stats is not None:
+        setup_started = time.perf_counter()
+
+    start, end = _resolve_endpoints(compact, start_id, end_id)
+    algorithm = "bidirectional" if landmarks is None else "bidirectional_landmarks"
+    if start == end:
+        if stats is not None:
+            _record_search(stats, algorithm, _HeapProbe(), (setup_started,) * 3, 0, 0, 0.0, False)
         return [start_id], 0
-        
-    #Trace back from end to start
-    while current != start_id:
-        path.append(current)
+
+    offsets, targets, weights = compact.offsets, compact.targets, compact.weights
+    edge_open = compact.edge_open
+    to_end = _heuristic_to(compact, end, landmarks)
+    to_start = _heuristic_to(compact, start, landmarks)
+
+    #index 0 is the forward search, index 1 the reverse search
+    if workspace is None:
+        workspace = SearchWorkspace.for_thread()
+    reached = workspace.begin(compact.node_count, sides=2)
+    settled = reached + 1
+    stamps, g_scores, predecessors = workspace.stamps, workspace.g, workspace.predecessors
+    estimates, estimated = workspace.estimates, workspace.estimated
+
+    def potential(i):
+        #forward potential, the reverse search uses its negation. Both sides ask for it
+        if estimated[i] == reached:
+            return estimates[i]
+        estimated[i] = reached
+        value = estimates[i] = (to_end(i) - to_start(i)) / 2
+        return value
+
+    queues = workspace.heaps
+    queues[0].append((potential(start), start))
+    queues[1].append((-potential(end), end))
+    for side, root in ((0, start), (1, end)):
+        stamps[side][root] = reached
+        g_scores[side][root] = 0
+        predecessors[side][root] = -1
+
+    best_cost = math.inf
+    meeting = -1
+
+    probe, push, pop = _heap_operations(stats, *queues)
+    if probe is not None:
+        estimate = to_end(start)
+        search_started = time.perf_counter()
+
+    while queues[0] and queues[1]:
+        #neither side can improve on the best meeting point anymore
+        if queues[0][0][0] + queues[1][0][0] >= best_cost:
+            break
+
+        side = 0 if len(queues[0]) <= len(queues[1]) else 1
+        _, current = pop(queues[side])
+        own_stamps, other_stamps = stamps[side], stamps[1 - side]
+        if own_stamps[current] == settled:
+            continue
+        own_stamps[current] = settled
+
+        own_g, other_g = g_scores[side], g_scores[1 - side]
+        own_predecessors = predecessors[side]
+        sign = 1 if side == 0 else -1
+        current_distance = own_g[current]
+
+        for k in range(offsets[current], offsets[current + 1]):
+            if not edge_open[k]:
+                continue
+            neighbor = targets[k]
+            stamp = own_stamps[neighbor]
+            if stamp == settled:
+                continue
+
+            tentative_g_score = current_distance + weights[k]
+            if stamp != reached or tentative_g_score < own_g[neighbor]:
+                own_stamps[neighbor] = reached
+                own_g[neighbor] = tentative_g_score
+                own_predecessors[neighbor] = current
+                push(queues[side], (tentative_g_score + sign * potential(neighbor), neighbor))
+
+            #a node reached (or settled) from both sides gives a candidate route
+            if other_stamps[neighbor] >= reached:
+                meeting_cost = own_g[neighbor] + other_g[neighbor]
+                if meeting_cost < best_cost:
+                    best_cost = meeting_cost
+                    meeting = neighbor
+
+    if probe is not None:
+        timings = (setup_started, search_started, time.perf_counter())
+        nodes_settled = stamps[0].count(settled) + stamps[1].count(settled)
+
+    if meeting == -1:
+        if probe is not None:
+            _record_search(stats, algorithm, probe, timings, nodes_settled, math.inf, estimate, False)
+        raise ValueError(f"No path exists from {start_id} to {end_id}")
+
+    #forward half start -> meeting, then follow the reverse predecessors on to the end
+    path = _unwind_path(compact, predecessors[0], start, meeting)
+    current = meeting
+    while current != end:
+        current = predecessors[1][current]
+        path.append(compact.node_ids[current])
+
+    if probe is not None:
+        _record_search(stats, algorithm, probe, timings, nodes_settled, best_cost, estimate, False)
+    return path, best_cost
+
+
+def dijkstra_tree(compact: CompactNetwork, source: int,
+                  stop_at: Optional[Iterable[int]] = None) -> Tuple[List[float], List[int]]:
+    """
+    Plain Dijkstra from one node of a CompactNetwork to every node it can reach.
+    Works on node indices, use compact.index_of / compact.node_ids to translate.
+
+    Args:
+        compact: The compiled network
+        source: node index to search from
+        stop_at: optional node indices, the search stops as soon as all of them are settled.
+            Distances of those nodes are then final, others may be partial.
+
+    Returns:
+        Tuple of (distance per node index, predecessor per node index),
+        math.inf / -1 for nodes that can't be reached
+    """
+    offsets, targets, weights = compact.offsets, compact.targets, compact.weights
+    edge_open = compact.edge_open
+    n = compact.node_count
+
+    distances = [math.inf] * n
+    predecessors = [-1] * n
+    settled = bytearray(n)
+    distances[source] = 0
+    priority_queue = [(0, source)]
+
+    #nodes we still need to settle before we may stop early
+    remaining = None
+    if stop_at is not None:
+        remaining = bytearray(n)
+        left = 0
+        for node in stop_at:
+            if not remaining[node]:
+                remaining[node] = 1
+                left += 1
+
+    while priority_queue:
+        current_distance, current = heapq.heappop(priority_queue)
+        if settled[current]:
+            continue
+        settled[current] = 1
+
+        if remaining is not None and remaining[current]:
+            left -= 1
+            if left == 0:
+                break
+
+        for k in range(offsets[current], offsets[current + 1]):
+            if not edge_open[k]:
+                continue
+            neighbor = targets[k]
+            tentative = current_distance + weights[k]
+            if tentative < distances[neighbor]:
+                distances[neighbor] = tentative
+                predecessors[neighbor] = current
+                heapq.heappush(priority_queue, (tentative, neighbor))
+
+    return distances, predecessors
+
+
+def distance_matrix(network: Union[TrafficNetwork, CompactNetwork], sources: Sequence[str],
+                    targets: Sequence[str], return_paths: bool = False):
+    """
+    Shortest path costs between every source and every target.
+
+    Instead of one A* per pair this runs one Dijkstra per source that stops as soon as
+    every target is settled, so the work near each source is shared by all its targets.
+    Roads are undirected, so when there are fewer targets than sources the searches run
+    from the targets instead. Repeated IDs are only searched once.
+
+    Args:
+        network: The traffic network, or its compiled form
+        sources: IDs of the origin intersections (rows)
+        targets: IDs of the destination intersections (columns)
+        return_paths: also return the path for every pair
+
+    Returns:
+        A dense len(sources) x len(targets) list of rows of costs, math.inf where no path
+        exists. With return_paths, a tuple (costs, paths) where paths[i][j] is the list of
+        intersection IDs (None if unreachable).
+
+    Raises:
+        ValueError: If any source or target intersection doesn't exist
+    """
+    compact = network if isinstance(network, CompactNetwork) else network.compile()
+    source_nodes = _resolve_all(compact, sources, "Start")
+    target_nodes = _resolve_all(compact, targets, "End")
+
+    #search from whichever side needs fewer searches
+    flipped = len(set(target_nodes)) < len(set(source_nodes))
+    roots, leaves = (target_nodes, source_nodes) if flipped else (source_nodes, target_nodes)
+
+    trees = {}
+    for root in roots:
+        if root not in trees:
+            trees[root] = dijkstra_tree(compact, root, stop_at=leaves)
+
+    costs = []
+    paths = [] if return_paths else None
+    for source in source_nodes:
+        row = []
+        path_row = []
+        for target in target_nodes:
+            root, leaf = (target, source) if flipped else (source, target)
+            distances, predecessors = trees[root]
+            row.append(distances[leaf])
+            if return_paths:
+                path_row.append(_tree_path(compact, predecessors, distances, root, leaf, reverse=flipped))
+        costs.append(row)
+        if return_paths:
+            paths.append(path_row)
+
+    return (costs, paths) if return_paths else costs
+
+
+def _resolve_all(compact: CompactNetwork, intersection_ids: Sequence[str], label: str) -> List[int]:
+    """
+    Map intersection IDs to node indices.
+
+    Raises:
+        ValueError: If any intersection doesn't exist
+    """
+    nodes = []
+    for intersection_id in intersection_ids:
+        node = compact.index_of(intersection_id)
+        if node is None:
+            raise ValueError(f"{label} intersection {intersection_id} does not exist")
+        nodes.append(node)
+    return nodes
+
+
+def _tree_path(compact: CompactNetwork, predecessors: List[int], distances: List[float],
+               root: int, leaf: int, reverse: bool = False) -> Optional[List[str]]:
+    """
+    Path from root to leaf in a shortest path tree, or None if leaf wasn't reached.
+
+    Args:
+        reverse: return it leaf -> root instead
+    """
+    if distances[leaf] == math.inf:
+        return None
+    path = _unwind_path(compact, predecessors, root, leaf)
+    if reverse:
+        path.reverse()
+    return path
+
+
+def _heuristic_to(compact: CompactNetwork, goal: int, landmarks=None) -> Callable[[int], float]:
+    """
+    Build the A* heuristic towards one goal node.
+
+    The Euclidean distance is a lower bound because effective weights are
+    distance * (1 + congestion). With landmarks we take the max of that and the
+    landmark (triangle inequality) bound, the max of two lower bounds is still one.
+
+    Args:
+        compact: The compiled network
+        goal: node index of the goal
+        landmarks: Optional LandmarkIndex
+
+    Returns:
+        A function mapping a node index to a lower bound on its distance to goal
+    """
+    xs, ys = compact.xs, compact.ys
+    goal_x, goal_y = xs[goal], ys[goal]
+
+    if landmarks is None:
+        def euclidean(i):
+            return math.hypot(xs[i] - goal_x, ys[i] - goal_y)
+        return euclidean
+
+    landmark_bound = landmarks.heuristic_to(compact, goal)
+
+    def combined(i):
+        straight = math.hypot(xs[i] - goal_x, ys[i] - goal_y)
+        bound = landmark_bound(i)
+        return bound if bound > straight else straight
+    return combined
+
+
+def _heap_operations(stats, *heaps: list):
+    """
+    The push and pop a search should use: heapq's own without stats, otherwise
+    the counting versions of a fresh _HeapProbe seeded with the heaps' sizes.
+
+    Returns:
+        Tuple of (probe or None, push, pop)
+    """
+    if stats is None:
+        return None, heapq.heappush, heapq.heappop
+    probe = _HeapProbe()
+    probe.start(*heaps)
+    return probe, probe.push, probe.pop
+
+
+def _record_search(stats, algorithm: str, probe: _HeapProbe, timings: Tuple[float, float, float],
+                   nodes_settled: int, cost: float, estimate: float, goal_popped: bool) -> None:
+    """
+    Hand a finished search to stats. The unwind phase ends now.
+
+    Args:
+        timings: perf_counter readings when setup started, the search loop started and it ended
+        goal_popped: the loop ended by popping the goal, which is neither settled nor stale
+    """
+    setup_started, search_started, search_ended = timings
+    found = cost != math.inf
+    stats.record(SearchRecord(
+        algorithm=algorithm,
+        found=found,
+        cost=cost,
+        nodes_settled=nodes_settled,
+        nodes_popped=probe.pops,
+        stale_pops=probe.pops - nodes_settled - (1 if goal_popped else 0),
+        heap_peak=probe.peak,
+        setup_seconds=search_started - setup_started,
+        search_seconds=search_ended - search_started,
+        unwind_seconds=time.perf_counter() - search_ended,
+        heuristic_ratio=estimate / cost if found and cost > 0 else math.nan,
+    ))
+
+
+def _resolve_endpoints(compact: CompactNetwork, start_id: str, end_id: str) -> Tuple[int, int]:
+    """
+    Map start and end intersection IDs to node indices.
+
+    Raises:
+        ValueError: If start or end intersections don't exist
+    """
+    start = compact.index_of(start_id)
+    end = compact.index_of(end_id)
+    if start is None:
+        raise ValueError(f"Start intersection {start_id} does not exist")
+    if end is None:
+        raise ValueError(f"End intersection {end_id} does not exist")
+    return start, end
+
+
+def _unwind_path(compact: CompactNetwork, predecessors: List[int], start: int, end: int) -> List[str]:
+    """
+    Follow a predecessor array back from end to start.
+
+    Returns:
+        List of intersection IDs from start to end
+    """
+    path = []
+    current = end
+    while current != start:
+        path.append(compact.node_ids[current])
         current = predecessors[current]
-        
-    #Add the start node
-    path.append(start_id)
-    
-    #Reverse to get path from start to end
+    path.append(compact.node_ids[start])
     path.reverse()
-    
-    return path, g_scores[end_id]
\ No newline at end of file
+    return path
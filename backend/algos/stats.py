@@ -0,0 +1,228 @@
+#Counters the searches can fill in, for benchmarks and monitoring
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence
+import bisect
+import heapq
+import math
+
+# histogram bucket upper bounds
+DURATION_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+NODES_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000)
+RATIO_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+
+class SearchRecord(NamedTuple):
+    """
+    What one search did.
+
+    nodes_popped counts every heap pop, stale_pops the ones skipped because the node
+    was already settled. heuristic_ratio is the heuristic's estimate at the start over
+    the actual route cost: 1.0 is a perfect heuristic, near 0 means the search is
+    barely better than Dijkstra. It is nan when there is no route or the cost is 0.
+    """
+    algorithm: str
+    found: bool
+    cost: float
+    nodes_settled: int
+    nodes_popped: int
+    stale_pops: int
+    heap_peak: int
+    setup_seconds: float
+    search_seconds: float
+    unwind_seconds: float
+    heuristic_ratio: float
+
+    @property
+    def total_seconds(self) -> float:
+        return self.setup_seconds + self.search_seconds + self.unwind_seconds
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, the shape Prometheus expects.
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        """
+        Args:
+            buckets: increasing upper bounds, +Inf is implied
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """
+        Observations at or below each bound, the last entry is for +Inf.
+        """
+        totals = []
+        running = 0
+        for count in self.counts:
+            running += count
+            totals.append(running)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        return {"buckets": dict(zip(bounds, self.cumulative())), "sum": self.sum, "count": self.count}
+
+
+class SearchStats:
+    """
+    Totals for the searches it is passed to (stats=... on a_star_shortest_path).
+    One object can be shared by many searches, the counts keep adding up.
+
+    Searches without stats run exactly as before. With stats they time their phases,
+    count heap traffic and hand a SearchRecord to record() when they finish.
+    """
+
+    def __init__(self, on_search: Optional[Callable[[SearchRecord], None]] = None):
+        """
+        Args:
+            on_search: optional callback given every SearchRecord, e.g. to log slow queries
+        """
+        self.on_search = on_search
+        self.last: Optional[SearchRecord] = None
+
+        self.searches = 0
+        self.failed = 0
+        self.by_algorithm: Dict[str, int] = {}
+        self.nodes_settled = 0
+        self.nodes_popped = 0
+        self.stale_pops = 0
+        self.heap_peak = 0
+        self.phase_seconds = {"setup": 0.0, "search": 0.0, "unwind": 0.0}
+
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.settled = Histogram(NODES_BUCKETS)
+        self.heuristic_ratio = Histogram(RATIO_BUCKETS)
+
+    def record(self, record: SearchRecord) -> None:
+        """
+        Add one finished search.
+        """
+        self.last = record
+        self.searches += 1
+        if not record.found:
+            self.failed += 1
+        self.by_algorithm[record.algorithm] = self.by_algorithm.get(record.algorithm, 0) + 1
+        self.nodes_settled += record.nodes_settled
+        self.nodes_popped += record.nodes_popped
+        self.stale_pops += record.stale_pops
+        self.heap_peak = max(self.heap_peak, record.heap_peak)
+        self.phase_seconds["setup"] += record.setup_seconds
+        self.phase_seconds["search"] += record.search_seconds
+        self.phase_seconds["unwind"] += record.unwind_seconds
+
+        self.duration.observe(record.total_seconds)
+        self.settled.observe(record.nodes_settled)
+        if not math.isnan(record.heuristic_ratio):
+            self.heuristic_ratio.observe(record.heuristic_ratio)
+
+        if self.on_search is not None:
+            self.on_search(record)
+
+    @property
+    def mean_nodes_settled(self) -> float:
+        return self.nodes_settled / self.searches if self.searches else 0.0
+
+    @property
+    def mean_heuristic_ratio(self) -> float:
+        histogram = self.heuristic_ratio
+        return histogram.sum / histogram.count if histogram.count else math.nan
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "searches": self.searches,
+            "failed": self.failed,
+            "by_algorithm": dict(self.by_algorithm),
+            "nodes_settled": self.nodes_settled,
+            "mean_nodes_settled": self.mean_nodes_settled,
+            "nodes_popped": self.nodes_popped,
+            "stale_pops": self.stale_pops,
+            "heap_peak": self.heap_peak,
+            "phase_seconds": dict(self.phase_seconds),
+            "duration_seconds": self.duration.to_dict(),
+            "nodes_settled_histogram": self.settled.to_dict(),
+            "heuristic_ratio": self.heuristic_ratio.to_dict(),
+        }
+
+    def to_prometheus(self, prefix: str = "trafficsim_search") -> str:
+        """
+        The totals in the Prometheus text exposition format, ready to serve on /metrics.
+
+        Args:
+            prefix: metric name prefix
+
+        Returns:
+            The exposition text, newline terminated
+        """
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = "{" + ",".join(f'{key}="{val}"' for key, val in labels) + "}" if labels else ""
+                lines.append(f"{prefix}_{name}{suffix}{label_text} {_format_value(value)}")
+
+        def histogram(name: str, help_text: str, hist: Histogram) -> None:
+            bounds = [_format_value(bound) for bound in hist.buckets] + ["+Inf"]
+            samples = [("_bucket", [("le", bound)], count) for bound, count in zip(bounds, hist.cumulative())]
+            samples.append(("_sum", [], hist.sum))
+            samples.append(("_count", [], hist.count))
+            metric(name, "histogram", help_text, samples)
+
+        metric("searches_total", "counter", "Searches run.",
+               [("", [("algorithm", algorithm)], count) for algorithm, count in sorted(self.by_algorithm.items())])
+        metric("failed_total", "counter", "Searches that found no route.", [("", [], self.failed)])
+        metric("nodes_popped_total", "counter", "Heap entries popped.", [("", [], self.nodes_popped)])
+        metric("stale_pops_total", "counter", "Heap entries skipped because their node was already settled.",
+               [("", [], self.stale_pops)])
+        metric("heap_peak", "gauge", "Largest heap seen in one search.", [("", [], self.heap_peak)])
+        metric("phase_seconds_total", "counter", "Time spent per search phase.",
+               [("", [("phase", phase)], seconds) for phase, seconds in self.phase_seconds.items()])
+        histogram("duration_seconds", "Search wall time.", self.duration)
+        histogram("nodes_settled", "Nodes settled per search.", self.settled)
+        histogram("heuristic_ratio", "Heuristic estimate at the start over the route cost.", self.heuristic_ratio)
+        return "\n".join(lines) + "\n"
+
+
+class _HeapProbe:
+    """
+    Counting stand-ins for heapq.heappush/heappop, swapped in by searches that have stats.
+    The size is summed over every heap it is used on (both sides of a bidirectional search).
+    """
+
+    def __init__(self):
+        self.pops = 0
+        self.size = 0
+        self.peak = 0
+
+    def push(self, heap: list, item) -> None:
+        heapq.heappush(heap, item)
+        self.size += 1
+        if self.size > self.peak:
+            self.peak = self.size
+
+    def pop(self, heap: list):
+        self.pops += 1
+        self.size -= 1
+        return heapq.heappop(heap)
+
+    def start(self, *heaps: list) -> None:
+        #entries the heaps were seeded with
+        self.size = sum(len(heap) for heap in heaps)
+        self.peak = self.size
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
@@ -0,0 +1,124 @@
+#Time-dependent A*: edge costs depend on when the road is entered
+from typing import Dict, List, Optional, Tuple
+import heapq
+import math
+from models.network import TrafficNetwork
+from models.profiles import CongestionProfiles
+from algos.pathfinding import _resolve_endpoints, _unwind_path
+
+def time_dependent_shortest_path(network: TrafficNetwork, start_id: str, end_id: str,
+                                 departure_time: float,
+                                 profiles: CongestionProfiles) -> Tuple[List[str], float]:
+    """
+    Find the fastest path when leaving start at departure_time.
+
+    A road with a profile_id is priced like Road.calculate_effective_weight does it (the
+    network's weight formula plus half the delay of each end intersection), except that
+    its congestion is read from its profile at the time the road is entered, i.e. at
+    departure_time plus the cost of the path so far (costs are treated as travel time, in
+    the same units as the profile period). Roads without a profile keep their static weight.
+
+    The search is label-setting, which is exact as long as leaving later never gets
+    you there sooner (the FIFO property), true for any profile that doesn't drop
+    faster than one unit of cost per unit of time over a road's length.
+
+    Args:
+        network: The traffic network
+        start_id: ID of the starting intersection
+        end_id: ID of the destination intersection
+        departure_time: when the trip starts, e.g. seconds since midnight
+        profiles: the store the roads' profile_id values point into
+
+    Returns:
+        Tuple of (path of intersection IDs, travel time)
+
+    Raises:
+        ValueError: If start or end intersections don't exist or if no path exists
+    """
+    compact = network.compile()
+    start, end = _resolve_endpoints(compact, start_id, end_id)
+    if start == end:
+        return [start_id], 0
+
+    offsets, targets, weights = compact.offsets, compact.targets, compact.weights
+    edge_open, edge_roads = compact.edge_open, compact.edge_roads
+    xs, ys = compact.xs, compact.ys
+    goal_x, goal_y = xs[end], ys[end]
+    congestion_at = profiles.congestion_at
+    n = compact.node_count
+
+    # road index -> (profile ID, road view, distance, delay), or None for roads without
+    # a profile, looked up only for roads the search touches
+    road_profiles: Dict[int, Optional[Tuple[int, _RoadAt, float, float]]] = {}
+    roads, road_ids, intersections = network.roads, compact.road_ids, network.intersections
+    weight_formula = network.weight_formula
+
+    g_scores = [math.inf] * n
+    predecessors = [-1] * n
+    visited = bytearray(n)
+
+    g_scores[start] = 0
+    priority_queue = [(math.hypot(xs[start] - goal_x, ys[start] - goal_y), 0, start)]
+
+    while priority_queue:
+        _, current_time, current = heapq.heappop(priority_queue)
+
+        if current == end:
+            break
+        if visited[current]:
+            continue
+        visited[current] = 1
+
+        #every road out of here is entered at the same moment
+        now = departure_time + current_time
+        for k in range(offsets[current], offsets[current + 1]):
+            if not edge_open[k]:
+                continue
+            neighbor = targets[k]
+            if visited[neighbor]:
+                continue
+
+            r = edge_roads[k]
+            if r not in road_profiles:
+                road = roads[road_ids[r]]
+                if road.profile_id is None:
+                    road_profiles[r] = None
+                else:
+                    distance = math.hypot(xs[neighbor] - xs[current], ys[neighbor] - ys[current])
+                    delay = (intersections[road.source_id].delay + intersections[road.target_id].delay) / 2
+                    road_profiles[r] = (road.profile_id, _RoadAt(road), distance, delay)
+            profiled = road_profiles[r]
+
+            if profiled is None:
+                cost = weights[k]
+            else:
+                profile_id, road_at, distance, delay = profiled
+                road_at.congestion = congestion_at(profile_id, now)
+                cost = weight_formula(distance, road_at) + delay
+
+            tentative_g_score = current_time + cost
+            if tentative_g_score < g_scores[neighbor]:
+                predecessors[neighbor] = current
+                g_scores[neighbor] = tentative_g_score
+                f_score = tentative_g_score + math.hypot(xs[neighbor] - goal_x, ys[neighbor] - goal_y)
+                heapq.heappush(priority_queue, (f_score, tentative_g_score, neighbor))
+
+    if predecessors[end] == -1:
+        raise ValueError(f"No path exists from {start_id} to {end_id}")
+
+    return _unwind_path(compact, predecessors, start, end), g_scores[end]
+
+
+class _RoadAt:
+    """
+    A road as the weight formula sees it at one moment: congestion is set from the
+    road's profile, every other attribute is read from the road itself.
+    """
+    __slots__ = ("road", "congestion")
+
+    def __init__(self, road):
+        self.road = road
+        self.congestion = road.congestion
+
+    def __getattr__(self, name):
+        return getattr(self.road, name)
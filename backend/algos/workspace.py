@@ -0,0 +1,70 @@
+#Reusable per-node scratch arrays for the compiled searches
+from typing import List, Tuple
+import threading
+
+class SearchWorkspace:
+    """
+    The per-node bookkeeping of a search (distances, predecessors, reached/settled
+    state, heuristic values) kept between searches so they don't allocate it each time.
+
+    Entries are stamped with the generation of the search that wrote them. begin()
+    starts a new generation, which makes everything written before invisible without
+    touching the arrays, so a search only pays for the nodes it actually reaches:
+
+        stamps[side][v] == generation       v is reached, g and predecessors are set
+        stamps[side][v] == generation + 1   v is settled
+        stamps[side][v] < generation        v is untouched in this search
+        estimated[v] == generation          estimates[v] holds v's heuristic
+
+    Side 0 is the forward search, side 1 the reverse one of a bidirectional search
+    (only allocated once one runs). Arrays grow to the biggest network seen.
+
+    A workspace must not be used by two searches at once. The searches use one per
+    thread by default (see for_thread), pass your own to keep it with a worker.
+    """
+
+    def __init__(self):
+        # steps by 2 so the settled stamp of one search stays below the next generation
+        self.generation = 0
+        self.stamps: Tuple[List[int], List[int]] = ([], [])
+        self.g: Tuple[List[float], List[float]] = ([], [])
+        self.predecessors: Tuple[List[int], List[int]] = ([], [])
+        self.estimates: List[float] = []
+        self.estimated: List[int] = []
+        self.heaps: Tuple[list, list] = ([], [])
+
+    def begin(self, size: int, sides: int = 1) -> int:
+        """
+        Start a new search over node indices 0..size-1.
+
+        Args:
+            size: node count of the network searched
+            sides: 2 for a bidirectional search
+
+        Returns:
+            The generation of the new search
+        """
+        for side in range(sides):
+            for values, fill in ((self.stamps[side], 0), (self.g[side], 0.0), (self.predecessors[side], -1)):
+                if len(values) < size:
+                    values.extend([fill] * (size - len(values)))
+            self.heaps[side].clear()
+        if len(self.estimates) < size:
+            self.estimates.extend([0.0] * (size - len(self.estimates)))
+            self.estimated.extend([0] * (size - len(self.estimated)))
+
+        self.generation += 2
+        return self.generation
+
+    @classmethod
+    def for_thread(cls) -> 'SearchWorkspace':
+        """
+        The calling thread's own workspace, created on first use.
+        """
+        workspace = getattr(_local, "workspace", None)
+        if workspace is None:
+            workspace = _local.workspace = cls()
+        return workspace
+
+
+_local = threading.local()
@@ -0,0 +1,131 @@
+#Seeded synthetic city networks for benchmarks
+from typing import List
+import math
+import random
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+
+# distance between neighbouring intersections, roughly a city block
+BLOCK = 100.0
+
+def grid_network(size: int, seed: int = 0) -> TrafficNetwork:
+    """
+    Manhattan style grid with about size intersections.
+
+    Args:
+        size: target number of intersections (rounded to a square)
+        seed: seed for congestion values
+
+    Returns:
+        The generated network
+    """
+    rng = random.Random(seed)
+    side = max(2, round(math.sqrt(size)))
+    network = TrafficNetwork()
+    for i in range(side):
+        for j in range(side):
+            network.add_intersection(_intersection(f"g{i}_{j}", i * BLOCK, j * BLOCK, rng))
+
+    roads = []
+    for i in range(side):
+        for j in range(side):
+            if i + 1 < side:
+                roads.append(_road(f"h{i}_{j}", f"g{i}_{j}", f"g{i+1}_{j}", rng))
+            if j + 1 < side:
+                roads.append(_road(f"v{i}_{j}", f"g{i}_{j}", f"g{i}_{j+1}", rng))
+    network.add_roads(roads)
+    return network
+
+
+def radial_network(size: int, seed: int = 0, spokes: int = 32) -> TrafficNetwork:
+    """
+    Ring-and-spoke city (think Paris or Moscow): a centre, concentric ring roads and
+    radial avenues, about size intersections in total.
+
+    Args:
+        size: target number of intersections
+        seed: seed for congestion values
+        spokes: number of radial avenues
+
+    Returns:
+        The generated network
+    """
+    rng = random.Random(seed)
+    rings = max(1, round((size - 1) / spokes))
+    network = TrafficNetwork()
+    network.add_intersection(_intersection("c", 0.0, 0.0, rng))
+    for ring in range(1, rings + 1):
+        for spoke in range(spokes):
+            angle = 2 * math.pi * spoke / spokes
+            network.add_intersection(_intersection(f"r{ring}_{spoke}", ring * BLOCK * math.cos(angle),
+                                                   ring * BLOCK * math.sin(angle), rng))
+
+    roads = []
+    for spoke in range(spokes):
+        roads.append(_road(f"s0_{spoke}", "c", f"r1_{spoke}", rng))
+    for ring in range(1, rings + 1):
+        for spoke in range(spokes):
+            roads.append(_road(f"a{ring}_{spoke}", f"r{ring}_{spoke}", f"r{ring}_{(spoke + 1) % spokes}", rng))
+            if ring < rings:
+                roads.append(_road(f"s{ring}_{spoke}", f"r{ring}_{spoke}", f"r{ring + 1}_{spoke}", rng))
+    network.add_roads(roads)
+    return network
+
+
+def random_geometric_network(size: int, seed: int = 0, neighbors: int = 3) -> TrafficNetwork:
+    """
+    Intersections scattered uniformly at random, each joined to its nearest few
+    neighbours, like an irregular old town. Density matches the grid (one intersection
+    per block). Small pieces may end up disconnected.
+
+    Args:
+        size: number of intersections
+        seed: seed for positions and congestion
+        neighbors: roads from each intersection to its nearest others
+
+    Returns:
+        The generated network
+    """
+    rng = random.Random(seed)
+    extent = math.sqrt(size) * BLOCK
+    network = TrafficNetwork()
+    points: List[tuple] = []
+    for i in range(size):
+        x, y = rng.uniform(0, extent), rng.uniform(0, extent)
+        points.append((f"p{i}", x, y))
+        network.add_intersection(_intersection(f"p{i}", x, y, rng))
+
+    roads = []
+    seen = set()
+    for point_id, x, y in points:
+        for other_id, _ in network.spatial_index.nearest(x, y, neighbors + 1):
+            if other_id == point_id:
+                continue
+            pair = (point_id, other_id) if point_id < other_id else (other_id, point_id)
+            if pair in seen:
+                continue
+            seen.add(pair)
+            roads.append(_road(f"e{len(roads)}", pair[0], pair[1], rng))
+    network.add_roads(roads)
+    return network
+
+
+GENERATORS = {
+    "grid": grid_network,
+    "radial": radial_network,
+    "geometric": random_geometric_network,
+}
+
+
+def _intersection(intersection_id: str, x: float, y: float, rng: random.Random) -> Intersection:
+    intersection = Intersection(intersection_id, x, y)
+    #the constructor's congestion is unseeded, so set our own
+    intersection.congestion = rng.random()
+    return intersection
+
+
+def _road(road_id: str, source_id: str, target_id: str, rng: random.Random) -> Road:
+    road = Road(road_id, source_id, target_id)
+    road.congestion = rng.random()
+    return road
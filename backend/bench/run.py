@@ -0,0 +1,251 @@
+#Benchmark runner: network operations and route searches on generated cities
+#
+#   python -m bench.run --kinds grid radial --sizes 1000 10000 --output results.json
+#   python -m bench.run --sizes 10000 --baseline results.json
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import argparse
+import datetime
+import json
+import math
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from models.road import Road
+from models.network import TrafficNetwork
+from algos.pathfinding import a_star_shortest_path
+from algos.stats import SearchStats
+from bench.generators import GENERATORS
+
+# name -> (algorithm option, search the compiled view)
+SEARCHES = {
+    "astar": ("astar", False),
+    "astar_compact": ("astar", True),
+    "bidirectional": ("bidirectional", True),
+}
+
+def run_benchmarks(kinds: Sequence[str] = ("grid", "radial", "geometric"),
+                   sizes: Sequence[int] = (1000, 10000),
+                   queries: int = 100,
+                   seed: int = 0,
+                   measure_memory: bool = True) -> Dict[str, Any]:
+    """
+    Run every benchmark on every generated network.
+
+    Args:
+        kinds: generator names from bench.generators.GENERATORS
+        sizes: intersection counts to generate
+        queries: route queries (and road operations) per network
+        seed: seed for the generators and for picking queries
+        measure_memory: also build each network under tracemalloc for peak memory;
+            this builds it twice and is slow for the biggest sizes
+
+    Returns:
+        JSON-ready dict with "meta" and one "results" entry per (kind, size)
+
+    Raises:
+        ValueError: If a kind is unknown
+    """
+    for kind in kinds:
+        if kind not in GENERATORS:
+            raise ValueError(f"Unknown network kind {kind}")
+
+    results = []
+    for kind in kinds:
+        for size in sizes:
+            results.append(_run_one(kind, size, queries, seed, measure_memory))
+    return {"meta": _meta(seed, queries), "results": results}
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = 0.2) -> List[str]:
+    """
+    Find results that got slower than a baseline run.
+
+    Args:
+        current: output of run_benchmarks
+        baseline: an earlier output of run_benchmarks
+        threshold: allowed slowdown, 0.2 means 20% slower
+
+    Returns:
+        One message per median latency (or build time) that regressed past the threshold
+    """
+    before = {(entry["kind"], entry["size"]): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in current["results"]:
+        old = before.get((entry["kind"], entry["size"]))
+        if old is None:
+            continue
+        name = f"{entry['kind']}/{entry['size']}"
+        checks = [("build", old["build"]["seconds"], entry["build"]["seconds"])]
+        for section in ("operations", "searches"):
+            for op, stats in entry[section].items():
+                if op in old[section]:
+                    checks.append((op, old[section][op]["p50_ms"], stats["p50_ms"]))
+        for op, was, now in checks:
+            if was > 0 and now > was * (1 + threshold):
+                regressions.append(f"{name} {op}: {was:.4g} -> {now:.4g} (+{(now / was - 1) * 100:.0f}%)")
+    return regressions
+
+
+def _run_one(kind: str, size: int, queries: int, seed: int, measure_memory: bool) -> Dict[str, Any]:
+    generate = GENERATORS[kind]
+    started = time.perf_counter()
+    network = generate(size, seed)
+    build = {"seconds": time.perf_counter() - started}
+    if measure_memory:
+        del network
+        tracemalloc.start()
+        try:
+            network = generate(size, seed)
+            build["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    rng = random.Random(seed)
+    node_ids = list(network.intersections)
+    pairs = [(rng.choice(node_ids), rng.choice(node_ids)) for _ in range(queries)]
+
+    #searches first, the operations below change the network
+    searches = {name: _time_searches(network, pairs, algorithm, compiled)
+                for name, (algorithm, compiled) in SEARCHES.items()}
+
+    return {
+        "kind": kind,
+        "size": size,
+        "intersections": len(network.intersections),
+        "roads": len(network.roads),
+        "build": build,
+        "searches": searches,
+        "operations": _time_operations(network, queries, rng),
+    }
+
+
+def _time_searches(network: TrafficNetwork, pairs, algorithm: str, compiled: bool) -> Dict[str, Any]:
+    target = network.compile() if compiled else network
+    timings = []
+    for start_id, end_id in pairs:
+        started = time.perf_counter()
+        try:
+            a_star_shortest_path(target, start_id, end_id, algorithm=algorithm)
+        except ValueError:
+            #disconnected pair, still timed: it searched the whole component
+            pass
+        timings.append(time.perf_counter() - started)
+
+    #search effort in a second pass, the instrumented searches are a little slower
+    stats = SearchStats()
+    for start_id, end_id in pairs:
+        try:
+            a_star_shortest_path(target, start_id, end_id, algorithm=algorithm, stats=stats)
+        except ValueError:
+            pass
+
+    summary = _summarize(timings)
+    summary["no_path"] = stats.failed
+    summary["mean_nodes_settled"] = stats.mean_nodes_settled
+    summary["mean_stale_pops"] = stats.stale_pops / stats.searches if stats.searches else 0.0
+    summary["heap_peak"] = stats.heap_peak
+    ratio = stats.mean_heuristic_ratio
+    summary["mean_heuristic_ratio"] = None if math.isnan(ratio) else ratio
+    return summary
+
+
+def _time_operations(network: TrafficNetwork, count: int, rng: random.Random) -> Dict[str, Any]:
+    roads = list(network.roads.values())
+    sample = [rng.choice(roads) for _ in range(count)]
+
+    def timed(op: Callable[[Road], None], items) -> List[float]:
+        timings = []
+        for item in items:
+            started = time.perf_counter()
+            op(item)
+            timings.append(time.perf_counter() - started)
+        return timings
+
+    lookups = timed(lambda road: network.get_road_between(road.source_id, road.target_id), sample)
+    #distinct roads, closing one twice would measure a no-op
+    distinct = list({road.id: road for road in sample}.values())
+    closes = timed(lambda road: network.close_road(road.id), distinct)
+    reopens = timed(lambda road: network.reopen_road(road.id), distinct)
+
+    node_ids = list(network.intersections)
+    new_roads = [Road(f"bench_{i}", rng.choice(node_ids), rng.choice(node_ids)) for i in range(count)]
+    adds = timed(network.add_road, new_roads)
+
+    return {
+        "get_road_between": _summarize(lookups),
+        "close_road": _summarize(closes),
+        "reopen_road": _summarize(reopens),
+        "add_road": _summarize(adds),
+    }
+
+
+def _summarize(timings: List[float]) -> Dict[str, Any]:
+    """
+    Latency percentiles (milliseconds) and throughput for a list of timings in seconds.
+    Throughput is None if the timings add up to zero.
+    """
+    if not timings:
+        return {"count": 0}
+    ordered = sorted(timings)
+    total = sum(ordered)
+
+    def percentile(p: float) -> float:
+        #nearest rank
+        rank = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+        return ordered[rank] * 1000
+
+    return {
+        "count": len(ordered),
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": ordered[-1] * 1000,
+        #None rather than inf when the timer saw no time at all, inf isn't valid JSON
+        "per_second": len(ordered) / total if total > 0 else None,
+    }
+
+
+def _meta(seed: int, queries: int) -> Dict[str, Any]:
+    return {
+        "seed": seed,
+        "queries": queries,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark TrafficSim on generated networks")
+    parser.add_argument("--kinds", nargs="+", default=list(GENERATORS), choices=list(GENERATORS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc build")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="earlier results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.kinds, args.sizes, args.queries, args.seed, not args.no_memory)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
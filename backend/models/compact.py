@@ -0,0 +1,231 @@
+from array import array
+from typing import List, Mapping, Optional, Sequence
+
+class CompactNetwork:
+    """
+    Array-backed, read-mostly view of a TrafficNetwork in compressed sparse row (CSR) form.
+
+    Intersections are renumbered to integer indices 0..n-1 (in insertion order) and
+    every road contributes one entry in each direction. The neighbors of node i
+    live in targets[offsets[i]:offsets[i + 1]] with matching weights, so the whole
+    graph is a handful of flat typed arrays instead of per-node lists of tuples.
+
+    Closed roads stay in the arrays with edge_open[k] == 0, so closing and reopening
+    a road is a flag flip rather than a rebuild. Searches must skip masked entries.
+    """
+
+    def __init__(self, node_ids: Sequence[str], xs: Sequence[float], ys: Sequence[float],
+                 offsets: Sequence[int], targets: Sequence[int], weights: Sequence[float],
+                 edge_roads: Sequence[int], road_ids: Sequence[str], edge_open: Optional[bytearray] = None,
+                 node_index: Optional[Mapping[str, int]] = None, road_index: Optional[Mapping[str, int]] = None,
+                 road_edges: Optional[Sequence[int]] = None):
+        """
+        Initialize a compact network from prebuilt arrays.
+        Normally you want CompactNetwork.from_network or TrafficNetwork.compile instead.
+
+        Args:
+            node_ids: intersection ID for each node index
+            xs: x coord for each node index
+            ys: y coord for each node index
+            offsets: CSR row offsets, length n + 1
+            targets: neighbor node index for each CSR entry
+            weights: effective weight for each CSR entry
+            edge_roads: index into road_ids for each CSR entry
+            road_ids: road ID for each road index
+            edge_open: 1 if the CSR entry's road is open, 0 if closed, all open if None
+            node_index, road_index, road_edges: lookup tables, built from the arrays if None
+                (models.snapshot passes its own so opening a snapshot stays O(1))
+        """
+        self.node_ids = node_ids
+        self.xs = xs
+        self.ys = ys
+        self.offsets = offsets
+        self.targets = targets
+        self.weights = weights
+        self.edge_roads = edge_roads
+        self.road_ids = road_ids
+        self.edge_open = edge_open if edge_open is not None else bytearray(b"\x01") * len(targets)
+
+        # maps intersection ID -> node index
+        if node_index is None:
+            node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+        self.node_index: Mapping[str, int] = node_index
+
+        # maps road ID -> road index, and road index -> its two CSR positions
+        if road_index is None:
+            road_index = {road_id: r for r, road_id in enumerate(road_ids)}
+        self.road_index: Mapping[str, int] = road_index
+
+        if road_edges is None:
+            road_edges = array('q', [-1]) * (2 * len(road_ids))
+            for k, r in enumerate(edge_roads):
+                # the first entry seen for a road goes in slot 2r, the second in 2r + 1; which
+                # endpoint's row comes first depends on node order, not on the road's direction
+                if road_edges[2 * r] == -1:
+                    road_edges[2 * r] = k
+                else:
+                    road_edges[2 * r + 1] = k
+        self.road_edges = road_edges
+
+        # network version this view reflects (see TrafficNetwork.version)
+        self.version = 0
+
+    @classmethod
+    def from_network(cls, network) -> 'CompactNetwork':
+        """
+        Build the CSR arrays from a TrafficNetwork's intersections and roads.
+
+        Args:
+            network: the TrafficNetwork to compile
+
+        Returns:
+            A new CompactNetwork
+        """
+        node_ids = list(network.intersections)
+        node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+        n = len(node_ids)
+
+        xs = array('d', (network.intersections[node_id].x for node_id in node_ids))
+        ys = array('d', (network.intersections[node_id].y for node_id in node_ids))
+
+        road_ids = []
+        sources = []
+        dests = []
+        road_weights = []
+        road_open = []
+        for road in network.roads.values():
+            road_ids.append(road.id)
+            sources.append(node_index[road.source_id])
+            dests.append(node_index[road.target_id])
+            road_weights.append(road.weight)
+            road_open.append(1 if road.is_open else 0)
+
+        #first pass: count the degree of every node (each road counts for both ends)
+        degree = array('q', bytes(8 * (n + 1)))
+        for u, v in zip(sources, dests):
+            degree[u + 1] += 1
+            degree[v + 1] += 1
+
+        #prefix sum turns degrees into row offsets
+        offsets = degree
+        for i in range(n):
+            offsets[i + 1] += offsets[i]
+
+        #second pass: drop every edge into its row
+        total = offsets[n]
+        targets = array('i', bytes(4 * total))
+        weights = array('d', bytes(8 * total))
+        edge_roads = array('i', bytes(4 * total))
+        edge_open = bytearray(total)
+        cursor = array('q', offsets)
+        for r, (u, v) in enumerate(zip(sources, dests)):
+            w = road_weights[r]
+            is_open = road_open[r]
+            k = cursor[u]
+            targets[k] = v
+            weights[k] = w
+            edge_roads[k] = r
+            edge_open[k] = is_open
+            cursor[u] = k + 1
+
+            k = cursor[v]
+            targets[k] = u
+            weights[k] = w
+            edge_roads[k] = r
+            edge_open[k] = is_open
+            cursor[v] = k + 1
+
+        compact = cls(node_ids, xs, ys, offsets, targets, weights, edge_roads, road_ids, edge_open)
+        compact.version = getattr(network, "version", 0)
+        return compact
+
+    @property
+    def node_count(self) -> int:
+        """Number of intersections in the compact graph."""
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        """Number of directed CSR entries (two per road, open or closed)."""
+        return len(self.targets)
+
+    def index_of(self, intersection_id: str) -> Optional[int]:
+        """
+        Get the node index of an intersection.
+
+        Args:
+            intersection_id: the ID of the intersection
+
+        Returns:
+            The node index if found, None otherwise
+        """
+        return self.node_index.get(intersection_id)
+
+    def neighbors(self, intersection_id: str) -> List[tuple]:
+        """
+        Get the neighbors of an intersection in the same shape as TrafficNetwork.adjacency_list.
+
+        Args:
+            intersection_id: the ID of the intersection
+
+        Returns:
+            A list of (neighbor_id, weight) tuples for the open roads
+        """
+        i = self.node_index[intersection_id]
+        node_ids = self.node_ids
+        return [(node_ids[self.targets[k]], self.weights[k])
+                for k in range(self.offsets[i], self.offsets[i + 1]) if self.edge_open[k]]
+
+    def set_road_weight(self, road_id: str, weight: float) -> bool:
+        """
+        Patch the weight of one road in place (both directions).
+
+        Args:
+            road_id: the ID of the road
+            weight: the new effective weight
+
+        Returns:
+            True if the road is part of this view, False otherwise
+        """
+        r = self.road_index.get(road_id)
+        if r is None:
+            return False
+        self.weights[self.road_edges[2 * r]] = weight
+        self.weights[self.road_edges[2 * r + 1]] = weight
+        return True
+
+    def set_road_open(self, road_id: str, is_open: bool) -> bool:
+        """
+        Mask or unmask one road in place (both directions).
+
+        Args:
+            road_id: the ID of the road
+            is_open: whether searches may use the road
+
+        Returns:
+            True if the road is part of this view, False otherwise
+        """
+        r = self.road_index.get(road_id)
+        if r is None:
+            return False
+        flag = 1 if is_open else 0
+        self.edge_open[self.road_edges[2 * r]] = flag
+        self.edge_open[self.road_edges[2 * r + 1]] = flag
+        return True
+
+    def copy_costs(self) -> 'CompactNetwork':
+        """
+        Get a view with its own copy of the weights and open flags, sharing everything else.
+        Patching the copy (set_road_weight / set_road_open) leaves this view untouched, so
+        readers of the original never see a half-applied change. Copying two flat arrays
+        is much cheaper than compiling the network again.
+
+        Returns:
+            The new CompactNetwork
+        """
+        copy = CompactNetwork(self.node_ids, self.xs, self.ys, self.offsets, self.targets,
+                              array('d', self.weights), self.edge_roads, self.road_ids,
+                              bytearray(self.edge_open), node_index=self.node_index,
+                              road_index=self.road_index, road_edges=self.road_edges)
+        copy.version = self.version
+        return copy
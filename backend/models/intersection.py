@@ -22,6 +22,7 @@ class Intersection:
         self.x = x
         self.y = y
         self.congestion = random.random()
+        self.delay = 0.0 #expected wait to get through, added to the weight of roads touching it
 
     def to_dict(self) -> Dict[str, Any]:
         """
@@ -35,7 +36,8 @@ class Intersection:
             "name": self.name,
             "x": self.x,
             "y": self.y,
-            "congestion": self.congestion
+            "congestion": self.congestion,
+            "delay": self.delay
         }
     
     @classmethod
@@ -54,6 +56,7 @@ class Intersection:
         )
         #get congestion key, default to random if key doesnt exist
         intersection.congestion = data.get("congestion", random.random())
+        intersection.delay = data.get("delay", 0.0)
         return intersection
 
 
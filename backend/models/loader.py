@@ -0,0 +1,285 @@
+#Streaming bulk loader for large network exports (CSV, JSON Lines, GeoJSON)
+import csv
+import json
+import os
+import re
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from .intersection import Intersection
+from .road import Road
+from .network import TrafficNetwork
+
+# how much of a GeoJSON file we read at a time
+_CHUNK_SIZE = 1 << 16
+
+_FEATURES_START = re.compile(r'"features"\s*:\s*\[')
+
+class NetworkLoadError(ValueError):
+    """
+    Raised when a node or edge file has a bad record.
+    Carries the file and line number so the record can be found in a big export.
+    """
+
+    def __init__(self, path: str, line: int, message: str):
+        super().__init__(f"{path}:{line}: {message}")
+        self.path = path
+        self.line = line
+
+
+def load_network(nodes_path: str, edges_path: str,
+                 progress: Optional[Callable[[str, int], None]] = None,
+                 progress_every: int = 100000) -> TrafficNetwork:
+    """
+    Build a network from a node file and an edge file, streaming both.
+
+    The format is picked from the file extension:
+        .csv             header row, nodes need id,x,y (name, congestion, delay optional),
+                         edges need id,source,target (congestion, is_open, volume,
+                         capacity, profile_id optional)
+        .jsonl, .ndjson  one JSON object per line with the same keys as to_dict()
+        .geojson, .json  a FeatureCollection, nodes are Points (id etc. in properties),
+                         edges are any geometry with id, source, target in properties
+
+    Records are read one at a time, never the whole document. Roads are added with
+    TrafficNetwork.add_roads, so weights are computed in one pass and the adjacency
+    list is built once.
+
+    Args:
+        nodes_path: file with the intersections
+        edges_path: file with the roads
+        progress: optional callback(stage, count), stage is "nodes" or "edges"
+        progress_every: call progress every this many records (and once at the end)
+
+    Returns:
+        The loaded TrafficNetwork
+
+    Raises:
+        NetworkLoadError: For a malformed record, a duplicate ID or a road that references
+            an unknown intersection, with the file and line number
+    """
+    network = TrafficNetwork()
+
+    count = 0
+    for line, record in _iter_records(nodes_path, "nodes"):
+        intersection = _parse_intersection(nodes_path, line, record)
+        if intersection.id in network.intersections:
+            raise NetworkLoadError(nodes_path, line, f"duplicate intersection id {intersection.id}")
+        network.add_intersection(intersection)
+        count += 1
+        if progress is not None and count % progress_every == 0:
+            progress("nodes", count)
+    if progress is not None:
+        progress("nodes", count)
+
+    roads = []
+    seen = set()
+    for line, record in _iter_records(edges_path, "edges"):
+        road = _parse_road(edges_path, line, record)
+        if road.id in seen:
+            raise NetworkLoadError(edges_path, line, f"duplicate road id {road.id}")
+        for endpoint in (road.source_id, road.target_id):
+            if endpoint not in network.intersections:
+                raise NetworkLoadError(edges_path, line, f"road {road.id} references unknown intersection {endpoint}")
+        seen.add(road.id)
+        roads.append(road)
+        if progress is not None and len(roads) % progress_every == 0:
+            progress("edges", len(roads))
+
+    network.add_roads(roads)
+    if progress is not None:
+        progress("edges", len(roads))
+    return network
+
+
+def _iter_records(path: str, kind: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (line number, flat record dict) from a node or edge file.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return _iter_csv(path)
+    if extension in (".jsonl", ".ndjson"):
+        return _iter_json_lines(path)
+    if extension in (".geojson", ".json"):
+        return _iter_geojson(path, kind)
+    raise ValueError(f"Unsupported network file format {extension} ({path})")
+
+
+def _iter_csv(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            # empty cells mean "use the default"
+            yield reader.line_num, {key: value for key, value in row.items() if value not in ("", None)}
+
+
+def _iter_json_lines(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise NetworkLoadError(path, line_number, f"invalid JSON: {error.msg}")
+            if not isinstance(record, dict):
+                raise NetworkLoadError(path, line_number, "expected a JSON object")
+            yield line_number, record
+
+
+def _iter_geojson(path: str, kind: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Stream the features of a FeatureCollection one at a time.
+    Only the current feature (plus one read chunk) is ever held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer = ""
+        line = 1
+        eof = False
+
+        def fill():
+            nonlocal buffer, eof
+            chunk = f.read(_CHUNK_SIZE)
+            if not chunk:
+                eof = True
+            buffer += chunk
+
+        #skip ahead to the opening bracket of the features array
+        while True:
+            match = _FEATURES_START.search(buffer)
+            if match:
+                line += buffer.count("\n", 0, match.end())
+                buffer = buffer[match.end():]
+                break
+            if eof:
+                raise NetworkLoadError(path, line, "no \"features\" array found")
+            # keep a tail in case the key is split across two chunks
+            keep = max(0, len(buffer) - 64)
+            line += buffer.count("\n", 0, keep)
+            buffer = buffer[keep:]
+            fill()
+
+        pos = 0
+        while True:
+            #skip whitespace and commas between features
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                    if buffer[pos] == "\n":
+                        line += 1
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    break
+                buffer = buffer[pos:]
+                pos = 0
+                fill()
+
+            if pos >= len(buffer):
+                raise NetworkLoadError(path, line, "unterminated \"features\" array")
+            if buffer[pos] == "]":
+                return
+
+            try:
+                feature, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as error:
+                if eof:
+                    raise NetworkLoadError(path, line, f"invalid JSON: {error.msg}")
+                # most likely the feature runs past the end of the buffer, read more
+                buffer = buffer[pos:]
+                pos = 0
+                fill()
+                continue
+
+            yield line, _flatten_feature(path, line, feature, kind)
+            line += buffer.count("\n", pos, end)
+            pos = end
+
+
+def _flatten_feature(path: str, line: int, feature: Any, kind: str) -> Dict[str, Any]:
+    """
+    Turn a GeoJSON feature into the same flat record the other formats give.
+    """
+    if not isinstance(feature, dict):
+        raise NetworkLoadError(path, line, "expected a GeoJSON feature object")
+    record = dict(feature.get("properties") or {})
+    if "id" not in record and "id" in feature:
+        record["id"] = feature["id"]
+    if kind == "nodes":
+        geometry = feature.get("geometry") or {}
+        coordinates = geometry.get("coordinates")
+        if geometry.get("type") != "Point" or not isinstance(coordinates, list) or len(coordinates) < 2:
+            raise NetworkLoadError(path, line, "intersection feature needs a Point geometry")
+        record["x"], record["y"] = coordinates[0], coordinates[1]
+    return record
+
+
+def _parse_intersection(path: str, line: int, record: Dict[str, Any]) -> Intersection:
+    """
+    Build an Intersection from a flat record, with line-numbered errors.
+    """
+    intersection_id = _required(path, line, record, "id")
+    intersection = Intersection(
+        id=str(intersection_id),
+        x=_number(path, line, record, "x"),
+        y=_number(path, line, record, "y"),
+        name=record.get("name")
+    )
+    if "congestion" in record:
+        intersection.congestion = _number(path, line, record, "congestion")
+    if record.get("delay") is not None:
+        intersection.delay = _number(path, line, record, "delay")
+    return intersection
+
+
+def _parse_road(path: str, line: int, record: Dict[str, Any]) -> Road:
+    """
+    Build a Road from a flat record, with line-numbered errors.
+    """
+    road = Road(
+        id=str(_required(path, line, record, "id")),
+        source_id=str(_required(path, line, record, "source")),
+        target_id=str(_required(path, line, record, "target"))
+    )
+    if "congestion" in record:
+        road.congestion = _number(path, line, record, "congestion")
+    if "is_open" in record:
+        road.is_open = _flag(path, line, record["is_open"])
+    if record.get("volume") is not None:
+        road.volume = _number(path, line, record, "volume")
+    # capacity and profile_id are null in to_dict() when unset
+    if record.get("capacity") is not None:
+        road.capacity = _number(path, line, record, "capacity")
+    if record.get("profile_id") is not None:
+        road.profile_id = _integer(path, line, record, "profile_id")
+    return road
+
+
+def _required(path: str, line: int, record: Dict[str, Any], key: str) -> Any:
+    if key not in record or record[key] is None:
+        raise NetworkLoadError(path, line, f"missing required field \"{key}\"")
+    return record[key]
+
+
+def _number(path: str, line: int, record: Dict[str, Any], key: str) -> float:
+    value = _required(path, line, record, key)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise NetworkLoadError(path, line, f"field \"{key}\" is not a number: {value!r}")
+
+
+def _integer(path: str, line: int, record: Dict[str, Any], key: str) -> int:
+    value = _number(path, line, record, key)
+    if not value.is_integer():
+        raise NetworkLoadError(path, line, f"field \"{key}\" is not an integer: {record[key]!r}")
+    return int(value)
+
+
+def _flag(path: str, line: int, value: Any) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes"):
+        return True
+    if text in ("0", "false", "no"):
+        return False
+    raise NetworkLoadError(path, line, f"field \"is_open\" is not a boolean: {value!r}")
@@ -1,6 +1,10 @@
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Iterable
+import math
 from .intersection import Intersection
 from .road import Road
+from .compact import CompactNetwork
+from .weights import CongestionWeight
+from .spatial import SpatialIndex
 
 class TrafficNetwork:
     """
@@ -22,6 +26,29 @@ class TrafficNetwork:
         
         # maps each intersection ID to a list of (neighbor_id, weight) tuples
         self.adjacency_list: Dict[str, List[Tuple[str, float]]] = {}
+
+        # parallel to adjacency_list: the (road_id, side) that owns each entry,
+        # side 0 is the entry in the source's list and side 1 the one in the target's list
+        self._adjacency_refs: Dict[str, List[Tuple[str, int]]] = {}
+
+        # maps each open road ID to [position in source's list, position in target's list]
+        # so a single road's entries can be patched without searching
+        self._road_slots: Dict[str, List[int]] = {}
+
+        # maps an unordered endpoint pair (see _pair_key) to the IDs of every road joining them
+        self._endpoint_index: Dict[Tuple[str, str], List[str]] = {}
+
+        # intersection coordinates for nearest/radius/box lookups, kept in step by add_intersection
+        self.spatial_index = SpatialIndex()
+
+        # turns a road's length into its effective weight, see models.weights
+        self.weight_formula = CongestionWeight()
+
+        # bumped on every change to the graph or its weights, so caches know when to invalidate
+        self.version = 0
+
+        # cached CSR view from compile(), dropped whenever the graph changes
+        self._compact: Optional[CompactNetwork] = None
     
     def add_intersection(self, intersection: Intersection) -> None:
         """
@@ -31,10 +58,14 @@ class TrafficNetwork:
             The intersection to add
         """
         self.intersections[intersection.id] = intersection
+        self.spatial_index.insert(intersection.id, intersection.x, intersection.y)
+        self._compact = None
+        self.version += 1
         
         # make an empty adjacency list entry for this intersection
         if intersection.id not in self.adjacency_list:
             self.adjacency_list[intersection.id] = []
+            self._adjacency_refs[intersection.id] = []
     
     def add_road(self, road: Road) -> None:
         """
@@ -44,6 +75,13 @@ class TrafficNetwork:
         The road to add
         """
         self.roads[road.id] = road
+        self._compact = None
+        self.version += 1
+
+        # index the road by its endpoints, parallel roads share one bucket
+        parallel = self._endpoint_index.setdefault(_pair_key(road.source_id, road.target_id), [])
+        if road.id not in parallel:
+            parallel.append(road.id)
         
         # Calculate the road's effective weight based on distance and congestion
         road.calculate_effective_weight(self)
@@ -51,13 +89,84 @@ class TrafficNetwork:
         #becase this is an undirected graph, we need to update adjacency list in both directions 
         if road.source_id not in self.adjacency_list:
             self.adjacency_list[road.source_id] = []
+            self._adjacency_refs[road.source_id] = []
         if road.target_id not in self.adjacency_list:
             self.adjacency_list[road.target_id] = []
+            self._adjacency_refs[road.target_id] = []
         
         # Only add the connection if the road is open
         if road.is_open:
-            self.adjacency_list[road.source_id].append((road.target_id, road.weight))
-            self.adjacency_list[road.target_id].append((road.source_id, road.weight))
+            self._attach(road)
+
+    def add_roads(self, roads: Iterable[Road], compute_weights: bool = True) -> None:
+        """
+        Add many roads at once.
+        Same result as calling add_road for each one, but the distances are computed in a
+        single pass over coordinate lists instead of two intersection lookups and a sqrt per
+        road, and the network version is bumped once.
+
+        Args:
+            roads: the roads to add
+            compute_weights: False keeps each road's current weight as is
+                (used when restoring saved data)
+
+        Raises:
+            ValueError: If a road references an intersection that isn't in the network
+        """
+        roads = list(roads)
+        if not roads:
+            return
+        self._compact = None
+        self.version += 1
+
+        intersections = self.intersections
+        source_x, source_y, target_x, target_y = [], [], [], []
+        for road in roads:
+            source = intersections.get(road.source_id)
+            target = intersections.get(road.target_id)
+            if source is None or target is None:
+                missing = road.source_id if source is None else road.target_id
+                raise ValueError(f"Road {road.id} references unknown intersection {missing}")
+            source_x.append(source.x)
+            source_y.append(source.y)
+            target_x.append(target.x)
+            target_y.append(target.y)
+
+        if compute_weights:
+            dx = [b - a for a, b in zip(source_x, target_x)]
+            dy = [b - a for a, b in zip(source_y, target_y)]
+            distances = list(map(math.hypot, dx, dy))
+            delays = [(intersections[road.source_id].delay + intersections[road.target_id].delay) / 2
+                      for road in roads]
+            for road, weight, delay in zip(roads, self.weight_formula.batch(distances, roads), delays):
+                road.weight = weight + delay
+
+        for road in roads:
+            self.roads[road.id] = road
+
+            parallel = self._endpoint_index.setdefault(_pair_key(road.source_id, road.target_id), [])
+            if road.id not in parallel:
+                parallel.append(road.id)
+
+            if road.is_open:
+                self._attach(road)
+
+    def _attach(self, road: Road) -> None:
+        """
+        Append a road's two adjacency entries and remember where they went.
+
+        Args:
+            road: the (open) road to connect
+        """
+        source_list = self.adjacency_list[road.source_id]
+        source_list.append((road.target_id, road.weight))
+        self._adjacency_refs[road.source_id].append((road.id, 0))
+        source_pos = len(source_list) - 1
+
+        target_list = self.adjacency_list[road.target_id]
+        target_list.append((road.source_id, road.weight))
+        self._adjacency_refs[road.target_id].append((road.id, 1))
+        self._road_slots[road.id] = [source_pos, len(target_list) - 1]
     
     def get_intersection(self, intersection_id: str) -> Optional[Intersection]:
         """
@@ -86,6 +195,8 @@ class TrafficNetwork:
     def get_road_between(self, source_id: str, target_id: str) -> Optional[Road]:
         """
         Find a road connecting two intersections.
+        If several roads join the same pair, the cheapest open one is returned since
+        that is the one routing uses. If they are all closed the first one added is returned.
         
         Args:
             source_id (str): ID of the first intersection
@@ -94,12 +205,32 @@ class TrafficNetwork:
         Returns:
             Optional[Road]: The connecting road if found, None otherwise
         """
-        for road in self.roads.values():
-            # Check for the road in both directions
-            if ((road.source_id == source_id and road.target_id == target_id) or
-                (road.source_id == target_id and road.target_id == source_id)):
-                return road
-        return None
+        road_ids = self._endpoint_index.get(_pair_key(source_id, target_id))
+        if not road_ids:
+            return None
+        if len(road_ids) == 1:
+            return self.roads[road_ids[0]]
+
+        best = None
+        for road_id in road_ids:
+            road = self.roads[road_id]
+            if road.is_open and (best is None or road.weight < best.weight):
+                best = road
+        return best if best is not None else self.roads[road_ids[0]]
+
+    def get_roads_between(self, source_id: str, target_id: str) -> List[Road]:
+        """
+        Find every road connecting two intersections, open or closed.
+        
+        Args:
+            source_id (str): ID of the first intersection
+            target_id (str): ID of the second intersection
+            
+        Returns:
+            List[Road]: The connecting roads in the order they were added
+        """
+        road_ids = self._endpoint_index.get(_pair_key(source_id, target_id), [])
+        return [self.roads[road_id] for road_id in road_ids]
     
     def close_road(self, road_id: str) -> None:
         """
@@ -108,24 +239,255 @@ class TrafficNetwork:
         Args:
             road_id (str): The ID of the road to close
         """
-        road = self.get_road(road_id)
-        if road:
+        self.close_roads([road_id])
+
+    def reopen_road(self, road_id: str) -> None:
+        """
+        Reopen a closed road and put it back into the adjacency list.
+        
+        Args:
+            road_id (str): The ID of the road to reopen
+        """
+        self.reopen_roads([road_id])
+
+    def close_roads(self, road_ids: Iterable[str]) -> int:
+        """
+        Close a batch of roads in one pass.
+        Each closure is O(1), unknown or already closed roads are skipped, and the
+        network version is bumped once for the whole batch.
+
+        Args:
+            road_ids: IDs of the roads to close
+
+        Returns:
+            The number of roads that were actually closed
+        """
+        changed = 0
+        for road_id in road_ids:
+            road = self.roads.get(road_id)
+            if road is None or not road.is_open:
+                continue
             road.is_open = False
             """
             
             Remove the road from the adjacency list in both directions
-            Starting from the source intersection, we filter the the list of connections to keep only the connections that don’t lead to the target intersection of the closed road
-
-            We do the same for the target intersection.
+            We know exactly where the road's two entries sit (self._road_slots), so each
+            one is removed by moving the last entry of that list into its place. That is O(1)
+            and only touches this road, so a parallel road between the same intersections stays.
 
             For example if we have a road connecting intersection A and B, we remove B from A’s list of neighbors and A from B’s
             
             """ 
-            self.adjacency_list[road.source_id] = [
-                (node_id, weight) for node_id, weight in self.adjacency_list[road.source_id]
-                if node_id != road.target_id
-            ]
-            self.adjacency_list[road.target_id] = [
-                (node_id, weight) for node_id, weight in self.adjacency_list[road.target_id]
-                if node_id != road.source_id
-            ]
\ No newline at end of file
+            slots = self._road_slots.get(road_id)
+            if slots is not None:
+                self._swap_remove(road.source_id, slots[0])
+                # slots is the live list in _road_slots, so if the first removal moved our other
+                # entry (a self loop has both in one list) slots[1] already holds its new position
+                self._swap_remove(road.target_id, slots[1])
+                del self._road_slots[road_id]
+
+            # the compiled view keeps closed roads as masked entries, so just flip the mask
+            if self._compact is not None:
+                self._compact.set_road_open(road_id, False)
+            changed += 1
+
+        if changed:
+            self._bump_version()
+        return changed
+
+    def reopen_roads(self, road_ids: Iterable[str]) -> int:
+        """
+        Reopen a batch of roads in one pass.
+        Each reopening appends the road's two entries in O(1), unknown or already open
+        roads are skipped, and the network version is bumped once for the whole batch.
+
+        Args:
+            road_ids: IDs of the roads to reopen
+
+        Returns:
+            The number of roads that were actually reopened
+        """
+        changed = 0
+        for road_id in road_ids:
+            road = self.roads.get(road_id)
+            if road is None or road.is_open:
+                continue
+            road.is_open = True
+            self._attach(road)
+            if self._compact is not None:
+                self._compact.set_road_open(road_id, True)
+            changed += 1
+
+        if changed:
+            self._bump_version()
+        return changed
+
+    def _swap_remove(self, node_id: str, pos: int) -> None:
+        """
+        Remove one adjacency entry in O(1) by moving the last entry into its position.
+
+        Args:
+            node_id: the intersection whose list we remove from
+            pos: the position of the entry to remove
+        """
+        entries = self.adjacency_list[node_id]
+        refs = self._adjacency_refs[node_id]
+        last = len(entries) - 1
+        if pos != last:
+            entries[pos] = entries[last]
+            refs[pos] = refs[last]
+            moved_road_id, moved_side = refs[pos]
+            self._road_slots[moved_road_id][moved_side] = pos
+        entries.pop()
+        refs.pop()
+
+    def update_congestion(self, updates: Dict[str, float]) -> int:
+        """
+        Set the congestion of a batch of roads and refresh their weights in place.
+        Only the changed roads are touched, so this is O(len(updates)) no matter how
+        big the network is. Unknown road IDs are skipped, like close_road does.
+
+        Args:
+            updates: maps road ID -> new congestion value
+
+        Returns:
+            The number of roads that were updated
+        """
+        updated = 0
+        for road_id, congestion in updates.items():
+            road = self.roads.get(road_id)
+            if road is None:
+                continue
+            road.congestion = congestion
+            self._refresh_weight(road)
+            updated += 1
+
+        if updated:
+            self._bump_version()
+        return updated
+
+    def update_intersection_delays(self, delays: Dict[str, float]) -> int:
+        """
+        Set the delay of a batch of intersections and refresh the weights of every road
+        touching them (open or closed) in place. Unknown intersection IDs are skipped.
+
+        Args:
+            delays: maps intersection ID -> new delay
+
+        Returns:
+            The number of intersections that were updated
+        """
+        compact = self.compile()
+        offsets, edge_roads = compact.offsets, compact.edge_roads
+        touched = set()
+        updated = 0
+        for intersection_id, delay in delays.items():
+            intersection = self.intersections.get(intersection_id)
+            if intersection is None:
+                continue
+            intersection.delay = delay
+            i = compact.index_of(intersection_id)
+            for k in range(offsets[i], offsets[i + 1]):
+                touched.add(edge_roads[k])
+            updated += 1
+
+        for r in touched:
+            self._refresh_weight(self.roads[compact.road_ids[r]])
+        if updated:
+            self._bump_version()
+        return updated
+
+    def _refresh_weight(self, road: Road) -> None:
+        """
+        Recompute one road's weight and patch it into the adjacency list and compiled view.
+        """
+        weight = road.calculate_effective_weight(self)
+
+        # patch the two adjacency entries where they sit
+        slots = self._road_slots.get(road.id)
+        if slots is not None:
+            self.adjacency_list[road.source_id][slots[0]] = (road.target_id, weight)
+            self.adjacency_list[road.target_id][slots[1]] = (road.source_id, weight)
+
+        # and the compiled view if there is one, so it doesn't need a rebuild
+        if self._compact is not None:
+            self._compact.set_road_weight(road.id, weight)
+
+    def recompute_weights(self, formula=None) -> None:
+        """
+        Recompute the effective weight of every road in one pass.
+        Use this after a full congestion/volume feed, a coordinate fix or to switch formulas.
+
+        The compiled coordinate arrays are refreshed from the intersections (so coordinate
+        fixes are picked up), every distance is computed in a single map over them, then the
+        formula's batch() turns all distances into weights at once (plus the intersection
+        delays, see Road.calculate_effective_weight). The adjacency list and
+        compiled view are patched in place.
+
+        Args:
+            formula: optional new weight formula (see models.weights), kept for later updates
+        """
+        if formula is not None:
+            self.weight_formula = formula
+
+        compact = self.compile()
+        xs, ys, targets, road_edges = compact.xs, compact.ys, compact.targets, compact.road_edges
+        for i, node_id in enumerate(compact.node_ids):
+            intersection = self.intersections[node_id]
+            xs[i] = intersection.x
+            ys[i] = intersection.y
+        roads = [self.roads[road_id] for road_id in compact.road_ids]
+
+        #road r's two entries point at its two endpoints, in no particular order,
+        #which is fine since both the distance and the delay sum are symmetric
+        target_nodes = [targets[road_edges[2 * r]] for r in range(len(roads))]
+        source_nodes = [targets[road_edges[2 * r + 1]] for r in range(len(roads))]
+        dx = [xs[t] - xs[s] for s, t in zip(source_nodes, target_nodes)]
+        dy = [ys[t] - ys[s] for s, t in zip(source_nodes, target_nodes)]
+        distances = list(map(math.hypot, dx, dy))
+        new_weights = self.weight_formula.batch(distances, roads)
+        intersections = [self.intersections[node_id] for node_id in compact.node_ids]
+        node_delays = [intersection.delay for intersection in intersections]
+        new_weights = [w + (node_delays[s] + node_delays[t]) / 2
+                       for w, s, t in zip(new_weights, source_nodes, target_nodes)]
+
+        weights = compact.weights
+        for r, (road, weight) in enumerate(zip(roads, new_weights)):
+            road.weight = weight
+            weights[road_edges[2 * r]] = weight
+            weights[road_edges[2 * r + 1]] = weight
+            slots = self._road_slots.get(road.id)
+            if slots is not None:
+                self.adjacency_list[road.source_id][slots[0]] = (road.target_id, weight)
+                self.adjacency_list[road.target_id][slots[1]] = (road.source_id, weight)
+
+        self._bump_version()
+
+    def _bump_version(self) -> None:
+        """
+        Record a change that the cached compiled view has already been patched for.
+        """
+        self.version += 1
+        if self._compact is not None:
+            self._compact.version = self.version
+
+    def compile(self) -> CompactNetwork:
+        """
+        Get the compact array-backed (CSR) form of the network.
+        The result is cached until the next add_intersection or add_road, so it is cheap
+        to call before every query. Congestion updates, closures and reopenings patch the
+        cached view in place instead of dropping it.
+
+        Returns:
+            CompactNetwork: the compiled network
+        """
+        if self._compact is None:
+            self._compact = CompactNetwork.from_network(self)
+        return self._compact
+
+
+def _pair_key(a: str, b: str) -> Tuple[str, str]:
+    """
+    Order-independent key for a pair of intersection IDs, since roads are undirected.
+    """
+    return (a, b) if a <= b else (b, a)
@@ -0,0 +1,122 @@
+#Piecewise-linear congestion profiles over the day, shared between roads
+from array import array
+from bisect import bisect_right
+from typing import Dict, Sequence, Tuple
+
+# seconds in a day, profiles repeat with this period
+DAY = 86400.0
+
+class CongestionProfiles:
+    """
+    Store of congestion-over-time profiles.
+
+    A profile is a list of (time, congestion) breakpoints within one period, with linear
+    interpolation between them and wrap-around from the last breakpoint to the first one
+    of the next day. Roads point at a profile through road.profile_id, so thousands of
+    roads with the same pattern (e.g. "arterial, weekday") share one copy.
+
+    All breakpoints of all profiles live in two flat arrays, with an offsets array marking
+    where each profile starts, so memory is a few bytes per breakpoint no matter how
+    many roads use them. Identical profiles are stored once.
+    """
+
+    def __init__(self, period: float = DAY):
+        """
+        Args:
+            period: length of one cycle in the same units as departure times (default a day in seconds)
+        """
+        self.period = period
+        self.offsets = array('q', [0])
+        self.times = array('d')
+        self.values = array('d')
+
+        # breakpoints -> profile ID, used to share identical profiles
+        self._known: Dict[Tuple[Tuple[float, float], ...], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def add_profile(self, times: Sequence[float], values: Sequence[float]) -> int:
+        """
+        Register a profile, or find the identical one already stored.
+
+        Args:
+            times: breakpoint times, strictly increasing, within [0, period)
+            values: congestion at each breakpoint, never negative (time-dependent A* relies on
+                cost >= distance for its heuristic)
+
+        Returns:
+            The profile ID to put in road.profile_id
+
+        Raises:
+            ValueError: If the breakpoints are empty, mismatched, unsorted, out of range or negative
+        """
+        if not times or len(times) != len(values):
+            raise ValueError("A profile needs the same, non-zero number of times and values")
+        for i, t in enumerate(times):
+            if not 0 <= t < self.period:
+                raise ValueError(f"Profile time {t} is outside [0, {self.period})")
+            if i and t <= times[i - 1]:
+                raise ValueError("Profile times must be strictly increasing")
+        if min(values) < 0:
+            raise ValueError("Profile congestion can't be negative")
+
+        key = tuple(zip((float(t) for t in times), (float(v) for v in values)))
+        profile_id = self._known.get(key)
+        if profile_id is not None:
+            return profile_id
+
+        self.times.extend(float(t) for t in times)
+        self.values.extend(float(v) for v in values)
+        self.offsets.append(len(self.times))
+        profile_id = len(self.offsets) - 2
+        self._known[key] = profile_id
+        return profile_id
+
+    def congestion_at(self, profile_id: int, t: float) -> float:
+        """
+        Congestion of a profile at a point in time.
+
+        Args:
+            profile_id: ID from add_profile
+            t: time, any value (it is wrapped into one period)
+
+        Returns:
+            The interpolated congestion
+        """
+        first, last = self.offsets[profile_id], self.offsets[profile_id + 1]
+        times, values = self.times, self.values
+        if last - first == 1:
+            return values[first]
+
+        t %= self.period
+        i = bisect_right(times, t, first, last) - 1
+
+        #before the first breakpoint we're still on yesterday's last segment
+        if i < first:
+            t0, v0 = times[last - 1] - self.period, values[last - 1]
+            t1, v1 = times[first], values[first]
+        elif i == last - 1:
+            t0, v0 = times[i], values[i]
+            t1, v1 = times[first] + self.period, values[first]
+        else:
+            t0, v0 = times[i], values[i]
+            t1, v1 = times[i + 1], values[i + 1]
+
+        return v0 + (v1 - v0) * (t - t0) / (t1 - t0)
+
+    def apply(self, network, t: float) -> int:
+        """
+        Set every profiled road's static congestion to its value at time t.
+        Handy for running the regular (static) searches "as of" a time of day.
+
+        Args:
+            network: the TrafficNetwork to update
+            t: time of day
+
+        Returns:
+            The number of roads updated
+        """
+        updates = {road.id: self.congestion_at(road.profile_id, t)
+                   for road in network.roads.values() if road.profile_id is not None}
+        return network.update_congestion(updates)
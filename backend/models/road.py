@@ -24,11 +24,16 @@ class Road:
         self.weight = weight if weight is not None else 1.0
         self.congestion = 0.5 #default moderate congestion
         self.is_open = True #default open
+        self.volume = 0.0 #vehicles using the road, for volume based weight formulas
+        self.capacity: Optional[float] = None #None means unlimited
+        self.profile_id: Optional[int] = None #congestion over the day, see models.profiles
 
     def calculate_effective_weight(self, network):
         """
         Calculates the effective weight of the road to be used in algo
-        Will be using the distance and the congestion to calculate
+        Will be using the distance and the network's weight formula
+        (by default distance * (1 + congestion), see models.weights),
+        plus half the delay of each end intersection
         Args: network - object containing the intersections
         returns: Float representing the effective weight of the road
         """
@@ -41,7 +46,10 @@ class Road:
 
         #adjust weight according to congestion
 
-        effective_weight = distance * (1 + self.congestion)
+        effective_weight = network.weight_formula(distance, self)
+
+        #a road is charged half of each end's delay, since it can be driven either way
+        effective_weight += (source.delay + target.delay) / 2
         self.weight = effective_weight
         return effective_weight
     
@@ -58,7 +66,10 @@ class Road:
             "target": self.target_id,
             "weight": self.weight,
             "congestion": self.congestion,
-            "is_open": self.is_open
+            "is_open": self.is_open,
+            "volume": self.volume,
+            "capacity": self.capacity,
+            "profile_id": self.profile_id
         }
     
     @classmethod
@@ -80,4 +91,7 @@ class Road:
         )
         road.congestion = data.get("congestion", 0.5)
         road.is_open = data.get("is_open", True)
+        road.volume = data.get("volume", 0.0)
+        road.capacity = data.get("capacity")
+        road.profile_id = data.get("profile_id")
         return road
\ No newline at end of file
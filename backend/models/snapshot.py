@@ -0,0 +1,311 @@
+#Versioned binary snapshots of a network, readable through mmap with no parsing
+from array import array
+from typing import Iterator, Optional, Sequence
+import math
+import mmap
+import struct
+import sys
+from .intersection import Intersection
+from .road import Road
+from .network import TrafficNetwork
+from .compact import CompactNetwork
+
+_MAGIC = b"TSNP"
+_FORMAT_VERSION = 2
+
+# magic, format version, node count, road count, network version
+_HEADER = struct.Struct("<4sIqqq")
+
+# every section is stored as (offset, length in bytes) in this order right after the header
+_SECTIONS = [
+    ("node_id_bytes", 'B'), ("node_id_offsets", 'q'), ("node_id_order", 'i'),
+    ("name_bytes", 'B'), ("name_offsets", 'q'),
+    ("xs", 'd'), ("ys", 'd'), ("node_congestion", 'd'), ("node_delays", 'd'),
+    ("road_id_bytes", 'B'), ("road_id_offsets", 'q'), ("road_id_order", 'i'),
+    ("road_sources", 'i'), ("road_targets", 'i'), ("road_weights", 'd'),
+    ("road_congestion", 'd'), ("road_open", 'B'), ("road_volumes", 'd'), ("road_capacities", 'd'),
+    ("road_profiles", 'i'),
+    ("offsets", 'q'), ("targets", 'i'), ("weights", 'd'),
+    ("edge_roads", 'i'), ("edge_open", 'B'), ("road_edges", 'q'),
+]
+_TABLE = struct.Struct("<" + "qq" * len(_SECTIONS))
+
+# sections start on 8 byte boundaries so typed views are aligned
+_ALIGN = 8
+
+
+def _check_byte_order() -> None:
+    # arrays are written and mapped as-is, and the format is defined as little-endian
+    if sys.byteorder != "little":
+        raise ValueError("Network snapshots are only supported on little-endian machines")
+
+
+def save_snapshot(network: TrafficNetwork, path: str) -> None:
+    """
+    Write the whole network to a binary snapshot file.
+
+    The file holds intersections (IDs, names, coords, congestion, delay), roads (IDs,
+    endpoints, weights, congestion, is_open, volume, capacity, profile_id) and the CSR
+    adjacency, each as a flat little-endian array. open_snapshot can then map it read-only
+    without parsing anything. Profile IDs are saved as they are, the CongestionProfiles
+    store they point into is kept by the caller.
+
+    Args:
+        network: the network to save
+        path: file to write
+    """
+    _check_byte_order()
+    compact = CompactNetwork.from_network(network)
+    intersections = [network.intersections[node_id] for node_id in compact.node_ids]
+    roads = [network.roads[road_id] for road_id in compact.road_ids]
+
+    node_id_bytes, node_id_offsets = _pack_strings(compact.node_ids)
+    name_bytes, name_offsets = _pack_strings([i.name for i in intersections])
+    road_id_bytes, road_id_offsets = _pack_strings(compact.road_ids)
+
+    sections = {
+        "node_id_bytes": node_id_bytes,
+        "node_id_offsets": node_id_offsets,
+        "node_id_order": _sorted_order(compact.node_ids),
+        "name_bytes": name_bytes,
+        "name_offsets": name_offsets,
+        "xs": compact.xs,
+        "ys": compact.ys,
+        "node_congestion": array('d', (i.congestion for i in intersections)),
+        "node_delays": array('d', (i.delay for i in intersections)),
+        "road_id_bytes": road_id_bytes,
+        "road_id_offsets": road_id_offsets,
+        "road_id_order": _sorted_order(compact.road_ids),
+        "road_sources": array('i', (compact.node_index[r.source_id] for r in roads)),
+        "road_targets": array('i', (compact.node_index[r.target_id] for r in roads)),
+        "road_weights": array('d', (r.weight for r in roads)),
+        "road_congestion": array('d', (r.congestion for r in roads)),
+        "road_open": bytes(1 if r.is_open else 0 for r in roads),
+        "road_volumes": array('d', (r.volume for r in roads)),
+        #nan stands for no capacity
+        "road_capacities": array('d', (math.nan if r.capacity is None else r.capacity for r in roads)),
+        #-1 stands for no profile
+        "road_profiles": array('i', (-1 if r.profile_id is None else r.profile_id for r in roads)),
+        "offsets": compact.offsets,
+        "targets": compact.targets,
+        "weights": compact.weights,
+        "edge_roads": compact.edge_roads,
+        "edge_open": bytes(compact.edge_open),
+        "road_edges": compact.road_edges,
+    }
+
+    payloads = [_to_bytes(sections[name]) for name, _ in _SECTIONS]
+    position = _align(_HEADER.size + _TABLE.size)
+    table = []
+    for payload in payloads:
+        table.extend((position, len(payload)))
+        position = _align(position + len(payload))
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _FORMAT_VERSION, compact.node_count, len(compact.road_ids),
+                             network.version))
+        f.write(_TABLE.pack(*table))
+        for (offset, _), payload in zip(zip(table[::2], table[1::2]), payloads):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(payload)
+
+
+def open_snapshot(path: str) -> CompactNetwork:
+    """
+    Memory-map a snapshot read-only as a CompactNetwork.
+
+    Nothing is parsed or copied: the arrays are views straight into the file, so opening
+    takes the same time for any map size, and every process that opens the same file
+    shares one copy in the OS page cache. IDs are decoded on demand and looked up by
+    binary search over a sorted order stored in the file.
+
+    The result can be searched like any compiled network, but it is read-only:
+    congestion updates or closures need a TrafficNetwork (see load_snapshot).
+
+    Args:
+        path: snapshot file written by save_snapshot
+
+    Returns:
+        A read-only CompactNetwork
+
+    Raises:
+        ValueError: If the file is not a snapshot or uses an unknown format version
+    """
+    sections, version = _map_sections(path)
+    node_ids = _StringTable(sections["node_id_bytes"], sections["node_id_offsets"])
+    road_ids = _StringTable(sections["road_id_bytes"], sections["road_id_offsets"])
+
+    compact = CompactNetwork(
+        node_ids, sections["xs"], sections["ys"],
+        sections["offsets"], sections["targets"], sections["weights"],
+        sections["edge_roads"], road_ids, sections["edge_open"],
+        node_index=_SortedIndex(node_ids, sections["node_id_order"]),
+        road_index=_SortedIndex(road_ids, sections["road_id_order"]),
+        road_edges=sections["road_edges"]
+    )
+    compact.version = version
+    return compact
+
+
+def load_snapshot(path: str) -> TrafficNetwork:
+    """
+    Rebuild a full, mutable TrafficNetwork from a snapshot.
+    Weights are restored as saved rather than recomputed.
+
+    Args:
+        path: snapshot file written by save_snapshot
+
+    Returns:
+        A new TrafficNetwork
+    """
+    sections, _ = _map_sections(path)
+    node_ids = list(_StringTable(sections["node_id_bytes"], sections["node_id_offsets"]))
+    road_ids = _StringTable(sections["road_id_bytes"], sections["road_id_offsets"])
+    names = _StringTable(sections["name_bytes"], sections["name_offsets"])
+
+    network = TrafficNetwork()
+    for i, node_id in enumerate(node_ids):
+        intersection = Intersection(node_id, sections["xs"][i], sections["ys"][i], names[i])
+        intersection.congestion = sections["node_congestion"][i]
+        intersection.delay = sections["node_delays"][i]
+        network.add_intersection(intersection)
+
+    roads = []
+    for r, road_id in enumerate(road_ids):
+        road = Road(road_id, node_ids[sections["road_sources"][r]], node_ids[sections["road_targets"][r]],
+                    sections["road_weights"][r])
+        road.congestion = sections["road_congestion"][r]
+        road.is_open = bool(sections["road_open"][r])
+        road.volume = sections["road_volumes"][r]
+        capacity = sections["road_capacities"][r]
+        road.capacity = None if math.isnan(capacity) else capacity
+        profile_id = sections["road_profiles"][r]
+        road.profile_id = None if profile_id < 0 else profile_id
+        roads.append(road)
+    network.add_roads(roads, compute_weights=False)
+    return network
+
+
+def _map_sections(path: str):
+    """
+    Map a snapshot file and slice it into typed views, one per section.
+
+    Returns:
+        Tuple of (section name -> memoryview, saved network version)
+    """
+    _check_byte_order()
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+
+    if len(view) < _HEADER.size + _TABLE.size:
+        raise ValueError(f"{path} is not a network snapshot")
+    magic, format_version, _, _, version = _HEADER.unpack_from(view, 0)
+    if magic != _MAGIC:
+        raise ValueError(f"{path} is not a network snapshot")
+    if format_version != _FORMAT_VERSION:
+        raise ValueError(f"Unsupported network snapshot format {format_version}")
+
+    table = _TABLE.unpack_from(view, _HEADER.size)
+    sections = {}
+    for i, (name, typecode) in enumerate(_SECTIONS):
+        offset, length = table[2 * i], table[2 * i + 1]
+        if offset + length > len(view):
+            raise ValueError(f"{path} is truncated")
+        sections[name] = view[offset:offset + length].cast(typecode)
+    return sections, version
+
+
+class _StringTable(Sequence):
+    """
+    Read-only sequence of strings stored as one UTF-8 blob plus offsets.
+    Strings are decoded when accessed, so opening a table costs nothing.
+    """
+
+    def __init__(self, blob: memoryview, offsets: Sequence[int]):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+class _SortedIndex:
+    """
+    ID -> index lookup by binary search over a stored sorted order.
+    Offers the parts of the dict interface CompactNetwork uses.
+    """
+
+    def __init__(self, strings: _StringTable, order: Sequence[int]):
+        self.strings = strings
+        self.order = order
+
+    def get(self, key: str, default: Optional[int] = None) -> Optional[int]:
+        target = key.encode("utf-8")
+        low, high = 0, len(self.order)
+        while low < high:
+            mid = (low + high) // 2
+            i = self.order[mid]
+            current = bytes(self.strings.blob[self.strings.offsets[i]:self.strings.offsets[i + 1]])
+            if current < target:
+                low = mid + 1
+            elif current > target:
+                high = mid
+            else:
+                return i
+        return default
+
+    def __getitem__(self, key: str) -> int:
+        i = self.get(key)
+        if i is None:
+            raise KeyError(key)
+        return i
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+
+def _pack_strings(strings: Sequence[str]):
+    """
+    Encode strings into one blob plus an offsets array (length len(strings) + 1).
+    """
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array('q', [0])
+    total = 0
+    for item in encoded:
+        total += len(item)
+        offsets.append(total)
+    return b"".join(encoded), offsets
+
+
+def _sorted_order(strings: Sequence[str]) -> array:
+    """
+    Indices of strings in UTF-8 byte order, matching _SortedIndex's comparisons.
+    """
+    return array('i', sorted(range(len(strings)), key=lambda i: strings[i].encode("utf-8")))
+
+
+def _to_bytes(values) -> bytes:
+    if isinstance(values, array):
+        return values.tobytes()
+    return bytes(values)
+
+
+def _align(position: int) -> int:
+    return (position + _ALIGN - 1) // _ALIGN * _ALIGN
@@ -0,0 +1,235 @@
+#Uniform grid index over intersection coordinates, for snapping points to the network
+from typing import Dict, Iterable, List, Optional, Tuple
+import heapq
+import math
+
+class SpatialIndex:
+    """
+    Points bucketed into square grid cells, so nearby points are found by looking at a
+    few cells instead of every point.
+
+    Coordinates are used as-is in the same plane as the rest of the network (for raw
+    GPS data, x is longitude and y latitude). The cell size is picked from the data
+    (about one point per cell) when the first query comes in, and the grid is rebuilt
+    if the number of points grows a lot after that; inserts and removals in between
+    only touch one cell.
+    """
+
+    def __init__(self, cell_size: Optional[float] = None):
+        """
+        Args:
+            cell_size: fixed cell size, or None to pick one from the data
+        """
+        self.fixed_cell_size = cell_size
+        self.cell_size = cell_size
+
+        # point ID -> (x, y), the source of truth the grid is built from
+        self._points: Dict[str, Tuple[float, float]] = {}
+
+        # (cell x, cell y) -> IDs in that cell, None until the first query
+        self._cells: Optional[Dict[Tuple[int, int], List[str]]] = None
+        self._built_size = 0
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def __contains__(self, point_id: str) -> bool:
+        return point_id in self._points
+
+    def insert(self, point_id: str, x: float, y: float) -> None:
+        """
+        Add a point, or move it if the ID is already indexed.
+        """
+        if point_id in self._points:
+            self.remove(point_id)
+        self._points[point_id] = (x, y)
+        if self._cells is not None:
+            self._cells.setdefault(self._cell(x, y), []).append(point_id)
+
+    def remove(self, point_id: str) -> None:
+        """
+        Remove a point. Unknown IDs are ignored.
+        """
+        position = self._points.pop(point_id, None)
+        if position is None or self._cells is None:
+            return
+        key = self._cell(*position)
+        bucket = self._cells[key]
+        bucket.remove(point_id)
+        if not bucket:
+            del self._cells[key]
+
+    def nearest(self, x: float, y: float, k: int = 1,
+                max_distance: float = math.inf) -> List[Tuple[str, float]]:
+        """
+        The k points closest to (x, y).
+
+        Args:
+            x, y: query position
+            k: how many points to return
+            max_distance: ignore points farther than this
+
+        Returns:
+            List of (point ID, distance), closest first, at most k long
+        """
+        cells = self._grid()
+        if not cells or k <= 0:
+            return []
+        size = self.cell_size
+        cx, cy = self._cell(x, y)
+
+        # max-heap (negated distances) of the best k found so far
+        best: List[Tuple[float, str]] = []
+
+        def consider(bucket):
+            for point_id in bucket:
+                px, py = self._points[point_id]
+                distance = math.hypot(px - x, py - y)
+                if distance > max_distance:
+                    continue
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, point_id))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, point_id))
+
+        ring = 0
+        while True:
+            if (2 * ring + 1) ** 2 > len(cells):
+                #the rings so far cover more cells than are occupied (e.g. a query far outside
+                #the data, where every ring is empty), checking every occupied cell is cheaper
+                for (ix, iy), bucket in cells.items():
+                    if max(abs(ix - cx), abs(iy - cy)) >= ring:
+                        consider(bucket)
+                break
+
+            for key in _ring_cells(cx, cy, ring):
+                bucket = cells.get(key)
+                if bucket:
+                    consider(bucket)
+
+            #everything not yet looked at is at least this far away
+            reach = min(x - (cx - ring) * size, (cx + ring + 1) * size - x,
+                        y - (cy - ring) * size, (cy + ring + 1) * size - y)
+            if reach > max_distance or (len(best) == k and -best[0][0] <= reach):
+                break
+            ring += 1
+
+        return [(point_id, -negative) for negative, point_id in sorted(best, reverse=True)]
+
+    def within_radius(self, x: float, y: float, radius: float) -> List[Tuple[str, float]]:
+        """
+        Every point within radius of (x, y).
+
+        Returns:
+            List of (point ID, distance), closest first
+        """
+        found = []
+        for point_id in self._candidates(x - radius, y - radius, x + radius, y + radius):
+            px, py = self._points[point_id]
+            distance = math.hypot(px - x, py - y)
+            if distance <= radius:
+                found.append((point_id, distance))
+        found.sort(key=lambda item: item[1])
+        return found
+
+    def in_bbox(self, min_x: float, min_y: float, max_x: float, max_y: float) -> List[str]:
+        """
+        Every point inside a bounding box (edges included).
+
+        Returns:
+            List of point IDs, in no particular order
+        """
+        points = self._points
+        return [point_id for point_id in self._candidates(min_x, min_y, max_x, max_y)
+                if min_x <= points[point_id][0] <= max_x and min_y <= points[point_id][1] <= max_y]
+
+    def snap_many(self, points: Iterable[Tuple[float, float]],
+                  max_distance: float = math.inf) -> List[Optional[str]]:
+        """
+        Snap many positions to their nearest point in one call.
+
+        Args:
+            points: (x, y) positions
+            max_distance: positions with nothing this close snap to None
+
+        Returns:
+            The nearest point ID for each position, in order
+        """
+        self._grid()
+        snapped = []
+        for x, y in points:
+            nearest = self.nearest(x, y, 1, max_distance)
+            snapped.append(nearest[0][0] if nearest else None)
+        return snapped
+
+    def _candidates(self, min_x: float, min_y: float, max_x: float, max_y: float) -> Iterable[str]:
+        """
+        IDs in every cell overlapping a box (a superset of the points inside it).
+        """
+        cells = self._grid()
+        if not cells or min_x > max_x or min_y > max_y:
+            return []
+        low_x, low_y = self._cell(min_x, min_y)
+        high_x, high_y = self._cell(max_x, max_y)
+
+        # a huge box is cheaper to answer by looking at the occupied cells
+        if (high_x - low_x + 1) * (high_y - low_y + 1) > len(cells):
+            return [point_id for (ix, iy), bucket in cells.items()
+                    if low_x <= ix <= high_x and low_y <= iy <= high_y for point_id in bucket]
+        return [point_id for ix in range(low_x, high_x + 1) for iy in range(low_y, high_y + 1)
+                for point_id in cells.get((ix, iy), ())]
+
+    def _grid(self) -> Dict[Tuple[int, int], List[str]]:
+        """
+        The cell buckets, (re)built when missing or when the index has outgrown them.
+        """
+        if self._cells is None or len(self._points) > 4 * max(self._built_size, 16):
+            self._build()
+        return self._cells
+
+    def _build(self) -> None:
+        points = self._points
+        if self.fixed_cell_size is None:
+            self.cell_size = _pick_cell_size(points.values())
+        cells: Dict[Tuple[int, int], List[str]] = {}
+        for point_id, (x, y) in points.items():
+            cells.setdefault(self._cell(x, y), []).append(point_id)
+        self._cells = cells
+        self._built_size = len(points)
+
+    def _cell(self, x: float, y: float) -> Tuple[int, int]:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+
+def _ring_cells(cx: int, cy: int, ring: int) -> Iterable[Tuple[int, int]]:
+    """
+    Cells at Chebyshev distance exactly ring from (cx, cy).
+    """
+    if ring == 0:
+        yield cx, cy
+        return
+    for ix in range(cx - ring, cx + ring + 1):
+        yield ix, cy - ring
+        yield ix, cy + ring
+    for iy in range(cy - ring + 1, cy + ring):
+        yield cx - ring, iy
+        yield cx + ring, iy
+
+
+def _pick_cell_size(points: Iterable[Tuple[float, float]]) -> float:
+    """
+    Cell size giving roughly one point per cell over the points' bounding box.
+    """
+    xs, ys = [], []
+    for x, y in points:
+        xs.append(x)
+        ys.append(y)
+    if len(xs) < 2:
+        return 1.0
+    width, height = max(xs) - min(xs), max(ys) - min(ys)
+    area = width * height
+    if area <= 0:
+        # all on one line (or one spot), spread along it instead
+        span = max(width, height)
+        return span / len(xs) if span > 0 else 1.0
+    return math.sqrt(area / len(xs))
@@ -0,0 +1,48 @@
+#Pluggable formulas turning a road's length (and traffic) into its effective weight
+from typing import List, Sequence
+
+class CongestionWeight:
+    """
+    The default formula: distance * (1 + congestion).
+
+    A weight formula is any object with
+        __call__(distance, road) -> float          weight of one road
+        batch(distances, roads) -> List[float]     weights of many roads in one pass
+    and TrafficNetwork.weight_formula decides which one a network uses. Formulas should
+    never return less than the distance, or the straight-line A* heuristic stops being
+    a lower bound.
+    """
+
+    def __call__(self, distance: float, road) -> float:
+        return distance * (1 + road.congestion)
+
+    def batch(self, distances: Sequence[float], roads: Sequence) -> List[float]:
+        return [d * (1 + r.congestion) for d, r in zip(distances, roads)]
+
+
+class BPRWeight:
+    """
+    Bureau of Public Roads volume/delay curve:
+        distance * (1 + alpha * (volume / capacity) ** beta)
+
+    Uses road.volume and road.capacity. Roads without a capacity are treated as free flow.
+    """
+
+    def __init__(self, alpha: float = 0.15, beta: float = 4.0):
+        """
+        Args:
+            alpha: delay at capacity, as a fraction of free flow cost
+            beta: how sharply delay grows as volume approaches capacity
+        """
+        self.alpha = alpha
+        self.beta = beta
+
+    def __call__(self, distance: float, road) -> float:
+        if not road.capacity:
+            return distance
+        return distance * (1 + self.alpha * (road.volume / road.capacity) ** self.beta)
+
+    def batch(self, distances: Sequence[float], roads: Sequence) -> List[float]:
+        alpha, beta = self.alpha, self.beta
+        return [d * (1 + alpha * (r.volume / r.capacity) ** beta) if r.capacity else d
+                for d, r in zip(distances, roads)]
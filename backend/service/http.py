@@ -0,0 +1,109 @@
+#Minimal HTTP/JSON front end for RoutingService, on plain asyncio streams
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qs, urlsplit
+import asyncio
+import json
+import logging
+from service.routing import RoutingService
+
+logger = logging.getLogger(__name__)
+
+# biggest request body we accept
+_MAX_BODY = 1 << 20
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+async def start_server(service: RoutingService, host: str = "127.0.0.1", port: int = 8080) -> asyncio.AbstractServer:
+    """
+    Start serving the routing API. One request per connection.
+
+        GET  /route?start=ID&end=ID[&algorithm=NAME]  -> {"path": [...], "cost": c}
+        GET  /network                                 -> {"version", "intersections", "roads"}
+        POST /roads/close    {"road_ids": [...]}      -> {"closed": n}
+        POST /roads/reopen   {"road_ids": [...]}      -> {"reopened": n}
+        POST /congestion     {"updates": {id: c}}     -> {"updated": n}
+
+    Errors come back as {"error": message} with a 4xx status. Unexpected failures are
+    logged and answered with a 500.
+
+    Args:
+        service: the RoutingService to expose
+        host: interface to listen on
+        port: port to listen on, 0 picks a free one
+
+    Returns:
+        The running asyncio server
+    """
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            status, payload = await _dispatch(service, reader)
+        except (ValueError, KeyError, TypeError, asyncio.IncompleteReadError) as error:
+            status, payload = 400, {"error": str(error)}
+        except Exception:
+            #anything else is our fault, answer rather than dropping the connection
+            logger.exception("Request failed")
+            status, payload = 500, {"error": "internal server error"}
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1") + body)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def _dispatch(service: RoutingService, reader: asyncio.StreamReader) -> Tuple[int, Dict[str, Any]]:
+    """
+    Read one request and run it.
+
+    Returns:
+        Tuple of (HTTP status, JSON payload)
+    """
+    request_line = (await reader.readline()).decode("latin-1").strip()
+    parts = request_line.split()
+    if len(parts) != 3:
+        return 400, {"error": "malformed request line"}
+    method, target, _ = parts
+
+    length = 0
+    while True:
+        line = (await reader.readline()).decode("latin-1").strip()
+        if not line:
+            break
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    if length > _MAX_BODY:
+        return 413, {"error": "request body too large"}
+    body = json.loads(await reader.readexactly(length)) if length else {}
+
+    url = urlsplit(target)
+    query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+    if url.path == "/route":
+        if method != "GET":
+            return 405, {"error": "use GET"}
+        options = {"algorithm": query["algorithm"]} if "algorithm" in query else {}
+        path, cost = await service.route(query["start"], query["end"], **options)
+        return 200, {"path": path, "cost": cost}
+
+    if url.path == "/network":
+        if method != "GET":
+            return 405, {"error": "use GET"}
+        return 200, await service.network_dict()
+
+    if url.path in ("/roads/close", "/roads/reopen", "/congestion"):
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        if url.path == "/roads/close":
+            return 200, {"closed": await service.close_roads(body["road_ids"])}
+        if url.path == "/roads/reopen":
+            return 200, {"reopened": await service.reopen_roads(body["road_ids"])}
+        return 200, {"updated": await service.update_congestion(body["updates"])}
+
+    return 404, {"error": f"no such endpoint {url.path}"}
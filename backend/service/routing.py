@@ -0,0 +1,180 @@
+#Asyncio routing service: searches on immutable snapshots, atomic swaps on mutation
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import functools
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+from models.compact import CompactNetwork
+from algos.pathfinding import a_star_shortest_path
+
+class RoutingService:
+    """
+    Serves a_star_shortest_path to many concurrent asyncio callers.
+
+    Searches never touch the live TrafficNetwork. They run in an executor against a
+    snapshot, a CompactNetwork that is never modified once published. Mutations go
+    through the service: they are applied to the network one at a time, a new snapshot
+    is built and then swapped in with a single assignment. Searches already running
+    finish on the snapshot they started with, and new ones see the new one. Weight and
+    closure changes copy only the weight/flag arrays of the current snapshot. Adding
+    intersections or roads compiles a fresh one.
+
+    Identical queries that arrive while one is already being searched (same endpoints,
+    options and snapshot) wait for that search instead of starting their own.
+    """
+
+    def __init__(self, network: TrafficNetwork, executor: Optional[Executor] = None):
+        """
+        Args:
+            network: the network to serve, from now on only change it through the service
+            executor: where searches and mutations run, a thread pool by default
+        """
+        self.network = network
+        self.executor = executor if executor is not None else ThreadPoolExecutor()
+        self.searches = 0
+        self.coalesced = 0
+
+        self._snapshot = self._compile()
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def snapshot(self) -> CompactNetwork:
+        """The snapshot new searches run against."""
+        return self._snapshot
+
+    async def route(self, start_id: str, end_id: str, **search_options) -> Tuple[List[str], float]:
+        """
+        Find a route on the current snapshot.
+
+        Args:
+            start_id: ID of the starting intersection
+            end_id: ID of the destination intersection
+            search_options: extra keyword arguments for a_star_shortest_path (e.g. algorithm)
+
+        Returns:
+            Tuple of (path of intersection IDs, total path cost); the path is the caller's own copy
+
+        Raises:
+            ValueError: If start or end intersections don't exist or if no path exists
+        """
+        snapshot = self._snapshot
+        key = (snapshot.version, start_id, end_id, tuple(sorted(search_options.items())))
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            search = functools.partial(a_star_shortest_path, snapshot, start_id, end_id, **search_options)
+            future = loop.run_in_executor(self.executor, search)
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self.searches += 1
+        else:
+            self.coalesced += 1
+
+        # a cancelled caller must not cancel the search others are waiting on
+        path, cost = await asyncio.shield(future)
+        return list(path), cost
+
+    async def close_roads(self, road_ids: Iterable[str]) -> int:
+        """
+        Close roads and publish a new snapshot.
+
+        Returns:
+            The number of roads that were actually closed
+        """
+        road_ids = list(road_ids)
+        return await self._mutate(self.network.close_roads, road_ids, changed_roads=road_ids)
+
+    async def reopen_roads(self, road_ids: Iterable[str]) -> int:
+        """
+        Reopen roads and publish a new snapshot.
+
+        Returns:
+            The number of roads that were actually reopened
+        """
+        road_ids = list(road_ids)
+        return await self._mutate(self.network.reopen_roads, road_ids, changed_roads=road_ids)
+
+    async def update_congestion(self, updates: Dict[str, float]) -> int:
+        """
+        Change road congestion and publish a new snapshot.
+
+        Returns:
+            The number of roads that were updated
+        """
+        updates = dict(updates)
+        return await self._mutate(self.network.update_congestion, updates, changed_roads=list(updates))
+
+    async def add_intersection(self, intersection: Intersection) -> None:
+        """
+        Add an intersection and publish a new snapshot.
+        """
+        await self._mutate(self.network.add_intersection, intersection)
+
+    async def add_roads(self, roads: Iterable[Road]) -> None:
+        """
+        Add roads and publish a new snapshot.
+
+        Raises:
+            ValueError: If a road references an intersection that isn't in the network
+        """
+        await self._mutate(self.network.add_roads, list(roads))
+
+    async def network_dict(self) -> Dict[str, Any]:
+        """
+        The whole network as plain dicts (see to_dict), read between mutations.
+        """
+        async with self._mutation_lock():
+            return {
+                "version": self.network.version,
+                "intersections": [i.to_dict() for i in self.network.intersections.values()],
+                "roads": [r.to_dict() for r in self.network.roads.values()],
+            }
+
+    def close(self) -> None:
+        """
+        Shut down the executor.
+        """
+        self.executor.shutdown(wait=True)
+
+    async def _mutate(self, change, *args, changed_roads: Optional[List[str]] = None):
+        """
+        Apply one change to the network in the executor, then swap in a new snapshot.
+        Only one change runs at a time. changed_roads lists the roads whose weight or
+        open flag may have changed, None means the structure changed and needs a compile.
+        """
+        async with self._mutation_lock():
+            loop = asyncio.get_running_loop()
+            result, snapshot = await loop.run_in_executor(
+                self.executor, functools.partial(self._apply, change, args, changed_roads))
+            #one reference assignment, so a search sees either the old or the new snapshot
+            self._snapshot = snapshot
+            return result
+
+    def _apply(self, change, args, changed_roads: Optional[List[str]]):
+        result = change(*args)
+        if changed_roads is None:
+            return result, self._compile()
+
+        snapshot = self._snapshot.copy_costs()
+        for road_id in changed_roads:
+            road = self.network.roads.get(road_id)
+            if road is not None:
+                snapshot.set_road_weight(road_id, road.weight)
+                snapshot.set_road_open(road_id, road.is_open)
+        snapshot.version = self.network.version
+        return result, snapshot
+
+    def _compile(self) -> CompactNetwork:
+        # not network.compile(): that view is patched in place by later changes
+        snapshot = CompactNetwork.from_network(self.network)
+        snapshot.version = self.network.version
+        return snapshot
+
+    def _mutation_lock(self) -> asyncio.Lock:
+        # created lazily so it belongs to the running loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
@@ -0,0 +1,385 @@
+#Tick based traffic simulation: vehicles routed over a TrafficNetwork, feeding congestion back
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+from models.network import TrafficNetwork
+from algos.pathfinding import a_star_shortest_path
+
+class Simulation:
+    """
+    Discrete-time simulation of vehicles driving over a network.
+
+    Each vehicle is routed with a_star_shortest_path when it is added, then advanced
+    along its route every tick at speed / (1 + congestion) of the road it is on. After
+    each tick the number of vehicles on each road is turned into congestion
+    (vehicles / capacity) and written back with update_congestion, so the road weights,
+    and the routes of vehicles added later, react to the traffic. Intersection.congestion
+    becomes the load of the roads heading into it the same way.
+
+    Vehicle state is kept struct-of-arrays style: one flat array per field indexed by
+    vehicle ID rather than an object per vehicle, and routes are stored once per
+    origin/destination pair and shared until the weights change, after which the storage
+    no moving vehicle needs is reclaimed. Only moving vehicles are visited each tick.
+
+    With a SignalModel, vehicles reaching the end of a road join that approach's queue
+    and only move on when the signal releases them and the next road has room, so a
+    full road backs traffic up onto the roads feeding it (spillback). Intersection
+    delays from the signals are fed into the road weights with the congestion.
+
+    The network's roads and intersections must stay the same while simulating
+    (congestion changes and closures are fine, closures affect vehicles added afterwards).
+    """
+
+    def __init__(self, network: TrafficNetwork, dt: float = 1.0, speed: float = 13.9,
+                 jam_density: float = 0.15, feedback_every: int = 1, signals=None):
+        """
+        Args:
+            network: the network to drive on
+            dt: simulated time per tick
+            speed: free flow speed, distance units per unit of time
+            jam_density: vehicles per unit of distance a road holds at congestion 1,
+                used for roads without a capacity
+            feedback_every: write congestion back to the network every this many ticks
+            signals: optional SignalModel (built on the same network) for intersection queues
+        """
+        self.network = network
+        self.dt = dt
+        self.speed = speed
+        self.feedback_every = feedback_every
+        self.signals = signals
+        self.time = 0.0
+        self.ticks = 0
+        self.arrived = 0
+        self.total_travel_time = 0.0
+
+        compact = network.compile()
+        self._compact = compact
+        self._intersections = [network.intersections[node_id] for node_id in compact.node_ids]
+        road_objects = [network.roads[road_id] for road_id in compact.road_ids]
+        xs, ys = compact.xs, compact.ys
+        index = compact.node_index
+
+        #per road arrays, indexed like compact.road_ids
+        self._lengths = array('d', (math.hypot(xs[index[r.target_id]] - xs[index[r.source_id]],
+                                               ys[index[r.target_id]] - ys[index[r.source_id]])
+                                    for r in road_objects))
+        self._capacities = array('d', (r.capacity if r.capacity else max(length * jam_density, 1.0)
+                                       for r, length in zip(road_objects, self._lengths)))
+        self._occupancy = array('i', bytes(4 * len(road_objects)))
+        self._congestion = array('d', bytes(8 * len(road_objects)))
+
+        #per node arrays: vehicles on roads heading into the node, and what those roads hold
+        self._node_load = array('i', bytes(4 * compact.node_count))
+        self._node_capacity = array('d', bytes(8 * compact.node_count))
+        for k in range(len(compact.targets)):
+            self._node_capacity[compact.targets[k]] += self._capacities[compact.edge_roads[k]]
+
+        #routes as CSR positions (which also gives the direction each road is driven in)
+        self._route_edges = array('q')
+        self._route_offsets = array('q', [0])
+        self._routes: Dict[Tuple[int, int], int] = {}
+        self._routes_version = compact.version
+        # size of _route_edges after the last _compact_routes, storage is reclaimed once it doubles
+        self._route_edges_kept = 0
+
+        #per vehicle arrays, indexed by vehicle ID
+        self._vehicle_edge = array('q')      # current position in _route_edges
+        self._vehicle_end = array('q')       # one past the vehicle's last route position
+        self._vehicle_offset = array('d')    # distance driven along the current road
+        self._vehicle_departed = array('d')
+        self._vehicle_arrived = array('d')   # nan until arrival
+        self._vehicle_queued = bytearray()   # 1 while waiting in a signal queue
+
+        # IDs of vehicles still driving, removed by swapping with the last entry
+        self._active = array('i')
+
+        # everything starts dirty so the first feedback takes over all the congestion values
+        self._dirty_roads = set(range(len(road_objects)))
+        self._dirty_nodes = set(range(compact.node_count))
+
+    @property
+    def active_count(self) -> int:
+        return len(self._active)
+
+    def add_vehicle(self, origin_id: str, destination_id: str) -> int:
+        """
+        Route a vehicle and put it at the start of its route.
+
+        Args:
+            origin_id: ID of the intersection it leaves from
+            destination_id: ID of the intersection it drives to
+
+        Returns:
+            The vehicle ID
+
+        Raises:
+            ValueError: If an intersection doesn't exist or no path exists
+        """
+        route = self._route(origin_id, destination_id)
+        first, last = self._route_offsets[route], self._route_offsets[route + 1]
+
+        vehicle = len(self._vehicle_edge)
+        self._vehicle_edge.append(first)
+        self._vehicle_end.append(last)
+        self._vehicle_offset.append(0.0)
+        self._vehicle_departed.append(self.time)
+        self._vehicle_queued.append(0)
+
+        if first == last:
+            #already there
+            self._vehicle_arrived.append(self.time)
+            self.arrived += 1
+            return vehicle
+
+        self._vehicle_arrived.append(math.nan)
+        self._enter(self._route_edges[first])
+        self._active.append(vehicle)
+        return vehicle
+
+    def add_vehicles(self, pairs: Iterable[Tuple[str, str]]) -> List[int]:
+        """
+        Add many vehicles at once.
+
+        Args:
+            pairs: (origin_id, destination_id) pairs
+
+        Returns:
+            The vehicle IDs, in the same order as pairs
+
+        Raises:
+            ValueError: If any pair can't be routed (vehicles before it are kept)
+        """
+        return [self.add_vehicle(origin_id, destination_id) for origin_id, destination_id in pairs]
+
+    def step(self, ticks: int = 1) -> None:
+        """
+        Advance the simulation.
+
+        Args:
+            ticks: number of ticks of dt to run
+        """
+        compact = self._compact
+        edge_roads, targets = compact.edge_roads, compact.targets
+        lengths, congestion, capacities = self._lengths, self._congestion, self._capacities
+        occupancy, node_load = self._occupancy, self._node_load
+        route_edges = self._route_edges
+        vehicle_edge, vehicle_end = self._vehicle_edge, self._vehicle_end
+        vehicle_offset, vehicle_arrived = self._vehicle_offset, self._vehicle_arrived
+        vehicle_queued = self._vehicle_queued
+        signals = self.signals
+        active = self._active
+        dirty_roads, dirty_nodes = self._dirty_roads, self._dirty_nodes
+        speed, dt = self.speed, self.dt
+
+        for _ in range(ticks):
+            end_time = self.time + dt
+            released = signals.step(dt) if signals is not None else None
+
+            #walk backwards so swap-removal only moves already processed vehicles
+            for i in range(len(active) - 1, -1, -1):
+                vehicle = active[i]
+                position = vehicle_edge[vehicle]
+                k = route_edges[position]
+                r = edge_roads[k]
+                offset = vehicle_offset[vehicle]
+                remaining = dt
+
+                while True:
+                    road_speed = speed / (1 + congestion[r])
+                    needed = (lengths[r] - offset) / road_speed
+                    if needed > remaining:
+                        offset += remaining * road_speed
+                        break
+
+                    # reaches the end of this road within the tick
+                    remaining -= needed
+                    if signals is not None and position + 1 < vehicle_end[vehicle]:
+                        if not vehicle_queued[vehicle]:
+                            signals.arrive(k)
+                            vehicle_queued[vehicle] = 1
+                            offset = lengths[r]
+                            break
+                        budget = released.get(k, 0)
+                        if not budget:
+                            offset = lengths[r]
+                            break
+                        released[k] = budget - 1
+                        following = edge_roads[route_edges[position + 1]]
+                        if occupancy[following] >= capacities[following]:
+                            #next road is full: the green is wasted and it queues again
+                            signals.arrive(k)
+                            offset = lengths[r]
+                            break
+                        vehicle_queued[vehicle] = 0
+
+                    occupancy[r] -= 1
+                    node_load[targets[k]] -= 1
+                    dirty_roads.add(r)
+                    dirty_nodes.add(targets[k])
+
+                    position += 1
+                    if position == vehicle_end[vehicle]:
+                        break
+                    k = route_edges[position]
+                    r = edge_roads[k]
+                    offset = 0.0
+                    occupancy[r] += 1
+                    node_load[targets[k]] += 1
+                    dirty_roads.add(r)
+                    dirty_nodes.add(targets[k])
+
+                vehicle_edge[vehicle] = position
+                if position == vehicle_end[vehicle]:
+                    arrival = end_time - remaining
+                    vehicle_arrived[vehicle] = arrival
+                    self.total_travel_time += arrival - self._vehicle_departed[vehicle]
+                    self.arrived += 1
+                    active[i] = active[-1]
+                    active.pop()
+                else:
+                    vehicle_offset[vehicle] = offset
+
+            self.time = end_time
+            self.ticks += 1
+            if self.ticks % self.feedback_every == 0:
+                self.feedback()
+
+    def feedback(self) -> None:
+        """
+        Write the current occupancy of every road and intersection that changed since the
+        last feedback into the network's congestion values (and so its road weights).
+        step calls this every feedback_every ticks.
+        """
+        compact = self._compact
+        occupancy, capacities, congestion = self._occupancy, self._capacities, self._congestion
+
+        updates = {}
+        for r in self._dirty_roads:
+            congestion[r] = occupancy[r] / capacities[r]
+            updates[compact.road_ids[r]] = congestion[r]
+        self.network.update_congestion(updates)
+        if self.signals is not None:
+            self.signals.apply_delays()
+
+        node_load, node_capacity = self._node_load, self._node_capacity
+        for i in self._dirty_nodes:
+            self._intersections[i].congestion = node_load[i] / node_capacity[i] if node_capacity[i] else 0.0
+
+        self._dirty_roads.clear()
+        self._dirty_nodes.clear()
+
+    def road_occupancy(self, road_id: str) -> int:
+        """
+        Number of vehicles on a road right now (both directions).
+
+        Raises:
+            ValueError: If the road doesn't exist
+        """
+        r = self._compact.road_index.get(road_id)
+        if r is None:
+            raise ValueError(f"Road {road_id} does not exist")
+        return self._occupancy[r]
+
+    def vehicle_position(self, vehicle_id: int) -> Optional[Tuple[str, str, float]]:
+        """
+        Where a vehicle is.
+
+        Returns:
+            Tuple of (road ID, ID of the intersection it is driving towards, distance
+            driven along the road), or None once it has arrived
+        """
+        if not math.isnan(self._vehicle_arrived[vehicle_id]):
+            return None
+        compact = self._compact
+        k = self._route_edges[self._vehicle_edge[vehicle_id]]
+        return (compact.road_ids[compact.edge_roads[k]], compact.node_ids[compact.targets[k]],
+                self._vehicle_offset[vehicle_id])
+
+    def arrival_time(self, vehicle_id: int) -> Optional[float]:
+        """
+        When a vehicle arrived, or None if it is still driving.
+        """
+        arrived = self._vehicle_arrived[vehicle_id]
+        return None if math.isnan(arrived) else arrived
+
+    def _route(self, origin_id: str, destination_id: str) -> int:
+        """
+        Get the shared route for an origin/destination pair, searching if needed.
+        Routes are reused until the network's weights change.
+
+        Returns:
+            Route number, its CSR positions are _route_edges[_route_offsets[n]:_route_offsets[n + 1]]
+        """
+        compact = self._compact
+        if compact.version != self._routes_version:
+            self._routes.clear()
+            self._routes_version = compact.version
+            #routes of older versions are only kept alive by the vehicles still driving them
+            if len(self._route_edges) > 2 * self._route_edges_kept:
+                self._compact_routes()
+
+        start, end = compact.index_of(origin_id), compact.index_of(destination_id)
+        route = self._routes.get((start, end))
+        if route is not None:
+            return route
+
+        path, _ = a_star_shortest_path(compact, origin_id, destination_id)
+        offsets, targets, weights, edge_open = compact.offsets, compact.targets, compact.weights, compact.edge_open
+        current = start
+        for node_id in path[1:]:
+            #the search took the cheapest open road between the two, pick the same one
+            following = compact.node_index[node_id]
+            best = -1
+            for k in range(offsets[current], offsets[current + 1]):
+                if targets[k] == following and edge_open[k] and (best == -1 or weights[k] < weights[best]):
+                    best = k
+            self._route_edges.append(best)
+            current = following
+
+        self._route_offsets.append(len(self._route_edges))
+        route = len(self._route_offsets) - 2
+        self._routes[(start, end)] = route
+        return route
+
+    def _compact_routes(self) -> None:
+        """
+        Drop the route storage no moving vehicle uses any more.
+
+        Only the rest of each moving vehicle's route is kept. Vehicles that shared a route
+        share its copy, since they all end at the same position. Must only run while
+        _routes is empty, as the route numbers it holds would point at moved positions.
+        """
+        route_edges = self._route_edges
+        vehicle_edge, vehicle_end = self._vehicle_edge, self._vehicle_end
+
+        #the furthest back any vehicle still is on each route, routes are told apart by their end
+        first_needed: Dict[int, int] = {}
+        for vehicle in self._active:
+            end, position = vehicle_end[vehicle], vehicle_edge[vehicle]
+            if position < first_needed.get(end, end):
+                first_needed[end] = position
+
+        kept = array('q')
+        moved: Dict[int, int] = {}
+        for end, first in first_needed.items():
+            moved[end] = len(kept) - first
+            kept.extend(route_edges[first:end])
+        for vehicle in self._active:
+            shift = moved[vehicle_end[vehicle]]
+            vehicle_edge[vehicle] += shift
+            vehicle_end[vehicle] += shift
+
+        self._route_edges = kept
+        self._route_offsets = array('q', [len(kept)])
+        self._route_edges_kept = len(kept)
+
+    def _enter(self, k: int) -> None:
+        """
+        Count a vehicle onto the road at CSR position k.
+        """
+        r = self._compact.edge_roads[k]
+        target = self._compact.targets[k]
+        self._occupancy[r] += 1
+        self._node_load[target] += 1
+        self._dirty_roads.add(r)
+        self._dirty_nodes.add(target)
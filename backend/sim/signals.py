@@ -0,0 +1,212 @@
+#Signal phases and approach queues for every intersection, advanced in one batched step
+from array import array
+from typing import Dict, Optional, Sequence
+from models.network import TrafficNetwork
+
+class SignalModel:
+    """
+    Queues at every intersection approach, served by fixed-time signals.
+
+    An approach is one direction of travel into an intersection, i.e. one CSR entry of
+    the compiled network (vehicles driving entry k queue at targets[k]). Every approach
+    has a saturation flow, the vehicles per unit of time it can discharge while green
+    (its turn capacity). Signalized intersections cycle through their phases with
+    equal green splits, and each approach is green in one phase. Intersections without
+    a signal are always green and only limited by saturation flow.
+
+    All state lives in flat arrays (per intersection: cycle, phase count, offset, delay;
+    per approach: phase, saturation flow, queue, discharge credit), and step() advances
+    every queue in one call. It only visits approaches that actually have vehicles
+    waiting, so a city-sized network with quiet streets costs next to nothing per tick.
+
+    Each intersection's delay (signal wait plus time to clear its queues) can be written
+    to Intersection.delay with apply_delays, which feeds it into the road weights.
+    """
+
+    def __init__(self, network: TrafficNetwork, saturation_flow: float = 0.5):
+        """
+        Args:
+            network: the network whose intersections get signals and queues
+            saturation_flow: default discharge rate of an approach, vehicles per unit of time
+                (0.5 per second is about 1800 per hour, one lane)
+        """
+        self.network = network
+        self.time = 0.0
+
+        compact = network.compile()
+        self._compact = compact
+        n = compact.node_count
+        entries = len(compact.targets)
+
+        #per intersection, cycle 0 means no signal
+        self.cycles = array('d', bytes(8 * n))
+        self.phase_counts = array('i', [1]) * n
+        self.offsets = array('d', bytes(8 * n))
+        self.delays = array('d', bytes(8 * n))
+
+        #per approach
+        self.phases = array('i', bytes(4 * entries))
+        self.saturation = array('d', [saturation_flow]) * entries
+        self.queues = array('i', bytes(4 * entries))
+        self._credit = array('d', bytes(8 * entries))
+
+        # approaches with vehicles waiting, and intersections whose delay needs recomputing
+        self._waiting = set()
+        self._dirty = set(range(n))
+
+        # intersections whose delay changed since the last apply_delays
+        self._changed = set()
+
+    def set_signal(self, intersection_id: str, cycle: float, phases: Sequence[Sequence[str]],
+                   offset: float = 0.0, saturation_flow: Optional[Dict[str, float]] = None) -> None:
+        """
+        Put a fixed-time signal on an intersection.
+
+        Args:
+            intersection_id: the intersection
+            cycle: length of one full cycle of phases
+            phases: for each phase, the IDs of the roads whose approach is green in it;
+                roads not listed are green in the first phase
+            offset: shift of the cycle start, to coordinate neighbouring signals
+            saturation_flow: optional road ID -> discharge rate for approaches from those roads
+
+        Raises:
+            ValueError: If the intersection doesn't exist, the cycle isn't positive or a road
+                doesn't enter the intersection
+        """
+        compact = self._compact
+        i = compact.index_of(intersection_id)
+        if i is None:
+            raise ValueError(f"Intersection {intersection_id} does not exist")
+        if cycle <= 0 or not phases:
+            raise ValueError("A signal needs a positive cycle and at least one phase")
+
+        approaches = {compact.road_ids[compact.edge_roads[k]]: k for k in self._approaches(i)}
+        for road_id in [road_id for phase in phases for road_id in phase] + list(saturation_flow or {}):
+            if road_id not in approaches:
+                raise ValueError(f"Road {road_id} does not enter intersection {intersection_id}")
+
+        self.cycles[i] = cycle
+        self.phase_counts[i] = len(phases)
+        self.offsets[i] = offset
+        for k in approaches.values():
+            self.phases[k] = 0
+        for phase, road_ids in enumerate(phases):
+            for road_id in road_ids:
+                self.phases[approaches[road_id]] = phase
+        for road_id, flow in (saturation_flow or {}).items():
+            self.saturation[approaches[road_id]] = flow
+        self._dirty.add(i)
+
+    def is_green(self, k: int, t: Optional[float] = None) -> bool:
+        """
+        Whether approach k (a CSR entry) has green at time t (default now).
+        """
+        i = self._compact.targets[k]
+        cycle = self.cycles[i]
+        if not cycle:
+            return True
+        t = self.time if t is None else t
+        green = cycle / self.phase_counts[i]
+        return int(((t + self.offsets[i]) % cycle) // green) == self.phases[k]
+
+    def arrive(self, k: int, count: int = 1) -> None:
+        """
+        Add vehicles to the back of approach k's queue.
+        """
+        self.queues[k] += count
+        self._waiting.add(k)
+        self._dirty.add(self._compact.targets[k])
+
+    def step(self, dt: float) -> Dict[int, int]:
+        """
+        Advance every intersection's queues by dt.
+
+        Each waiting approach that is green discharges up to saturation_flow * dt vehicles
+        (fractions carry over to the next step while it stays green), red approaches hold.
+
+        Args:
+            dt: time to advance
+
+        Returns:
+            Dict of approach -> vehicles released from its queue during this step,
+            only for approaches that released any
+        """
+        targets = self._compact.targets
+        queues, credit, saturation = self.queues, self._credit, self.saturation
+        cycles, phase_counts, offsets, phases = self.cycles, self.phase_counts, self.offsets, self.phases
+        t = self.time
+        released = {}
+        emptied = []
+
+        for k in self._waiting:
+            i = targets[k]
+            cycle = cycles[i]
+            if cycle and int(((t + offsets[i]) % cycle) // (cycle / phase_counts[i])) != phases[k]:
+                # red, nothing carries over
+                credit[k] = 0.0
+                continue
+
+            credit[k] += saturation[k] * dt
+            served = min(int(credit[k]), queues[k])
+            if served:
+                queues[k] -= served
+                credit[k] -= served
+                released[k] = served
+                self._dirty.add(i)
+            if not queues[k]:
+                credit[k] = 0.0
+                emptied.append(k)
+
+        self._waiting.difference_update(emptied)
+        self.time = t + dt
+        self._update_delays()
+        return released
+
+    def apply_delays(self) -> int:
+        """
+        Write the delays that changed since the last call into Intersection.delay,
+        refreshing the weights of the roads around them.
+
+        Returns:
+            The number of intersections updated
+        """
+        compact = self._compact
+        updates = {compact.node_ids[i]: self.delays[i] for i in self._changed}
+        self._changed.clear()
+        return self.network.update_intersection_delays(updates) if updates else 0
+
+    def _update_delays(self) -> None:
+        """
+        Recompute the delay of every intersection whose queues or signal changed:
+        the average over its approaches of the uniform signal delay (red^2 / (2 * cycle))
+        plus the time its queue takes to discharge.
+        """
+        changed = self._changed
+        queues, saturation = self.queues, self.saturation
+        for i in self._dirty:
+            cycle = self.cycles[i]
+            red = cycle - cycle / self.phase_counts[i]
+            signal_wait = red * red / (2 * cycle) if cycle else 0.0
+
+            total = 0.0
+            count = 0
+            for k in self._approaches(i):
+                total += signal_wait + (queues[k] / saturation[k] if saturation[k] else 0.0)
+                count += 1
+            delay = total / count if count else 0.0
+            if delay != self.delays[i]:
+                self.delays[i] = delay
+                changed.add(i)
+        self._dirty.clear()
+
+    def _approaches(self, i: int):
+        """
+        The CSR entries leading into node i: the other half of each road in i's row.
+        """
+        compact = self._compact
+        road_edges, edge_roads = compact.road_edges, compact.edge_roads
+        for k in range(compact.offsets[i], compact.offsets[i + 1]):
+            r = edge_roads[k]
+            first = road_edges[2 * r]
+            yield road_edges[2 * r + 1] if first == k else first
@@ -0,0 +1,56 @@
+#Network builders shared by the test modules
+import random
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+
+def build_grid(size, seed, closed=0.0, bypass=False):
+    """
+    A size x size grid of intersections 10 apart with random congestion.
+
+    Args:
+        size: intersections per side, IDs are n{i}_{j}
+        seed: seed for the congestion (and closures)
+        closed: fraction of roads to close at random
+        bypass: add a road "bypass" parallel to n0_0 - n1_0
+    """
+    rng = random.Random(seed)
+    network = TrafficNetwork()
+    for i in range(size):
+        for j in range(size):
+            network.add_intersection(Intersection(f"n{i}_{j}", i * 10, j * 10))
+    for i in range(size):
+        for j in range(size):
+            if i + 1 < size:
+                network.add_road(Road(f"h{i}_{j}", f"n{i}_{j}", f"n{i+1}_{j}"))
+            if j + 1 < size:
+                network.add_road(Road(f"v{i}_{j}", f"n{i}_{j}", f"n{i}_{j+1}"))
+    if bypass:
+        network.add_road(Road("bypass", "n0_0", "n1_0"))
+    network.update_congestion({road_id: rng.random() for road_id in network.roads})
+    if closed:
+        network.close_roads(rng.sample(sorted(network.roads), int(len(network.roads) * closed)))
+    return network
+
+def build_square(congested=False, diagonal=False):
+    """
+    Four intersections in a square, i1 to i4 either via i2 or i3.
+
+    Args:
+        congested: set r2 (i1 - i3) to congestion 0.9 so the route via i2 is cheaper
+        diagonal: add a road r5 straight from i1 to i4
+    """
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("i1", 0, 0, "Start"))
+    network.add_intersection(Intersection("i2", 10, 0, "Right"))
+    network.add_intersection(Intersection("i3", 0, 10, "Top"))
+    network.add_intersection(Intersection("i4", 10, 10, "End"))
+    network.add_road(Road("r1", "i1", "i2"))
+    network.add_road(Road("r2", "i1", "i3"))
+    network.add_road(Road("r3", "i2", "i4"))
+    network.add_road(Road("r4", "i3", "i4"))
+    if diagonal:
+        network.add_road(Road("r5", "i1", "i4"))
+    if congested:
+        network.update_congestion({"r2": 0.9})
+    return network
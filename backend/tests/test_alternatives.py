@@ -0,0 +1,181 @@
+import pytest
+import math
+import random
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+from algos.pathfinding import a_star_shortest_path
+import algos.alternatives
+from algos.alternatives import k_shortest_paths, alternative_routes
+from tests.conftest import build_grid
+
+def random_network(count, extra, seed):
+    rng = random.Random(seed)
+    network = TrafficNetwork()
+    for i in range(count):
+        network.add_intersection(Intersection(f"n{i}", rng.uniform(0, 50), rng.uniform(0, 50)))
+    for i in range(1, count):
+        network.add_road(Road(f"t{i}", f"n{i}", f"n{rng.randrange(i)}"))
+    for j in range(extra):
+        a, b = rng.sample(range(count), 2)
+        network.add_road(Road(f"x{j}", f"n{a}", f"n{b}"))
+    return network
+
+def simple_paths(network, start_id, end_id):
+    """Every loopless path by brute force, as sorted (cost, path) pairs."""
+    neighbors = {}
+    for road in network.roads.values():
+        if not road.is_open:
+            continue
+        for a, b in ((road.source_id, road.target_id), (road.target_id, road.source_id)):
+            best = neighbors.setdefault(a, {})
+            best[b] = min(best.get(b, math.inf), road.weight)
+    found = []
+
+    def walk(node, path, cost):
+        if node == end_id:
+            found.append((cost, list(path)))
+            return
+        for neighbor, weight in neighbors.get(node, {}).items():
+            if neighbor not in path:
+                path.append(neighbor)
+                walk(neighbor, path, cost + weight)
+                path.pop()
+
+    walk(start_id, [start_id], 0)
+    return sorted(found)
+
+def build_ladder():
+    """
+    Two parallel streets joined by rungs:
+        a0 - a1 - a2 - a3 - a4
+        |    |    |    |    |
+        b0 - b1 - b2 - b3 - b4
+    The bottom street has no congestion, so going round by it is the clear second choice.
+    """
+    network = TrafficNetwork()
+    for i in range(5):
+        network.add_intersection(Intersection(f"a{i}", i * 10.0, 0.0))
+        network.add_intersection(Intersection(f"b{i}", i * 10.0, 10.0))
+    for i in range(5):
+        network.add_road(Road(f"r{i}", f"a{i}", f"b{i}"))
+        if i < 4:
+            network.add_road(Road(f"ra{i}", f"a{i}", f"a{i+1}"))
+            bottom = Road(f"rb{i}", f"b{i}", f"b{i+1}")
+            bottom.congestion = 0.0
+            network.add_road(bottom)
+    return network
+
+@pytest.mark.parametrize("seed", range(12))
+def test_k_shortest_matches_brute_force(seed):
+    network = random_network(9, 8, seed)
+    expected = simple_paths(network, "n0", "n8")[:5]
+    result = k_shortest_paths(network, "n0", "n8", k=5)
+    assert [cost for _, cost in result] == pytest.approx([cost for cost, _ in expected])
+    #loopless and all different
+    assert all(len(set(path)) == len(path) for path, _ in result)
+    assert len({tuple(path) for path, _ in result}) == len(result)
+
+def test_k_shortest_first_route_is_the_shortest():
+    network = random_network(30, 25, 3)
+    path, cost = a_star_shortest_path(network, "n0", "n29")
+    first_path, first_cost = k_shortest_paths(network.compile(), "n0", "n29", k=3)[0]
+    assert first_cost == pytest.approx(cost)
+    assert first_path[0] == "n0" and first_path[-1] == "n29"
+
+def test_k_shortest_respects_stretch():
+    network = random_network(9, 8, 4)
+    best = simple_paths(network, "n0", "n8")[0][0]
+    result = k_shortest_paths(network, "n0", "n8", k=50, max_stretch=0.2)
+    expected = [cost for cost, _ in simple_paths(network, "n0", "n8") if cost <= best * 1.2]
+    assert [cost for _, cost in result] == pytest.approx(expected)
+
+def test_k_shortest_tree_stays_near_short_routes(monkeypatch):
+    network = build_grid(40, 2)
+    trees = []
+    bounded_tree = algos.alternatives._bounded_tree
+
+    def keep_tree(*args):
+        trees.append(bounded_tree(*args))
+        return trees[-1]
+
+    monkeypatch.setattr(algos.alternatives, "_bounded_tree", keep_tree)
+    result = k_shortest_paths(network, "n0_0", "n3_3", k=4)
+    #same routes as with a stretch cap that lets all of them through
+    capped = k_shortest_paths(network, "n0_0", "n3_3", k=4, max_stretch=result[-1][1] / result[0][1] - 1 + 1e-9)
+    assert [cost for _, cost in result] == pytest.approx([cost for _, cost in capped])
+    assert len(trees[0].order) < len(network.intersections) // 10
+
+def test_k_shortest_fewer_routes_than_asked():
+    network = build_ladder()
+    everything = simple_paths(network, "a0", "b4")
+    assert len(k_shortest_paths(network, "a0", "b4", k=len(everything) + 5)) == len(everything)
+
+def test_k_shortest_skips_closed_roads():
+    network = build_ladder()
+    network.close_road("r2")
+    for path, _ in k_shortest_paths(network, "a0", "b4", k=10):
+        assert ("a2", "b2") not in zip(path, path[1:]) and ("b2", "a2") not in zip(path, path[1:])
+
+def test_parallel_roads_are_one_route():
+    network = build_ladder()
+    network.add_road(Road("ra1_twin", "a1", "a2"))
+    paths = [tuple(path) for path, _ in k_shortest_paths(network, "a0", "a4", k=6)]
+    assert len(set(paths)) == len(paths)
+
+@pytest.mark.parametrize("method", ["plateau", "penalty"])
+def test_alternatives_on_ladder(method):
+    network = build_ladder()
+    routes = alternative_routes(network, "a0", "a4", count=3, method=method, max_stretch=1.0, max_overlap=0.5)
+    best_path, best_cost = a_star_shortest_path(network, "a0", "a4")
+    assert routes[0] == (best_path, pytest.approx(best_cost))
+    assert len(routes) >= 2
+    for path, cost in routes:
+        assert path[0] == "a0" and path[-1] == "a4"
+        assert len(set(path)) == len(path)
+        assert cost <= best_cost * 2.0 + 1e-9
+    #the alternative leaves the top street for most of its length
+    assert sum(node.startswith("b") for node in routes[1][0]) >= 3
+
+@pytest.mark.parametrize("method", ["plateau", "penalty"])
+@pytest.mark.parametrize("seed", range(6))
+def test_alternatives_constraints(method, seed):
+    network = random_network(60, 60, seed)
+    best_cost = a_star_shortest_path(network, "n0", "n59")[1]
+    routes = alternative_routes(network, "n0", "n59", count=4, method=method, max_stretch=0.5, max_overlap=0.7)
+    assert routes[0][1] == pytest.approx(best_cost)
+    compact = network.compile()
+    edge_sets = []
+    for path, cost in routes:
+        assert len(set(path)) == len(path)
+        assert cost <= best_cost * 1.5 + 1e-9
+        edge_sets.append({frozenset(step) for step in zip(path, path[1:])})
+        assert cost == pytest.approx(sum(min(r.weight for r in network.roads.values()
+                                             if r.is_open and {r.source_id, r.target_id} == set(step))
+                                         for step in zip(path, path[1:])))
+    #every alternative shares little with the routes before it
+    for i, (path, cost) in enumerate(routes):
+        for earlier in edge_sets[:i]:
+            shared = sum(min(r.weight for r in network.roads.values()
+                             if r.is_open and {r.source_id, r.target_id} == set(step))
+                         for step in zip(path, path[1:]) if frozenset(step) in earlier)
+            assert shared <= 0.7 * cost + 1e-9
+
+def test_same_start_and_end():
+    network = build_ladder()
+    assert k_shortest_paths(network, "a1", "a1") == [(["a1"], 0)]
+    assert alternative_routes(network, "a1", "a1") == [(["a1"], 0)]
+
+def test_errors():
+    network = build_ladder()
+    network.add_intersection(Intersection("island", 100.0, 100.0))
+    with pytest.raises(ValueError):
+        k_shortest_paths(network, "a0", "island")
+    with pytest.raises(ValueError):
+        alternative_routes(network, "a0", "island")
+    with pytest.raises(ValueError):
+        k_shortest_paths(network, "a0", "nowhere")
+    with pytest.raises(ValueError):
+        k_shortest_paths(network, "a0", "a4", k=0)
+    with pytest.raises(ValueError):
+        alternative_routes(network, "a0", "a4", method="scenic")
@@ -0,0 +1,58 @@
+import pytest
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+from models.weights import BPRWeight
+from algos.assignment import assign_traffic
+
+def build_two_routes():
+    """A short route a-n-b and a longer one a-s-b, each road with capacity 100."""
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("a", 0, 0))
+    network.add_intersection(Intersection("b", 100, 0))
+    network.add_intersection(Intersection("n", 50, 10))
+    network.add_intersection(Intersection("s", 50, -40))
+    roads = [Road("an", "a", "n"), Road("nb", "n", "b"), Road("as", "a", "s"), Road("sb", "s", "b")]
+    for road in roads:
+        road.capacity = 100
+    network.add_roads(roads)
+    return network
+
+def route_costs(network):
+    north = network.roads["an"].weight + network.roads["nb"].weight
+    south = network.roads["as"].weight + network.roads["sb"].weight
+    return north, south
+
+@pytest.mark.parametrize("method", ["frank-wolfe", "msa"])
+def test_reaches_equilibrium(method):
+    network = build_two_routes()
+    result = assign_traffic(network, {("a", "b"): 300}, method=method, max_iterations=200,
+                            tolerance=1e-3, formula=BPRWeight())
+
+    assert result.converged
+    assert result.gaps[-1] <= 1e-3
+    assert result.gaps[0] > result.gaps[-1]
+
+    # both routes are used and cost about the same
+    north, south = route_costs(network)
+    assert abs(north - south) / north < 0.01
+    assert 0 < result.volumes["as"] < result.volumes["an"]
+    assert abs(result.volumes["an"] + result.volumes["as"] - 300) < 0.001
+    assert network.roads["an"].volume == result.volumes["an"]
+
+def test_light_demand_takes_shortest_route():
+    network = build_two_routes()
+    result = assign_traffic(network, [("a", "b", 1), ("b", "a", 1)], formula=BPRWeight())
+    assert result.converged
+    assert result.volumes["an"] == 2 and result.volumes["as"] == 0
+
+def test_errors():
+    network = build_two_routes()
+    with pytest.raises(ValueError):
+        assign_traffic(network, {("a", "b"): 1}, method="magic")
+    with pytest.raises(ValueError):
+        assign_traffic(network, {("a", "nope"): 1})
+
+    network.add_intersection(Intersection("island", 0, 500))
+    with pytest.raises(ValueError):
+        assign_traffic(network, {("a", "island"): 1})
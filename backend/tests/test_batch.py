@@ -0,0 +1,69 @@
+import pytest
+import math
+from concurrent.futures import ThreadPoolExecutor
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+from algos.pathfinding import a_star_shortest_path
+from algos.batch import route_many, RouteResult
+
+def build_line(length):
+    """Intersections in a line plus one unreachable island."""
+    network = TrafficNetwork()
+    for i in range(length):
+        network.add_intersection(Intersection(f"i{i}", i * 10, 0))
+    for i in range(length - 1):
+        network.add_road(Road(f"r{i}", f"i{i}", f"i{i+1}"))
+    network.add_intersection(Intersection("island", 0, 50))
+    return network
+
+def make_pairs(length):
+    pairs = [(f"i{a}", f"i{b}") for a in range(length) for b in range(0, length, 3)]
+    pairs.insert(5, ("i0", "island"))
+    pairs.insert(9, ("nonexistent", "i1"))
+    return pairs
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_route_many_in_order(workers):
+    """Test that results come back in input order with per-pair errors."""
+    network = build_line(8)
+    pairs = make_pairs(8)
+
+    results = list(route_many(network, pairs, workers=workers, chunksize=4))
+    assert len(results) == len(pairs)
+
+    for (start, end), result in zip(pairs, results):
+        assert isinstance(result, RouteResult)
+        assert (result.start_id, result.end_id) == (start, end)
+        try:
+            expected_path, expected_cost = a_star_shortest_path(network, start, end)
+        except ValueError as error:
+            assert result.path is None
+            assert result.cost == math.inf
+            assert result.error == str(error)
+            continue
+        assert result.error is None
+        assert result.path == expected_path
+        assert abs(result.cost - expected_cost) < 0.001
+
+def test_route_many_lazy_input():
+    """Test that a generator of pairs and search options are accepted."""
+    network = build_line(5)
+    pairs = ((f"i{a}", "i4") for a in range(5))
+
+    results = list(route_many(network, pairs, workers=2, chunksize=2, algorithm="bidirectional"))
+    assert [r.cost for r in results] == [60.0, 45.0, 30.0, 15.0, 0]
+
+def test_concurrent_calls_keep_their_own_network():
+    """Test that route_many calls running at the same time each route on their own network."""
+    short, long = build_line(5), build_line(5)
+    long.update_congestion({road_id: 1.5 for road_id in long.roads})
+    pairs = [(f"i{a}", "i4") for a in range(5)]
+
+    def run(network):
+        return [r.cost for r in route_many(network, pairs, workers=2, chunksize=1)]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(run, network) for network in (short, long) * 3]
+        costs = [future.result() for future in futures]
+    assert costs == [[60.0, 45.0, 30.0, 15.0, 0], [100.0, 75.0, 50.0, 25.0, 0]] * 3
@@ -0,0 +1,78 @@
+import pytest
+from models.intersection import Intersection
+from algos.cache import RouteCache
+from tests.conftest import build_square
+
+def test_hits_and_misses():
+    """Test that repeated queries are served from the cache."""
+    cache = RouteCache(build_square())
+
+    path, cost = cache.route("i1", "i4")
+    assert cache.stats()["misses"] == 1
+
+    # mutating the returned path must not leak into the cache
+    path.append("garbage")
+    again, again_cost = cache.route("i1", "i4")
+    assert again[-1] == "i4"
+    assert again_cost == cost
+    assert cache.stats()["hits"] == 1
+    assert len(cache) == 1
+
+def test_lru_eviction():
+    """Test that the least recently used route is evicted first."""
+    cache = RouteCache(build_square(), maxsize=2)
+    cache.route("i1", "i2")
+    cache.route("i1", "i3")
+    cache.route("i1", "i2")  # i1->i3 is now least recently used
+    cache.route("i1", "i4")
+
+    assert cache.stats()["evictions"] == 1
+    cache.route("i1", "i2")
+    assert cache.stats()["hits"] == 2
+    cache.route("i1", "i3")
+    assert cache.stats()["misses"] == 4
+
+def test_version_invalidation():
+    """Test that network mutations stop stale routes from being served."""
+    network = build_square()
+    cache = RouteCache(network)
+    path, _ = cache.route("i1", "i4")
+
+    network.close_road(network.get_road_between(path[0], path[1]).id)
+    new_path, _ = cache.route("i1", "i4")
+    assert new_path != path
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["hits"] == 0
+
+    network.update_congestion({"r2": 0.0})
+    cache.route("i1", "i4")
+    assert cache.stats()["misses"] == 3
+
+def test_ttl():
+    """Test that entries older than the ttl are recomputed."""
+    now = [0.0]
+    cache = RouteCache(build_square(), ttl=5, clock=lambda: now[0])
+    cache.route("i1", "i4")
+
+    now[0] = 4.0
+    cache.route("i1", "i4")
+    assert cache.stats()["hits"] == 1
+
+    now[0] = 10.0
+    cache.route("i1", "i4")
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["misses"] == 2
+
+def test_errors_are_not_cached():
+    """Test that failed searches raise every time and are not stored."""
+    network = build_square()
+    network.add_intersection(Intersection("island", 50, 50))
+    cache = RouteCache(network, algorithm="bidirectional")
+
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            cache.route("i1", "island")
+    assert len(cache) == 0
+
+    with pytest.raises(ValueError):
+        RouteCache(network, maxsize=0)
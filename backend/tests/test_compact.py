@@ -0,0 +1,100 @@
+import pytest
+from models.intersection import Intersection
+from models.compact import CompactNetwork
+from algos.pathfinding import a_star_shortest_path
+from tests.conftest import build_square
+
+def test_compile_csr_layout():
+    """Test that the CSR arrays mirror the adjacency list."""
+    network = build_square(diagonal=True)
+    compact = network.compile()
+
+    assert compact.node_ids == ["i1", "i2", "i3", "i4"]
+    assert list(compact.xs) == [0, 10, 0, 10]
+    assert list(compact.ys) == [0, 0, 10, 10]
+    assert len(compact.offsets) == 5
+    assert compact.edge_count == 10  # 5 roads, both directions
+
+    for node_id, neighbors in network.adjacency_list.items():
+        assert sorted(compact.neighbors(node_id)) == sorted(neighbors)
+
+def test_compile_is_cached_until_mutation():
+    """Test that compile() reuses its result until the graph structure changes."""
+    network = build_square(diagonal=True)
+    compact = network.compile()
+    assert network.compile() is compact
+
+    network.add_intersection(Intersection("i5", 20, 20))
+    recompiled = network.compile()
+    assert recompiled is not compact
+    assert recompiled.node_count == 5
+
+def test_closures_are_masked_in_place():
+    """Test that closing and reopening roads flips masks instead of recompiling."""
+    network = build_square(diagonal=True)
+    compact = network.compile()
+
+    network.close_road("r5")
+    assert network.compile() is compact
+    assert compact.edge_count == 10  # closed road is still stored
+    assert sum(compact.edge_open) == 8
+    assert sorted(compact.neighbors("i1")) == sorted(network.adjacency_list["i1"])
+
+    path, _ = a_star_shortest_path(compact, "i1", "i4")
+    assert len(path) == 3
+
+    network.reopen_road("r5")
+    assert sum(compact.edge_open) == 10
+    assert a_star_shortest_path(compact, "i1", "i4")[0] == ["i1", "i4"]
+
+    # a road closed before compiling is masked from the start
+    network.close_road("r1")
+    assert sum(CompactNetwork.from_network(network).edge_open) == 8
+
+def test_a_star_on_compact_matches_dict_search():
+    """Test that A* returns the same result on the compiled network."""
+    network = build_square(diagonal=True)
+    compact = network.compile()
+
+    for start in network.intersections:
+        for end in network.intersections:
+            expected_path, expected_cost = a_star_shortest_path(network, start, end)
+            path, cost = a_star_shortest_path(compact, start, end)
+            assert abs(cost - expected_cost) < 0.001
+            assert path[0] == start and path[-1] == end
+            assert len(path) == len(expected_path)
+
+def test_a_star_on_compact_errors():
+    """Test the ValueError contract on the compiled network."""
+    network = build_square(diagonal=True)
+    network.add_intersection(Intersection("island", 50, 50))
+    compact = network.compile()
+
+    with pytest.raises(ValueError):
+        a_star_shortest_path(compact, "nonexistent", "i1")
+    with pytest.raises(ValueError):
+        a_star_shortest_path(compact, "i1", "nonexistent")
+    with pytest.raises(ValueError):
+        a_star_shortest_path(compact, "i1", "island")
+
+    assert a_star_shortest_path(compact, "i1", "i1") == (["i1"], 0)
+
+def test_from_network_equals_compile():
+    """Test building a CompactNetwork directly."""
+    network = build_square(diagonal=True)
+    compact = CompactNetwork.from_network(network)
+    assert compact.index_of("i3") == 2
+    assert compact.index_of("nonexistent") is None
+    assert list(compact.offsets) == list(network.compile().offsets)
+
+def test_copy_costs_is_independent():
+    """Test that patching a cost copy leaves the original view alone."""
+    compact = CompactNetwork.from_network(build_square(diagonal=True))
+    copy = compact.copy_costs()
+    assert copy.targets is compact.targets
+
+    copy.set_road_open("r1", False)
+    copy.set_road_weight("r2", 99.0)
+    assert sorted(compact.neighbors("i1")) != sorted(copy.neighbors("i1"))
+    assert all(weight != 99.0 for weight in compact.weights)
+    assert [entry for entry in copy.neighbors("i1") if entry[0] != "i4"] == [("i3", 99.0)]
@@ -0,0 +1,79 @@
+import pytest
+import random
+from models.intersection import Intersection
+from algos.pathfinding import a_star_shortest_path
+from algos.contraction import ContractionHierarchy
+from tests.conftest import build_grid
+
+def assert_same_route(network, hierarchy, start, end):
+    try:
+        _, expected_cost = a_star_shortest_path(network, start, end)
+    except ValueError:
+        with pytest.raises(ValueError):
+            hierarchy.query(start, end)
+        return
+
+    path, cost = hierarchy.query(start, end)
+    assert abs(cost - expected_cost) < 0.001
+    assert path[0] == start and path[-1] == end
+
+    # unpacked path must only use real open roads and add up to the cost
+    total = 0
+    for a, b in zip(path, path[1:]):
+        road = network.get_road_between(a, b)
+        assert road is not None and road.is_open
+        total += road.weight
+    assert abs(total - cost) < 0.001
+
+def test_query_matches_a_star():
+    """Test that hierarchy queries agree with A* on every sampled pair."""
+    network = build_grid(8, seed=11, closed=0.1, bypass=True)
+    hierarchy = ContractionHierarchy.build(network)
+    ids = sorted(network.intersections)
+    rng = random.Random(11)
+
+    for _ in range(60):
+        assert_same_route(network, hierarchy, rng.choice(ids), rng.choice(ids))
+
+def test_query_errors():
+    """Test the ValueError contract."""
+    network = build_grid(3, seed=12, closed=0.1, bypass=True)
+    network.add_intersection(Intersection("island", 100, 100))
+    hierarchy = ContractionHierarchy.build(network)
+
+    assert hierarchy.query("n0_0", "n0_0") == (["n0_0"], 0)
+    with pytest.raises(ValueError):
+        hierarchy.query("nonexistent", "n0_0")
+    with pytest.raises(ValueError):
+        hierarchy.query("n0_0", "nonexistent")
+    with pytest.raises(ValueError):
+        hierarchy.query("n0_0", "island")
+
+def test_save_and_load(tmp_path):
+    """Test that a saved hierarchy answers the same queries after loading."""
+    network = build_grid(6, seed=13, closed=0.1, bypass=True)
+    hierarchy = ContractionHierarchy.build(network)
+
+    path = tmp_path / "network.ch"
+    hierarchy.save(str(path))
+    loaded = ContractionHierarchy.load(str(path))
+
+    assert loaded.node_ids == hierarchy.node_ids
+    assert loaded.version == hierarchy.version
+    assert list(loaded.up_weights) == list(hierarchy.up_weights)
+    for start, end in [("n0_0", "n5_5"), ("n2_3", "n4_0"), ("n5_0", "n0_5")]:
+        assert_same_route(network, loaded, start, end)
+
+    bogus = tmp_path / "bogus.ch"
+    bogus.write_bytes(b"not a hierarchy")
+    with pytest.raises(ValueError):
+        ContractionHierarchy.load(str(bogus))
+
+def test_is_stale():
+    """Test that network changes mark the hierarchy as stale."""
+    network = build_grid(3, seed=14, closed=0.1, bypass=True)
+    hierarchy = ContractionHierarchy.build(network)
+    assert not hierarchy.is_stale(network)
+
+    network.update_congestion({"h0_0": 0.9})
+    assert hierarchy.is_stale(network)
@@ -0,0 +1,94 @@
+import pytest
+import math
+import random
+from models.intersection import Intersection
+from models.road import Road
+from algos.pathfinding import dijkstra_tree
+from algos.dynamic import DynamicRoutes
+from tests.conftest import build_grid, build_square
+
+def test_only_affected_routes_are_reported():
+    network = build_square(congested=True)
+    routes = DynamicRoutes(network)
+    assert routes.register("a", "i1", "i4") == (["i1", "i2", "i4"], 30)
+    routes.register("b", "i1", "i3")
+    routes.register("c", "i4", "i2")
+
+    assert routes.close_roads(["r1"]) == {"a"}
+    assert routes.route("a")[0] == ["i1", "i3", "i4"]
+    assert abs(routes.route("a")[1] - 34) < 0.001
+
+    # a road off every route getting slower changes nothing
+    assert routes.update_congestion({"r1": 2.0}) == set()
+
+    assert routes.reopen_roads(["r1"]) == set()
+    assert routes.update_congestion({"r1": 0.0}) == {"a"}
+    assert routes.route("a") == (["i1", "i2", "i4"], 25)
+
+def test_unreachable_and_back():
+    network = build_square(congested=True)
+    routes = DynamicRoutes(network)
+    routes.register("a", "i1", "i4")
+    assert routes.close_roads(["r3", "r4"]) == {"a"}
+    with pytest.raises(ValueError):
+        routes.route("a")
+    assert routes.reopen_roads(["r4"]) == {"a"}
+    assert routes.route("a")[0] == ["i1", "i3", "i4"]
+
+def test_refresh_and_structural_changes():
+    network = build_square(congested=True)
+    routes = DynamicRoutes(network)
+    routes.register("a", "i1", "i4")
+
+    # changed behind its back
+    network.close_road("r3")
+    assert routes.refresh() == {"a"}
+    assert routes.refresh() == set()
+
+    network.add_intersection(Intersection("i5", 5, 5))
+    network.add_road(Road("r5", "i1", "i5"))
+    network.add_road(Road("r6", "i5", "i4"))
+    assert routes.refresh() == {"a"}
+    assert routes.route("a")[0] == ["i1", "i5", "i4"]
+
+def test_errors():
+    routes = DynamicRoutes(build_square(congested=True))
+    with pytest.raises(ValueError):
+        routes.register("a", "nope", "i4")
+    with pytest.raises(ValueError):
+        routes.route("a")
+
+def test_repairs_match_full_searches():
+    """Test random closures, reopenings and congestion changes against fresh Dijkstra trees."""
+    network = build_grid(12, seed=3)
+    rng = random.Random(5)
+    ids = sorted(network.intersections)
+    routes = DynamicRoutes(network)
+    pairs = {f"route{i}": (rng.choice(ids), rng.choice(ids)) for i in range(30)}
+    for route_id, (origin, destination) in pairs.items():
+        routes.register(route_id, origin, destination)
+
+    road_ids = sorted(network.roads)
+    closed = set()
+    for _ in range(60):
+        action = rng.random()
+        if action < 0.4:
+            batch = rng.sample(road_ids, 3)
+            routes.close_roads(batch)
+            closed.update(batch)
+        elif action < 0.7 and closed:
+            batch = rng.sample(sorted(closed), min(3, len(closed)))
+            routes.reopen_roads(batch)
+            closed.difference_update(batch)
+        else:
+            routes.update_congestion({road_id: rng.random() * 2 for road_id in rng.sample(road_ids, 5)})
+
+        compact = network.compile()
+        for route_id, (origin, destination) in pairs.items():
+            distances, _ = dijkstra_tree(compact, compact.index_of(origin))
+            expected = distances[compact.index_of(destination)]
+            if expected == math.inf:
+                with pytest.raises(ValueError):
+                    routes.route(route_id)
+            else:
+                assert abs(routes.route(route_id)[1] - expected) < 1e-9
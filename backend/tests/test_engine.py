@@ -0,0 +1,93 @@
+import pytest
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+from sim.engine import Simulation
+from tests.conftest import build_grid
+
+def build_line():
+    """Three intersections in a line, 100 apart."""
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("i1", 0, 0))
+    network.add_intersection(Intersection("i2", 100, 0))
+    network.add_intersection(Intersection("i3", 200, 0))
+    network.add_road(Road("r1", "i1", "i2"))
+    network.add_road(Road("r2", "i2", "i3"))
+    return network
+
+def test_vehicle_drives_its_route():
+    """Test that a vehicle moves along the roads and arrives on time."""
+    network = build_line()
+    sim = Simulation(network, dt=1.0, speed=10.0, jam_density=1.0)
+    vehicle = sim.add_vehicle("i1", "i3")
+    assert sim.vehicle_position(vehicle) == ("r1", "i2", 0.0)
+
+    sim.step(5)
+    road_id, heading, offset = sim.vehicle_position(vehicle)
+    assert road_id == "r1" and heading == "i2"
+    # one vehicle on a 100 long road holding 100 slows it down by 1%
+    assert 40 < offset < 50
+
+    sim.step(20)
+    assert sim.vehicle_position(vehicle) is None
+    assert sim.arrived == 1
+    assert sim.active_count == 0
+    assert 20 < sim.arrival_time(vehicle) < 21
+
+def test_occupancy_feeds_congestion():
+    """Test that vehicles on a road raise its congestion and weight."""
+    network = build_line()
+    sim = Simulation(network, speed=1.0, jam_density=0.1)
+    sim.add_vehicles([("i1", "i2")] * 5)
+
+    sim.step()
+    assert sim.road_occupancy("r1") == 5
+    assert sim.road_occupancy("r2") == 0
+    assert abs(network.roads["r1"].congestion - 0.5) < 0.001
+    assert network.roads["r2"].congestion == 0
+    assert abs(network.roads["r1"].weight - 150) < 0.001
+    assert abs(network.intersections["i2"].congestion - 5 / 20) < 0.001
+
+    # everyone arrives and the road clears again
+    sim.step(500)
+    assert sim.arrived == 5
+    assert network.roads["r1"].congestion == 0
+
+def test_reverse_direction_and_shared_routes():
+    """Test that roads can be driven both ways and equal trips share a route."""
+    network = build_line()
+    sim = Simulation(network, speed=10.0)
+    first = sim.add_vehicle("i3", "i1")
+    second = sim.add_vehicle("i3", "i1")
+    assert sim.vehicle_position(first) == ("r2", "i2", 0.0)
+    assert len(sim._route_offsets) == 2
+    assert sim.add_vehicle("i2", "i2") == second + 1
+    assert sim.arrived == 1
+
+def test_unroutable_vehicles():
+    network = build_line()
+    network.add_intersection(Intersection("island", 500, 500))
+    sim = Simulation(network)
+    with pytest.raises(ValueError):
+        sim.add_vehicle("i1", "island")
+    with pytest.raises(ValueError):
+        sim.add_vehicle("nope", "i1")
+    assert sim.active_count == 0
+
+def test_route_storage_stays_bounded():
+    """Test that routes from before a weight change are reclaimed once no vehicle drives them."""
+    network = build_grid(6, seed=9)
+    sim = Simulation(network, speed=10.0)
+    trips = [("n0_0", "n5_5"), ("n5_0", "n0_5"), ("n2_0", "n3_5")]
+    vehicles = []
+    for tick in range(400):
+        # every feedback bumps the network version, so each new vehicle needs a fresh route
+        vehicles.append(sim.add_vehicle(*trips[tick % len(trips)]))
+        sim.step()
+        # a route has fewer roads than the grid has intersections
+        assert len(sim._route_edges) <= 2 * 36 * (sim.active_count + 1)
+
+    # vehicles whose routes were moved still drive them to the end
+    sim.step(200)
+    assert sim.arrived == len(vehicles) and sim.active_count == 0
+    assert all(sim.arrival_time(vehicle) is not None for vehicle in vehicles)
@@ -0,0 +1,36 @@
+import pytest
+from bench.generators import GENERATORS, grid_network, radial_network, random_geometric_network
+from algos.pathfinding import a_star_shortest_path
+
+def signature(network):
+    return (sorted((i.id, i.x, i.y, i.congestion) for i in network.intersections.values()),
+            sorted((r.id, r.source_id, r.target_id, r.weight) for r in network.roads.values()))
+
+@pytest.mark.parametrize("kind", sorted(GENERATORS))
+def test_same_seed_same_network(kind):
+    generate = GENERATORS[kind]
+    assert signature(generate(200, 7)) == signature(generate(200, 7))
+    assert signature(generate(200, 7)) != signature(generate(200, 8))
+
+def test_grid_network():
+    network = grid_network(100)
+    assert len(network.intersections) == 100
+    #10x10 grid, 9 roads per row and column
+    assert len(network.roads) == 2 * 10 * 9
+    path, _ = a_star_shortest_path(network, "g0_0", "g9_9")
+    assert len(path) == 19
+
+def test_radial_network():
+    network = radial_network(321, spokes=32)
+    assert len(network.intersections) == 321
+    #32 spokes from the centre, 10 rings, 9 links between rings per spoke
+    assert len(network.roads) == 32 + 32 * 10 + 32 * 9
+    path, _ = a_star_shortest_path(network, "r10_0", "r10_16")
+    assert path[0] == "r10_0" and path[-1] == "r10_16"
+
+def test_random_geometric_network():
+    network = random_geometric_network(500, seed=3, neighbors=3)
+    assert len(network.intersections) == 500
+    #every node links to its 3 nearest, shared links are counted once
+    assert 500 * 3 / 2 <= len(network.roads) <= 500 * 3
+    assert all(network.adjacency_list[node_id] for node_id in network.intersections)
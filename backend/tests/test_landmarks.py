@@ -0,0 +1,78 @@
+import pytest
+import random
+from models.intersection import Intersection
+from algos.pathfinding import a_star_shortest_path, dijkstra_tree
+from algos.landmarks import LandmarkIndex
+from tests.conftest import build_grid
+
+def test_landmark_selection():
+    """Test that the requested number of distinct landmarks is picked."""
+    network = build_grid(6, seed=1)
+    landmarks = LandmarkIndex(network, count=4)
+
+    assert len(landmarks.landmark_ids) == 4
+    assert len(set(landmarks.landmark_ids)) == 4
+    assert len(landmarks.tables) == 4
+    assert all(len(table) == 36 for table in landmarks.tables)
+
+def test_lower_bound_is_admissible():
+    """Test that the landmark bound never overestimates and beats straight-line distance."""
+    network = build_grid(6, seed=2)
+    landmarks = LandmarkIndex(network, count=4)
+    compact = network.compile()
+
+    target = compact.index_of("n5_5")
+    distances, _ = dijkstra_tree(compact, target)
+    tighter = 0
+    for node_id in network.intersections:
+        exact = distances[compact.index_of(node_id)]
+        bound = landmarks.lower_bound(node_id, "n5_5")
+        assert bound <= exact + 1e-9
+
+        a, b = network.intersections[node_id], network.intersections["n5_5"]
+        if bound > ((a.x - b.x) ** 2 + (a.y - b.y) ** 2) ** 0.5:
+            tighter += 1
+    assert tighter > 0
+
+def test_a_star_with_landmarks():
+    """Test that A* with landmarks still finds optimal routes."""
+    network = build_grid(7, seed=3)
+    landmarks = LandmarkIndex(network, count=4)
+    ids = sorted(network.intersections)
+    rng = random.Random(3)
+
+    for _ in range(30):
+        start, end = rng.choice(ids), rng.choice(ids)
+        _, expected_cost = a_star_shortest_path(network, start, end)
+        for algorithm in ("astar", "bidirectional"):
+            path, cost = a_star_shortest_path(network, start, end, algorithm=algorithm, landmarks=landmarks)
+            assert abs(cost - expected_cost) < 0.001
+            assert path[0] == start and path[-1] == end
+
+def test_refresh_after_congestion_drop():
+    """Test that tables are refreshed when congestion changes."""
+    network = build_grid(5, seed=4)
+    landmarks = LandmarkIndex(network, count=3)
+    assert not landmarks.is_stale
+
+    # clearing congestion makes every road cheaper, old tables would overestimate
+    network.update_congestion({road_id: 0.0 for road_id in network.roads})
+    assert landmarks.is_stale
+
+    path, cost = a_star_shortest_path(network, "n0_0", "n4_4", landmarks=landmarks)
+    assert abs(cost - 80.0) < 0.001
+    assert not landmarks.is_stale
+
+    # an explicit refresh works too
+    network.update_congestion({"h0_0": 1.0})
+    landmarks.refresh()
+    assert not landmarks.is_stale
+
+def test_landmarks_on_disconnected_network():
+    """Test that unreachable targets still raise ValueError."""
+    network = build_grid(3, seed=5)
+    network.add_intersection(Intersection("island", 100, 100))
+    landmarks = LandmarkIndex(network, count=3)
+
+    with pytest.raises(ValueError):
+        a_star_shortest_path(network, "n0_0", "island", landmarks=landmarks)
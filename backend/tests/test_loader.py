@@ -0,0 +1,138 @@
+import pytest
+import json
+from models.loader import load_network, NetworkLoadError
+from tests.conftest import build_grid
+
+NODES_CSV = """id,x,y,name,congestion
+i1,0,0,Start,0.25
+i2,3,4,,
+i3,3,0,End,0.5
+"""
+
+EDGES_CSV = """id,source,target,congestion,is_open
+r1,i1,i2,,
+r2,i2,i3,1.0,true
+r3,i1,i3,0.0,false
+"""
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def check_small_network(network):
+    assert sorted(network.intersections) == ["i1", "i2", "i3"]
+    assert network.intersections["i1"].name == "Start"
+    assert network.intersections["i1"].congestion == 0.25
+    assert network.intersections["i2"].name == "Intersection_i2"
+
+    assert network.get_road("r1").weight == 5 * 1.5
+    assert network.get_road("r2").weight == 4 * 2.0
+    assert network.get_road("r3").is_open == False
+    assert sorted(network.adjacency_list["i1"]) == [("i2", 7.5)]
+    assert sorted(network.adjacency_list["i2"]) == [("i1", 7.5), ("i3", 8.0)]
+
+def test_load_csv(tmp_path):
+    network = load_network(write(tmp_path / "nodes.csv", NODES_CSV),
+                           write(tmp_path / "edges.csv", EDGES_CSV))
+    check_small_network(network)
+
+def test_load_json_lines(tmp_path):
+    nodes = [
+        {"id": "i1", "name": "Start", "x": 0, "y": 0, "congestion": 0.25},
+        {"id": "i2", "x": 3, "y": 4},
+        {"id": "i3", "name": "End", "x": 3, "y": 0},
+    ]
+    edges = [
+        {"id": "r1", "source": "i1", "target": "i2"},
+        {"id": "r2", "source": "i2", "target": "i3", "congestion": 1.0},
+        {"id": "r3", "source": "i1", "target": "i3", "is_open": False},
+    ]
+    network = load_network(write(tmp_path / "nodes.jsonl", "\n".join(json.dumps(n) for n in nodes) + "\n\n"),
+                           write(tmp_path / "edges.jsonl", "\n".join(json.dumps(e) for e in edges)))
+    check_small_network(network)
+
+def test_load_geojson_in_small_chunks(tmp_path, monkeypatch):
+    """Test GeoJSON streaming, with a tiny read size so features span chunks."""
+    import models.loader
+    monkeypatch.setattr(models.loader, "_CHUNK_SIZE", 7)
+
+    nodes = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "id": "i1", "geometry": {"type": "Point", "coordinates": [0, 0]},
+         "properties": {"name": "Start", "congestion": 0.25}},
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [3, 4]}, "properties": {"id": "i2"}},
+        {"type": "Feature", "geometry": {"type": "Point", "coordinates": [3, 0]},
+         "properties": {"id": "i3", "name": "End"}},
+    ]}
+    edges = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "geometry": {"type": "LineString", "coordinates": [[0, 0], [3, 4]]},
+         "properties": {"id": "r1", "source": "i1", "target": "i2"}},
+        {"type": "Feature", "geometry": None,
+         "properties": {"id": "r2", "source": "i2", "target": "i3", "congestion": 1.0}},
+        {"type": "Feature", "geometry": None,
+         "properties": {"id": "r3", "source": "i1", "target": "i3", "is_open": False}},
+    ]}
+    network = load_network(write(tmp_path / "nodes.geojson", json.dumps(nodes, indent=2)),
+                           write(tmp_path / "edges.geojson", json.dumps(edges, indent=2)))
+    check_small_network(network)
+
+def test_errors_have_line_numbers(tmp_path):
+    nodes = write(tmp_path / "nodes.csv", NODES_CSV)
+
+    bad_endpoint = write(tmp_path / "edges.csv", "id,source,target\nr1,i1,i2\nr2,i2,nowhere\n")
+    with pytest.raises(NetworkLoadError) as error:
+        load_network(nodes, bad_endpoint)
+    assert error.value.line == 3
+    assert "nowhere" in str(error.value)
+
+    bad_number = write(tmp_path / "nodes2.csv", "id,x,y\ni1,0,0\ni2,abc,0\n")
+    with pytest.raises(NetworkLoadError) as error:
+        load_network(bad_number, bad_endpoint)
+    assert error.value.line == 3
+
+    duplicate = write(tmp_path / "edges.jsonl", '{"id": "r1", "source": "i1", "target": "i2"}\n'
+                                                '{"id": "r1", "source": "i2", "target": "i3"}\n')
+    with pytest.raises(NetworkLoadError) as error:
+        load_network(nodes, duplicate)
+    assert error.value.line == 2
+
+    geojson = write(tmp_path / "nodes.geojson", '{"type": "FeatureCollection",\n "features": [\n'
+                                                 '{"type": "Feature", "properties": {"id": "i1"}}\n]}')
+    with pytest.raises(NetworkLoadError) as error:
+        load_network(geojson, bad_endpoint)
+    assert error.value.line == 3
+
+    with pytest.raises(ValueError):
+        load_network(write(tmp_path / "nodes.txt", ""), bad_endpoint)
+
+def test_progress(tmp_path):
+    calls = []
+    load_network(write(tmp_path / "nodes.csv", NODES_CSV), write(tmp_path / "edges.csv", EDGES_CSV),
+                 progress=lambda stage, count: calls.append((stage, count)), progress_every=2)
+    assert calls == [("nodes", 2), ("nodes", 3), ("edges", 2), ("edges", 3)]
+
+def test_json_lines_round_trip(tmp_path):
+    """Test that everything to_dict() writes comes back, including the optional traffic fields."""
+    network = build_grid(3, seed=4, closed=0.2)
+    network.update_intersection_delays({"n1_1": 4.0, "n0_2": 1.5})
+    roads = list(network.roads.values())
+    roads[0].volume, roads[0].capacity, roads[0].profile_id = 30.0, 80.0, 2
+    roads[1].volume = 5.0
+
+    nodes = write(tmp_path / "nodes.jsonl", "\n".join(json.dumps(i.to_dict()) for i in network.intersections.values()))
+    edges = write(tmp_path / "edges.jsonl", "\n".join(json.dumps(r.to_dict()) for r in roads))
+    loaded = load_network(nodes, edges)
+
+    assert [i.to_dict() for i in loaded.intersections.values()] == \
+        [i.to_dict() for i in network.intersections.values()]
+    for road in roads:
+        copy = loaded.get_road(road.id).to_dict()
+        assert copy.pop("weight") == pytest.approx(road.weight)
+        expected = road.to_dict()
+        del expected["weight"]
+        assert copy == expected
+
+def test_bad_profile_id(tmp_path):
+    nodes = write(tmp_path / "nodes.csv", NODES_CSV)
+    edges = write(tmp_path / "edges.csv", "id,source,target,profile_id\nr1,i1,i2,1.5\n")
+    with pytest.raises(NetworkLoadError, match="edges.csv:2"):
+        load_network(nodes, edges)
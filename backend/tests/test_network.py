@@ -195,4 +195,233 @@ def test_network_with_multiple_roads():
     assert len(network.adjacency_list["i11"]) == 4
     
     # Check total number of roads
-    assert len(network.roads) == 12  # 6 horizontal + 6 vertical roads
\ No newline at end of file
+    assert len(network.roads) == 12  # 6 horizontal + 6 vertical roads
+def test_update_congestion():
+    """Test that congestion updates reach the adjacency list and the compiled view."""
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("i1", 0, 0))
+    network.add_intersection(Intersection("i2", 3, 4))
+    network.add_intersection(Intersection("i3", 3, 0))
+    network.add_road(Road("r1", "i1", "i2"))
+    network.add_road(Road("r2", "i1", "i3"))
+
+    compact = network.compile()
+    version = network.version
+
+    updated = network.update_congestion({"r1": 1.0, "missing": 0.3})
+    assert updated == 1
+    assert network.version == version + 1
+    assert network.get_road("r1").congestion == 1.0
+
+    # 5 units * (1 + 1.0)
+    assert abs(network.get_road("r1").weight - 10.0) < 0.001
+    assert ("i2", network.get_road("r1").weight) in network.adjacency_list["i1"]
+    assert ("i1", network.get_road("r1").weight) in network.adjacency_list["i2"]
+
+    # untouched road keeps its weight
+    assert ("i3", 3 * 1.5) in network.adjacency_list["i1"]
+
+    # the compiled view is patched, not rebuilt
+    assert network.compile() is compact
+    assert compact.version == network.version
+    assert sorted(compact.neighbors("i1")) == sorted(network.adjacency_list["i1"])
+
+def test_update_congestion_after_close():
+    """Test that updates stay consistent once entries have been removed."""
+    network = TrafficNetwork()
+    for i in range(4):
+        network.add_intersection(Intersection(f"i{i}", i * 10, 0))
+    network.add_road(Road("r01", "i0", "i1"))
+    network.add_road(Road("r02", "i0", "i2"))
+    network.add_road(Road("r03", "i0", "i3"))
+
+    network.close_road("r01")
+    network.update_congestion({"r01": 0.0, "r03": 0.0})
+
+    assert sorted(network.adjacency_list["i0"]) == [("i2", 20 * 1.5), ("i3", 30.0)]
+    assert network.adjacency_list["i3"] == [("i0", 30.0)]
+    assert network.get_road("r01").weight == 10.0
+
+def test_parallel_roads():
+    """Test that parallel roads between the same intersections are kept apart."""
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("i1", 0, 0))
+    network.add_intersection(Intersection("i2", 3, 4))
+
+    highway = Road("highway", "i1", "i2")
+    side_street = Road("side", "i2", "i1")
+    network.add_road(highway)
+    network.add_road(side_street)
+    network.update_congestion({"side": 1.0})
+
+    assert network.get_roads_between("i1", "i2") == [highway, side_street]
+    assert network.get_roads_between("i2", "i1") == [highway, side_street]
+    assert network.get_road_between("i2", "i1") == highway  # cheapest open road
+
+    # closing one road must leave the other connection in place
+    network.close_road("highway")
+    assert network.adjacency_list["i1"] == [("i2", 10.0)]
+    assert network.adjacency_list["i2"] == [("i1", 10.0)]
+    assert network.get_road_between("i1", "i2") == side_street
+
+    network.close_road("side")
+    assert network.adjacency_list["i1"] == []
+    assert network.get_road_between("i1", "i2") == highway
+
+def test_close_road_keeps_other_slots_valid():
+    """Test that swap-removal keeps later weight updates pointed at the right entries."""
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("hub", 0, 0))
+    for i in range(1, 5):
+        network.add_intersection(Intersection(f"i{i}", i, 0))
+        network.add_road(Road(f"r{i}", "hub", f"i{i}"))
+
+    network.close_road("r1")
+    network.close_road("r3")
+    network.update_congestion({"r4": 0.0, "r2": 0.0})
+
+    assert sorted(network.adjacency_list["hub"]) == [("i2", 2.0), ("i4", 4.0)]
+    assert network.adjacency_list["i4"] == [("hub", 4.0)]
+
+    # closing twice is harmless
+    network.close_road("r1")
+    assert len(network.adjacency_list["hub"]) == 2
+
+def test_reopen_road():
+    """Test reopening a closed road."""
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("i1", 0, 0))
+    network.add_intersection(Intersection("i2", 3, 4))
+    network.add_road(Road("r1", "i1", "i2"))
+
+    network.close_road("r1")
+    network.update_congestion({"r1": 1.0})  # weight changes while closed
+    network.reopen_road("r1")
+
+    assert network.get_road("r1").is_open == True
+    assert network.adjacency_list["i1"] == [("i2", 10.0)]
+    assert network.adjacency_list["i2"] == [("i1", 10.0)]
+
+    # reopening an open road does nothing
+    version = network.version
+    network.reopen_road("r1")
+    assert len(network.adjacency_list["i1"]) == 1
+    assert network.version == version
+
+def test_batch_close_and_reopen():
+    """Test closing and reopening many roads at once."""
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("hub", 0, 0))
+    for i in range(6):
+        network.add_intersection(Intersection(f"i{i}", i + 1, 0))
+        network.add_road(Road(f"r{i}", "hub", f"i{i}"))
+
+    version = network.version
+    closed = network.close_roads(["r0", "r2", "r4", "r4", "missing"])
+    assert closed == 3
+    assert network.version == version + 1
+    assert sorted(n for n, _ in network.adjacency_list["hub"]) == ["i1", "i3", "i5"]
+
+    reopened = network.reopen_roads(["r0", "r1", "r4"])
+    assert reopened == 2
+    assert network.version == version + 2
+    assert sorted(n for n, _ in network.adjacency_list["hub"]) == ["i0", "i1", "i3", "i4", "i5"]
+    assert network.adjacency_list["i4"] == [("hub", 5 * 1.5)]
+
+def test_add_roads_matches_add_road():
+    """Test that bulk insertion gives the same network as one road at a time."""
+    one_by_one = TrafficNetwork()
+    bulk = TrafficNetwork()
+    for network in (one_by_one, bulk):
+        for i in range(4):
+            network.add_intersection(Intersection(f"i{i}", i * 3, i * 4))
+
+    def make_roads():
+        roads = [Road("r01", "i0", "i1"), Road("r12", "i1", "i2"), Road("r23", "i2", "i3"), Road("r03", "i0", "i3")]
+        roads[1].congestion = 0.9
+        roads[2].is_open = False
+        return roads
+
+    for road in make_roads():
+        one_by_one.add_road(road)
+    bulk.add_roads(make_roads())
+
+    assert bulk.adjacency_list == one_by_one.adjacency_list
+    assert {r.id: r.weight for r in bulk.roads.values()} == {r.id: r.weight for r in one_by_one.roads.values()}
+    assert bulk.get_road_between("i3", "i0").id == "r03"
+
+    with pytest.raises(ValueError):
+        bulk.add_roads([Road("bad", "i0", "nowhere")])
+
+def test_recompute_weights():
+    """Test a whole-network reweight, including a formula switch."""
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("i1", 0, 0))
+    network.add_intersection(Intersection("i2", 3, 4))
+    network.add_intersection(Intersection("i3", 3, 0))
+    network.add_road(Road("r1", "i1", "i2"))
+    network.add_road(Road("r2", "i2", "i3"))
+    network.add_road(Road("r3", "i1", "i3"))
+    network.close_road("r3")
+    compact = network.compile()
+
+    # congestion edited directly on the objects, then one full recompute
+    for road in network.roads.values():
+        road.congestion = 0.0
+    version = network.version
+    network.recompute_weights()
+
+    assert network.version == version + 1
+    assert {r.id: r.weight for r in network.roads.values()} == {"r1": 5.0, "r2": 4.0, "r3": 3.0}
+    assert sorted(network.adjacency_list["i2"]) == [("i1", 5.0), ("i3", 4.0)]
+    assert network.compile() is compact
+    assert sorted(compact.neighbors("i2")) == [("i1", 5.0), ("i3", 4.0)]
+
+    # a coordinate fix plus a new formula
+    from models.weights import BPRWeight
+    network.intersections["i3"].x = 0
+    network.get_road("r2").capacity = 1
+    network.get_road("r2").volume = 1
+    network.recompute_weights(BPRWeight(alpha=1, beta=1))
+
+    # i2 (3, 4) to i3 (0, 0) is now 5 long, doubled by the BPR term
+    assert abs(network.get_road("r2").weight - 5 * 2) < 0.001
+    assert compact.xs[compact.index_of("i3")] == 0
+    assert abs(network.get_road("r1").weight - 5.0) < 0.001
+
+    # later single-road updates keep using the new formula
+    network.reopen_road("r3")
+    network.update_congestion({"r3": 0.9})
+    assert network.get_road("r3").weight == 0.0
+
+def test_update_intersection_delays():
+    """Test that intersection delays are added to the roads around them."""
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("i1", 0, 0))
+    network.add_intersection(Intersection("i2", 3, 4))
+    network.add_intersection(Intersection("i3", 3, 0))
+    network.add_road(Road("r1", "i1", "i2"))
+    network.add_road(Road("r2", "i2", "i3"))
+    network.add_road(Road("r3", "i1", "i3"))
+    network.close_road("r3")
+    compact = network.compile()
+
+    version = network.version
+    assert network.update_intersection_delays({"i1": 4.0, "nope": 1.0}) == 1
+    assert network.version == version + 1
+    assert network.intersections["i1"].delay == 4.0
+
+    # congestion 0.5 by default, plus half of i1's delay
+    assert abs(network.get_road("r1").weight - (7.5 + 2)) < 0.001
+    assert abs(network.get_road("r2").weight - 6.0) < 0.001
+    assert sorted(network.adjacency_list["i2"]) == [("i1", 9.5), ("i3", 6.0)]
+    assert abs(compact.neighbors("i1")[0][1] - 9.5) < 0.001
+
+    # closed roads are refreshed too, so reopening them picks up the delay
+    assert abs(network.get_road("r3").weight - (4.5 + 2)) < 0.001
+
+    # and the other weight paths agree
+    network.recompute_weights()
+    assert abs(network.get_road("r1").weight - 9.5) < 0.001
+    network.add_roads([Road("r4", "i1", "i2")])
+    assert abs(network.get_road("r4").weight - 9.5) < 0.001
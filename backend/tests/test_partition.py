@@ -0,0 +1,66 @@
+import pytest
+import random
+from algos.pathfinding import a_star_shortest_path
+from algos.partition import (partition_network, PartitionedNetwork, PartitionedRouter,
+                             LocalTransport, ProcessTransport)
+from tests.conftest import build_grid
+
+def path_cost(network, path):
+    return sum(network.get_road_between(a, b).weight for a, b in zip(path, path[1:]))
+
+def test_cells_and_boundary():
+    network = build_grid(6, seed=1, closed=0.1)
+    partitioned = partition_network(network, cell_size=30)
+
+    assert len(partitioned.cells) == 4
+    assert sum(len(cell.intersections) for cell in partitioned.cells.values()) == 36
+    assert partitioned.cell_of["n0_0"] == "0_0" and partitioned.cell_of["n5_5"] == "1_1"
+    # n2_0 sits at x=20 and has a road to n3_0 at x=30 in the next cell
+    assert "n2_0" in partitioned.boundary["0_0"]
+    assert "n0_0" not in partitioned.boundary["0_0"]
+
+    with pytest.raises(ValueError):
+        partition_network(network, cell_size=0)
+
+def test_stitched_routes_match_full_search():
+    network = build_grid(10, seed=2, closed=0.1)
+    partitioned = partition_network(network, cell_size=30)
+    router = PartitionedRouter(partitioned, LocalTransport.for_partition(partitioned))
+    rng = random.Random(3)
+    ids = sorted(network.intersections)
+
+    for _ in range(60):
+        start, end = rng.choice(ids), rng.choice(ids)
+        try:
+            expected_path, expected_cost = a_star_shortest_path(network, start, end)
+        except ValueError:
+            with pytest.raises(ValueError):
+                router.route(start, end)
+            continue
+        path, cost = router.route(start, end)
+        assert abs(cost - expected_cost) < 1e-9
+        assert path[0] == start and path[-1] == end
+        assert abs(path_cost(network, path) - cost) < 1e-9
+
+    with pytest.raises(ValueError):
+        router.route("nope", "n0_0")
+
+def test_saved_cells_in_worker_processes(tmp_path):
+    network = build_grid(6, seed=4, closed=0.1)
+    partition_network(network, cell_size=30).save(str(tmp_path))
+    loaded = PartitionedNetwork.load(str(tmp_path))
+    assert loaded.cells is None
+    assert len(loaded.cell_paths) == 4
+
+    with ProcessTransport(loaded.cell_paths) as transport:
+        router = PartitionedRouter(loaded, transport)
+        for start, end in [("n0_0", "n5_5"), ("n5_0", "n0_5"), ("n1_1", "n2_2")]:
+            try:
+                expected = a_star_shortest_path(network, start, end)[1]
+            except ValueError:
+                continue
+            assert abs(router.route(start, end)[1] - expected) < 1e-9
+
+def test_load_errors(tmp_path):
+    with pytest.raises(ValueError):
+        PartitionedNetwork.load(str(tmp_path))
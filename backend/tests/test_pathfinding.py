@@ -1,9 +1,11 @@
 import pytest
 import math
+import random
 from models.intersection import Intersection
 from models.road import Road
 from models.network import TrafficNetwork
-from algos.pathfinding import a_star_shortest_path
+from algos.pathfinding import a_star_shortest_path, distance_matrix
+from tests.conftest import build_grid
 
 def test_a_star_simple_path():
     """Test A* algorithm on a simple path with 3 intersections in a line."""
@@ -159,4 +161,81 @@ def test_a_star_no_path():
     
     # Try to find shortest path from i1 to i2
     with pytest.raises(ValueError):
-        a_star_shortest_path(network, "i1", "i2")
\ No newline at end of file
+        a_star_shortest_path(network, "i1", "i2")
+
+def test_bidirectional_matches_a_star():
+    """Test that bidirectional A* finds routes as short as plain A*."""
+    network = build_grid(8, seed=7, closed=0.1)
+    ids = sorted(network.intersections)
+    rng = random.Random(1)
+
+    for _ in range(40):
+        start, end = rng.choice(ids), rng.choice(ids)
+        try:
+            _, expected_cost = a_star_shortest_path(network, start, end)
+        except ValueError:
+            with pytest.raises(ValueError):
+                a_star_shortest_path(network, start, end, algorithm="bidirectional")
+            continue
+
+        path, cost = a_star_shortest_path(network, start, end, algorithm="bidirectional")
+        assert abs(cost - expected_cost) < 0.001
+        assert path[0] == start and path[-1] == end
+
+        # the path must be walkable and add up to the reported cost
+        total = sum(network.get_road_between(a, b).weight for a, b in zip(path, path[1:]))
+        assert abs(total - cost) < 0.001
+
+def test_bidirectional_errors():
+    """Test the bidirectional search keeps the ValueError contract."""
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("i1", 0, 0))
+    network.add_intersection(Intersection("i2", 10, 10))
+
+    assert a_star_shortest_path(network, "i1", "i1", algorithm="bidirectional") == (["i1"], 0)
+    with pytest.raises(ValueError):
+        a_star_shortest_path(network, "i1", "i2", algorithm="bidirectional")
+    with pytest.raises(ValueError):
+        a_star_shortest_path(network, "nonexistent", "i1", algorithm="bidirectional")
+    with pytest.raises(ValueError):
+        a_star_shortest_path(network, "i1", "i2", algorithm="dijkstra")
+
+def test_distance_matrix_matches_a_star():
+    """Test that every matrix entry equals the single-pair A* cost."""
+    network = build_grid(7, seed=21, closed=0.1)
+    ids = sorted(network.intersections)
+    rng = random.Random(21)
+
+    for n_sources, n_targets in [(3, 5), (6, 2)]:
+        sources = rng.sample(ids, n_sources)
+        targets = rng.sample(ids, n_targets)
+        costs, paths = distance_matrix(network, sources, targets, return_paths=True)
+
+        assert len(costs) == n_sources
+        assert all(len(row) == n_targets for row in costs)
+        for i, start in enumerate(sources):
+            for j, end in enumerate(targets):
+                try:
+                    _, expected_cost = a_star_shortest_path(network, start, end)
+                except ValueError:
+                    assert costs[i][j] == math.inf
+                    assert paths[i][j] is None
+                    continue
+                assert abs(costs[i][j] - expected_cost) < 0.001
+                assert paths[i][j][0] == start and paths[i][j][-1] == end
+
+def test_distance_matrix_edge_cases():
+    """Test duplicates, unreachable pairs and unknown IDs."""
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("i1", 0, 0))
+    network.add_intersection(Intersection("i2", 5, 0))
+    network.add_intersection(Intersection("island", 50, 50))
+    network.add_road(Road("r1", "i1", "i2"))
+
+    costs = distance_matrix(network, ["i1", "i1"], ["i1", "i2", "island"])
+    assert costs == [[0, 7.5, math.inf], [0, 7.5, math.inf]]
+
+    with pytest.raises(ValueError):
+        distance_matrix(network, ["nonexistent"], ["i1"])
+    with pytest.raises(ValueError):
+        distance_matrix(network, ["i1"], ["nonexistent"])
@@ -0,0 +1,58 @@
+import pytest
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+from models.profiles import CongestionProfiles
+
+def test_interpolation_and_wraparound():
+    profiles = CongestionProfiles(period=100)
+    profile = profiles.add_profile([20, 60], [0.0, 2.0])
+
+    assert profiles.congestion_at(profile, 20) == 0.0
+    assert abs(profiles.congestion_at(profile, 40) - 1.0) < 0.001
+
+    # after the last breakpoint it heads back towards the first one of the next day
+    assert abs(profiles.congestion_at(profile, 90) - 1.0) < 0.001
+    assert abs(profiles.congestion_at(profile, 5) - 0.5) < 0.001
+    assert abs(profiles.congestion_at(profile, 140) - 1.0) < 0.001
+
+def test_constant_profile():
+    profiles = CongestionProfiles()
+    profile = profiles.add_profile([0], [0.3])
+    assert profiles.congestion_at(profile, 12345) == 0.3
+
+def test_identical_profiles_are_shared():
+    profiles = CongestionProfiles()
+    first = profiles.add_profile([0, 3600], [0.1, 0.9])
+    other = profiles.add_profile([0, 7200], [0.1, 0.9])
+    assert profiles.add_profile([0, 3600], [0.1, 0.9]) == first
+    assert first != other
+    assert len(profiles) == 2
+    assert len(profiles.times) == 4
+
+def test_invalid_profiles():
+    profiles = CongestionProfiles(period=100)
+    with pytest.raises(ValueError):
+        profiles.add_profile([], [])
+    with pytest.raises(ValueError):
+        profiles.add_profile([0, 10], [0.5])
+    with pytest.raises(ValueError):
+        profiles.add_profile([10, 5], [0.5, 0.5])
+    with pytest.raises(ValueError):
+        profiles.add_profile([0, 100], [0.5, 0.5])
+    with pytest.raises(ValueError):
+        profiles.add_profile([0], [-0.5])
+
+def test_apply_sets_static_congestion():
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("i1", 0, 0))
+    network.add_intersection(Intersection("i2", 10, 0))
+    road = Road("r1", "i1", "i2")
+    network.add_road(road)
+
+    profiles = CongestionProfiles()
+    road.profile_id = profiles.add_profile([0, 43200], [0.0, 1.0])
+
+    assert profiles.apply(network, 21600) == 1
+    assert abs(road.congestion - 0.5) < 0.001
+    assert abs(road.weight - 15) < 0.001
@@ -83,4 +83,16 @@ def test_from_dict():
     
     road = Road.from_dict(data)
     assert road.congestion == 0.5  # Default
-    assert road.is_open == True    # Default
\ No newline at end of file
+    assert road.is_open == True    # Default
+    assert road.volume == 0.0      # Default
+    assert road.capacity is None   # Default
+
+def test_volume_and_capacity_round_trip():
+    """Test that volume and capacity survive to_dict/from_dict."""
+    road = Road("r1", "i1", "i2", 2.5)
+    road.volume = 40.0
+    road.capacity = 100.0
+
+    copy = Road.from_dict(road.to_dict())
+    assert copy.volume == 40.0
+    assert copy.capacity == 100.0
\ No newline at end of file
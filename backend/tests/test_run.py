@@ -0,0 +1,45 @@
+import json
+import pytest
+from bench.run import run_benchmarks, compare, main, _summarize
+
+def test_run_benchmarks_smoke():
+    results = run_benchmarks(kinds=["grid", "radial"], sizes=[100], queries=5, seed=1)
+    assert results["meta"]["seed"] == 1
+    assert [(r["kind"], r["size"]) for r in results["results"]] == [("grid", 100), ("radial", 100)]
+    for entry in results["results"]:
+        assert entry["build"]["seconds"] > 0
+        assert entry["build"]["peak_bytes"] > 0
+        for name in ("astar", "astar_compact", "bidirectional"):
+            search = entry["searches"][name]
+            assert search["count"] == 5
+            assert search["p50_ms"] <= search["p90_ms"] <= search["p99_ms"] <= search["max_ms"]
+            assert search["mean_nodes_settled"] > 0
+        assert set(entry["operations"]) == {"get_road_between", "close_road", "reopen_road", "add_road"}
+    #plain JSON all the way down
+    json.dumps(results)
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        run_benchmarks(kinds=["hexagonal"], sizes=[10])
+
+def test_compare_flags_slowdowns():
+    baseline = run_benchmarks(kinds=["grid"], sizes=[100], queries=3, measure_memory=False)
+    current = json.loads(json.dumps(baseline))
+    assert compare(current, baseline) == []
+    current["results"][0]["searches"]["astar"]["p50_ms"] *= 2
+    regressions = compare(current, baseline)
+    assert len(regressions) == 1 and "astar" in regressions[0]
+
+def test_main_writes_output(tmp_path):
+    output = tmp_path / "results.json"
+    assert main(["--kinds", "grid", "--sizes", "50", "--queries", "2", "--no-memory",
+                 "--output", str(output)]) == 0
+    results = json.loads(output.read_text())
+    assert results["results"][0]["kind"] == "grid"
+    assert main(["--kinds", "grid", "--sizes", "50", "--queries", "2", "--no-memory",
+                 "--baseline", str(output), "--threshold", "1000"]) == 0
+
+def test_zero_duration_summary_is_valid_json():
+    summary = _summarize([0.0, 0.0])
+    assert summary["per_second"] is None
+    json.dumps(summary, allow_nan=False)
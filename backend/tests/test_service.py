@@ -0,0 +1,113 @@
+import pytest
+import asyncio
+import json
+from models.intersection import Intersection
+from models.road import Road
+from service.routing import RoutingService
+from service.http import start_server
+from tests.conftest import build_square
+
+def test_duplicate_queries_share_one_search():
+    service = RoutingService(build_square(congested=True))
+
+    async def burst():
+        return await asyncio.gather(*[service.route("i1", "i4") for _ in range(20)])
+
+    results = asyncio.run(burst())
+    assert all(result == (["i1", "i2", "i4"], 30) for result in results)
+    assert service.searches == 1
+    assert service.coalesced == 19
+
+    # every caller got its own list
+    results[0][0].append("garbage")
+    assert results[1][0] == ["i1", "i2", "i4"]
+    service.close()
+
+def test_mutations_swap_snapshots():
+    network = build_square(congested=True)
+    service = RoutingService(network)
+
+    async def scenario():
+        old = service.snapshot
+        assert await service.close_roads(["r1"]) == 1
+        new = service.snapshot
+        assert new is not old
+        # searches already holding the old snapshot still see the road open
+        assert old.edge_open[old.road_edges[2 * old.road_index["r1"]]] == 1
+        assert new.version == network.version
+        assert (await service.route("i1", "i4"))[0] == ["i1", "i3", "i4"]
+
+        await service.reopen_roads(["r1"])
+        await service.update_congestion({"r1": 3.0})
+        assert (await service.route("i1", "i4"))[0] == ["i1", "i3", "i4"]
+
+        await service.add_intersection(Intersection("i5", 5, 5))
+        await service.add_roads([Road("r5", "i1", "i5"), Road("r6", "i5", "i4")])
+        assert (await service.route("i1", "i4"))[0] == ["i1", "i5", "i4"]
+
+        with pytest.raises(ValueError):
+            await service.route("i1", "nope")
+        state = await service.network_dict()
+        assert len(state["roads"]) == 6
+
+    asyncio.run(scenario())
+    service.close()
+
+async def call(port, method, target, payload=None):
+    """Send one HTTP request, return (status, decoded JSON body)."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+def test_http_api():
+    service = RoutingService(build_square(congested=True))
+
+    async def scenario():
+        server = await start_server(service, port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            assert await call(port, "GET", "/route?start=i1&end=i4") == (200, {"path": ["i1", "i2", "i4"], "cost": 30})
+            assert await call(port, "POST", "/roads/close", {"road_ids": ["r1"]}) == (200, {"closed": 1})
+            status, payload = await call(port, "GET", "/route?start=i1&end=i4&algorithm=bidirectional")
+            assert status == 200 and payload["path"] == ["i1", "i3", "i4"]
+            assert (await call(port, "POST", "/congestion", {"updates": {"r4": 0.1}}))[1] == {"updated": 1}
+
+            status, payload = await call(port, "GET", "/route?start=i1&end=nope")
+            assert status == 400 and "error" in payload
+            assert (await call(port, "GET", "/nowhere"))[0] == 404
+            assert (await call(port, "GET", "/roads/close"))[0] == 405
+            status, payload = await call(port, "GET", "/network")
+            assert status == 200 and len(payload["intersections"]) == 4
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(scenario())
+    service.close()
+
+def test_http_service_failure_is_a_500(caplog):
+    service = RoutingService(build_square(congested=True))
+
+    async def broken(*args, **kwargs):
+        raise RuntimeError("worker pool is gone")
+    service.route = broken
+
+    async def scenario():
+        server = await start_server(service, port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            assert await call(port, "GET", "/route?start=i1&end=i4") == (500, {"error": "internal server error"})
+            # the server keeps going
+            assert (await call(port, "GET", "/network"))[0] == 200
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    asyncio.run(scenario())
+    service.close()
+    assert "worker pool is gone" in caplog.text
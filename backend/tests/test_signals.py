@@ -0,0 +1,100 @@
+import pytest
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+from sim.signals import SignalModel
+from sim.engine import Simulation
+
+def build_cross():
+    """Four arms meeting at a centre intersection c, 100 long each."""
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("c", 0, 0))
+    for node_id, x, y in [("n", 0, 100), ("s", 0, -100), ("e", 100, 0), ("w", -100, 0)]:
+        network.add_intersection(Intersection(node_id, x, y))
+        network.add_road(Road(f"r{node_id}", node_id, "c"))
+    return network
+
+def approach(network, road_id, towards):
+    """CSR entry for driving road_id towards an intersection."""
+    compact = network.compile()
+    for k in range(len(compact.targets)):
+        if compact.road_ids[compact.edge_roads[k]] == road_id and compact.node_ids[compact.targets[k]] == towards:
+            return k
+
+def test_phases():
+    network = build_cross()
+    signals = SignalModel(network)
+    signals.set_signal("c", 60, [["rn", "rs"], ["re", "rw"]])
+    north, east = approach(network, "rn", "c"), approach(network, "re", "c")
+
+    assert signals.is_green(north, 0) and not signals.is_green(east, 0)
+    assert not signals.is_green(north, 30) and signals.is_green(east, 30)
+    assert signals.is_green(north, 60)
+
+    # the far end of an arm has no signal
+    assert signals.is_green(approach(network, "rn", "n"), 30)
+
+def test_queues_discharge_only_on_green():
+    network = build_cross()
+    signals = SignalModel(network, saturation_flow=0.5)
+    signals.set_signal("c", 20, [["rn", "rs"], ["re", "rw"]])
+    north, east = approach(network, "rn", "c"), approach(network, "re", "c")
+    signals.arrive(north, 4)
+    signals.arrive(east, 4)
+
+    released = {}
+    for _ in range(4):
+        for k, count in signals.step(1.0).items():
+            released[k] = released.get(k, 0) + count
+    # four seconds of green at 0.5 per second for north, east is still red
+    assert released == {north: 2}
+    assert signals.queues[north] == 2 and signals.queues[east] == 4
+
+def test_delays_feed_road_weights():
+    network = build_cross()
+    weight = network.roads["rn"].weight
+    signals = SignalModel(network, saturation_flow=0.5)
+    signals.set_signal("c", 60, [["rn", "rs"], ["re", "rw"]])
+    signals.arrive(approach(network, "rn", "c"), 10)
+    signals.step(1.0)
+
+    # red 30 of 60 gives 30^2 / 120 = 7.5 wait, plus the north queue (10 / 0.5) spread over 4 arms
+    assert abs(signals.delays[network.compile().index_of("c")] - (7.5 + 20 / 4)) < 0.001
+
+    assert signals.apply_delays() >= 1
+    assert network.intersections["c"].delay == pytest.approx(12.5)
+    assert network.roads["rn"].weight == pytest.approx(weight + 12.5 / 2)
+    assert network.compile().weights[approach(network, "rn", "c")] == pytest.approx(weight + 12.5 / 2)
+    assert signals.apply_delays() == 0
+
+def test_spillback_in_simulation():
+    """A red light backs vehicles up until the feeding road is full."""
+    network = build_cross()
+    signals = SignalModel(network, saturation_flow=0.5)
+    # north and south are only green in the second half of a very long cycle
+    signals.set_signal("c", 2000, [["re", "rw"], ["rn", "rs"]])
+    sim = Simulation(network, speed=10.0, jam_density=0.05, signals=signals)
+    sim.add_vehicles([("n", "s")] * 5)
+
+    sim.step(30)
+    # everyone reached the stop line and is queued on the north arm
+    assert sim.road_occupancy("rn") == 5
+    assert sim.road_occupancy("rs") == 0
+    assert signals.queues[approach(network, "rn", "c")] == 5
+    assert network.intersections["c"].delay > 0
+
+    # green comes at t=1000, then they trickle through
+    sim.step(1000)
+    assert sim.arrived == 5
+
+def test_full_road_blocks_upstream():
+    network = build_cross()
+    network.roads["rs"].capacity = 1
+    signals = SignalModel(network, saturation_flow=5)
+    sim = Simulation(network, speed=10.0, signals=signals)
+    sim.add_vehicles([("n", "s")] * 4)
+
+    for _ in range(200):
+        sim.step()
+        assert sim.road_occupancy("rs") <= 1
+    assert sim.arrived == 4
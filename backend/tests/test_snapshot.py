@@ -0,0 +1,105 @@
+import pytest
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+from models.weights import BPRWeight
+from models.snapshot import save_snapshot, open_snapshot, load_snapshot
+from algos.pathfinding import a_star_shortest_path
+
+def build_network():
+    """A small network with names, congestion, traffic volumes, profiles, a closed road and unicode IDs."""
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("i1", 0, 0, "Start"))
+    network.add_intersection(Intersection("i2", 10, 0, "Right"))
+    network.add_intersection(Intersection("i3", 0, 10, "Top"))
+    network.add_intersection(Intersection("straße", 10, 10, "End"))
+    for intersection in network.intersections.values():
+        intersection.congestion = 0.25
+
+    network.add_road(Road("r1", "i1", "i2"))
+    network.add_road(Road("r2", "i1", "i3"))
+    network.add_road(Road("r3", "i2", "straße"))
+    network.add_road(Road("r4", "i3", "straße"))
+    network.update_congestion({"r2": 0.0, "r4": 0.1})
+    network.roads["r3"].volume = 40.0
+    network.roads["r3"].capacity = 50.0
+    network.roads["r4"].volume = 12.0
+    network.roads["r2"].profile_id = 0
+    network.roads["r4"].profile_id = 3
+    network.close_road("r1")
+    return network
+
+def test_open_snapshot_routes_like_the_network(tmp_path):
+    network = build_network()
+    path = str(tmp_path / "city.snap")
+    save_snapshot(network, path)
+
+    compact = open_snapshot(path)
+    assert compact.version == network.version
+    assert list(compact.node_ids) == ["i1", "i2", "i3", "straße"]
+    assert compact.index_of("straße") == 3
+    assert compact.index_of("missing") is None
+
+    for start in network.intersections:
+        for end in network.intersections:
+            expected = a_star_shortest_path(network, start, end)
+            path_found, cost = a_star_shortest_path(compact, start, end)
+            assert abs(cost - expected[1]) < 0.001
+
+    with pytest.raises(ValueError):
+        a_star_shortest_path(compact, "missing", "i1")
+
+    # the mapping is read-only
+    with pytest.raises(TypeError):
+        compact.set_road_weight("r2", 1.0)
+
+def test_load_snapshot_round_trip(tmp_path):
+    network = build_network()
+    path = str(tmp_path / "city.snap")
+    save_snapshot(network, path)
+
+    loaded = load_snapshot(path)
+    assert [i.to_dict() for i in loaded.intersections.values()] == \
+        [i.to_dict() for i in network.intersections.values()]
+    assert [r.to_dict() for r in loaded.roads.values()] == [r.to_dict() for r in network.roads.values()]
+    for node_id in network.adjacency_list:
+        assert sorted(loaded.adjacency_list[node_id]) == sorted(network.adjacency_list[node_id])
+
+    # the rebuilt network is fully mutable again
+    loaded.reopen_road("r1")
+    assert a_star_shortest_path(loaded, "i1", "i2")[0] == ["i1", "i2"]
+
+def test_loaded_network_reweights_like_the_original(tmp_path):
+    network = build_network()
+    path = str(tmp_path / "city.snap")
+    save_snapshot(network, path)
+
+    loaded = load_snapshot(path)
+    assert loaded.roads["r3"].capacity == 50.0 and loaded.roads["r4"].capacity is None
+    network.recompute_weights(BPRWeight())
+    loaded.recompute_weights(BPRWeight())
+    assert {r.id: r.weight for r in loaded.roads.values()} == {r.id: r.weight for r in network.roads.values()}
+
+def test_loaded_network_keeps_intersection_delays(tmp_path):
+    network = build_network()
+    network.update_intersection_delays({"i2": 5.0, "straße": 3.0})
+    path = str(tmp_path / "city.snap")
+    save_snapshot(network, path)
+
+    # the next congestion update recomputes weights from the delays, not the saved weights
+    loaded = load_snapshot(path)
+    assert loaded.intersections["i2"].delay == 5.0
+    network.update_congestion({"r3": 0.3})
+    loaded.update_congestion({"r3": 0.3})
+    assert loaded.roads["r3"].weight == network.roads["r3"].weight
+
+def test_empty_and_invalid_snapshots(tmp_path):
+    path = str(tmp_path / "empty.snap")
+    save_snapshot(TrafficNetwork(), path)
+    assert open_snapshot(path).node_count == 0
+    assert load_snapshot(path).intersections == {}
+
+    bogus = tmp_path / "bogus.snap"
+    bogus.write_bytes(b"definitely not a snapshot" * 20)
+    with pytest.raises(ValueError):
+        open_snapshot(str(bogus))
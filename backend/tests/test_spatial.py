@@ -0,0 +1,94 @@
+import pytest
+import math
+import random
+from models.intersection import Intersection
+from models.network import TrafficNetwork
+from models.spatial import SpatialIndex
+
+def brute_force_nearest(points, x, y, k):
+    ranked = sorted(points.items(), key=lambda item: (math.hypot(item[1][0] - x, item[1][1] - y), item[0]))
+    return [point_id for point_id, _ in ranked[:k]]
+
+def random_index(count, seed, cell_size=None):
+    rng = random.Random(seed)
+    index = SpatialIndex(cell_size)
+    points = {}
+    for i in range(count):
+        points[f"p{i}"] = (rng.uniform(-50, 50), rng.uniform(0, 20))
+        index.insert(f"p{i}", *points[f"p{i}"])
+    return index, points, rng
+
+def test_nearest_matches_brute_force():
+    index, points, rng = random_index(500, seed=1)
+    for _ in range(100):
+        x, y = rng.uniform(-80, 80), rng.uniform(-30, 50)
+        found = index.nearest(x, y, k=5)
+        assert [point_id for point_id, _ in found] == brute_force_nearest(points, x, y, 5)
+        assert found == sorted(found, key=lambda item: item[1])
+
+def test_radius_and_bbox():
+    index, points, rng = random_index(300, seed=2, cell_size=3.0)
+    for _ in range(30):
+        x, y, r = rng.uniform(-50, 50), rng.uniform(0, 20), rng.uniform(0, 15)
+        expected = {p for p, (px, py) in points.items() if math.hypot(px - x, py - y) <= r}
+        assert {p for p, _ in index.within_radius(x, y, r)} == expected
+
+        box = sorted([rng.uniform(-60, 60), rng.uniform(-60, 60)]) + sorted([rng.uniform(-5, 25), rng.uniform(-5, 25)])
+        min_x, max_x, min_y, max_y = box
+        expected = {p for p, (px, py) in points.items() if min_x <= px <= max_x and min_y <= py <= max_y}
+        assert set(index.in_bbox(min_x, min_y, max_x, max_y)) == expected
+
+def test_moves_removals_and_growth():
+    index = SpatialIndex()
+    index.insert("a", 0, 0)
+    index.insert("b", 10, 10)
+    assert index.nearest(1, 1) == [("a", math.hypot(1, 1))]
+
+    index.insert("a", 20, 20)
+    assert index.nearest(1, 1)[0][0] == "b"
+    index.remove("b")
+    index.remove("missing")
+    assert index.nearest(1, 1)[0][0] == "a"
+    assert len(index) == 1
+
+    # grows well past the size the grid was built for
+    for i in range(500):
+        index.insert(f"p{i}", i * 0.1, 0)
+    assert index.nearest(25.02, 0)[0][0] == "p250"
+
+def test_snap_many_and_limits():
+    index, points, rng = random_index(200, seed=3)
+    queries = [(rng.uniform(-50, 50), rng.uniform(0, 20)) for _ in range(20)]
+    assert index.snap_many(queries) == [brute_force_nearest(points, x, y, 1)[0] for x, y in queries]
+    assert index.snap_many([(1000, 1000)], max_distance=5) == [None]
+    assert index.nearest(1000, 1000, k=3, max_distance=5) == []
+    assert len(index.nearest(0, 10, k=1000)) == 200
+    assert SpatialIndex().nearest(0, 0) == []
+
+class CountingCells(dict):
+    """Cell buckets that count the lookups a query makes."""
+    lookups = 0
+
+    def get(self, key, default=None):
+        self.lookups += 1
+        return super().get(key, default)
+
+def test_far_away_query_does_not_walk_empty_rings():
+    index, points, _ = random_index(2000, seed=5)
+    index.nearest(0, 0)
+    cells = index._cells = CountingCells(index._cells)
+    for x, y in [(10000, 10000), (-1e6, 3), (40, -1e6)]:
+        cells.lookups = 0
+        found = index.nearest(x, y, k=3)
+        assert [point_id for point_id, _ in found] == brute_force_nearest(points, x, y, 3)
+        # never more lookups than there are occupied cells, then one pass over them
+        assert cells.lookups <= len(cells)
+
+def test_network_keeps_index_current():
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("i1", 0, 0))
+    network.add_intersection(Intersection("i2", 10, 0))
+    assert network.spatial_index.snap_many([(1, 1), (9, -1)]) == ["i1", "i2"]
+
+    network.add_intersection(Intersection("i3", 2, 0))
+    assert network.spatial_index.nearest(1.9, 0)[0][0] == "i3"
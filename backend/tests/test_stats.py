@@ -0,0 +1,128 @@
+import math
+import pytest
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+from algos.pathfinding import a_star_shortest_path
+from algos.stats import SearchStats, SearchRecord, Histogram
+from tests.conftest import build_grid
+
+def build_line(count):
+    network = TrafficNetwork()
+    for i in range(count):
+        network.add_intersection(Intersection(f"i{i}", i * 10.0, 0.0))
+    for i in range(count - 1):
+        network.add_road(Road(f"r{i}", f"i{i}", f"i{i+1}"))
+    return network
+
+def record(**changes):
+    fields = dict(algorithm="astar", found=True, cost=10.0, nodes_settled=5, nodes_popped=7, stale_pops=1,
+                  heap_peak=4, setup_seconds=0.001, search_seconds=0.002, unwind_seconds=0.0005,
+                  heuristic_ratio=0.8)
+    fields.update(changes)
+    return SearchRecord(**fields)
+
+SEARCHES = [("astar", False), ("astar", True), ("bidirectional", True)]
+
+@pytest.mark.parametrize("algorithm, compiled", SEARCHES)
+def test_stats_count_settled_nodes(algorithm, compiled):
+    network = build_line(6)
+    target = network.compile() if compiled else network
+    stats = SearchStats()
+    a_star_shortest_path(target, "i0", "i5", algorithm=algorithm, stats=stats)
+    a_star_shortest_path(target, "i2", "i2", algorithm=algorithm, stats=stats)
+    assert stats.searches == 2
+    #on a line every node up to the goal has to be settled
+    assert 5 <= stats.nodes_settled <= 6
+    assert stats.mean_nodes_settled == stats.nodes_settled / 2
+    assert stats.last.nodes_settled == 0 and stats.last.cost == 0
+
+@pytest.mark.parametrize("algorithm, compiled", SEARCHES)
+def test_search_record(algorithm, compiled):
+    network = build_grid(8, seed=8)
+    target = network.compile() if compiled else network
+    records = []
+    stats = SearchStats(on_search=records.append)
+    path, cost = a_star_shortest_path(target, "n0_0", "n7_5", algorithm=algorithm, stats=stats)
+
+    assert records == [stats.last]
+    last = stats.last
+    assert last.found and last.cost == cost
+    assert last.algorithm.startswith(algorithm)
+    assert last.nodes_popped >= last.nodes_settled + last.stale_pops
+    assert last.stale_pops >= 0
+    assert 1 <= last.heap_peak <= last.nodes_popped + 2
+    assert 0 < last.heuristic_ratio <= 1
+    assert min(last.setup_seconds, last.search_seconds, last.unwind_seconds) >= 0
+    assert stats.duration.count == 1
+
+@pytest.mark.parametrize("algorithm, compiled", SEARCHES)
+def test_stats_do_not_change_results(algorithm, compiled):
+    network = build_grid(8, seed=8)
+    target = network.compile() if compiled else network
+    for end_id in ("n7_7", "n3_6", "n0_1"):
+        plain = a_star_shortest_path(target, "n0_0", end_id, algorithm=algorithm)
+        assert a_star_shortest_path(target, "n0_0", end_id, algorithm=algorithm, stats=SearchStats()) == plain
+
+@pytest.mark.parametrize("algorithm, compiled", SEARCHES)
+def test_failed_search_is_recorded(algorithm, compiled):
+    network = build_line(4)
+    network.add_intersection(Intersection("island", 100.0, 100.0))
+    target = network.compile() if compiled else network
+    stats = SearchStats()
+    with pytest.raises(ValueError):
+        a_star_shortest_path(target, "i0", "island", algorithm=algorithm, stats=stats)
+    assert stats.failed == 1
+    assert not stats.last.found and math.isnan(stats.last.heuristic_ratio)
+    assert stats.heuristic_ratio.count == 0
+
+def test_histogram_buckets():
+    histogram = Histogram([1, 10, 100])
+    for value in (0.5, 1, 5, 50, 500):
+        histogram.observe(value)
+    #bounds are inclusive
+    assert histogram.cumulative() == [2, 3, 4, 5]
+    assert histogram.sum == 556.5 and histogram.count == 5
+
+def test_totals():
+    stats = SearchStats()
+    stats.record(record())
+    stats.record(record(algorithm="bidirectional", nodes_settled=15, heap_peak=9, heuristic_ratio=0.6))
+    stats.record(record(found=False, cost=math.inf, heuristic_ratio=math.nan))
+    assert stats.searches == 3 and stats.failed == 1
+    assert stats.by_algorithm == {"astar": 2, "bidirectional": 1}
+    assert stats.nodes_settled == 25 and stats.stale_pops == 3
+    assert stats.heap_peak == 9
+    assert stats.phase_seconds["search"] == pytest.approx(0.006)
+    assert stats.mean_heuristic_ratio == pytest.approx(0.7)
+    assert stats.to_dict()["nodes_settled_histogram"]["buckets"]["10"] == 2
+
+def test_empty_stats():
+    stats = SearchStats()
+    assert stats.mean_nodes_settled == 0.0
+    assert math.isnan(stats.mean_heuristic_ratio)
+    assert stats.to_dict()["searches"] == 0
+
+def test_prometheus_export():
+    stats = SearchStats()
+    stats.record(record(setup_seconds=0.0002, search_seconds=0.0002, unwind_seconds=0.0001))
+    stats.record(record(algorithm="bidirectional", heuristic_ratio=0.95))
+    text = stats.to_prometheus(prefix="test")
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert "# TYPE test_searches_total counter" in lines
+    assert 'test_searches_total{algorithm="astar"} 1' in lines
+    assert 'test_searches_total{algorithm="bidirectional"} 1' in lines
+    assert "# TYPE test_duration_seconds histogram" in lines
+    assert 'test_duration_seconds_bucket{le="0.0005"} 1' in lines
+    assert 'test_duration_seconds_bucket{le="+Inf"} 2' in lines
+    assert "test_duration_seconds_count 2" in lines
+    assert 'test_heuristic_ratio_bucket{le="0.9"} 1' in lines
+    unwind = [line for line in lines if line.startswith('test_phase_seconds_total{phase="unwind"}')]
+    assert float(unwind[0].split()[1]) == pytest.approx(0.0006)
+    #every sample line is "name[{labels}] value"
+    for line in lines:
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            float(value)
+            assert name.startswith("test_")
@@ -0,0 +1,101 @@
+import pytest
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+from models.profiles import CongestionProfiles
+from models.weights import BPRWeight
+from algos.pathfinding import a_star_shortest_path
+from algos.time_dependent import time_dependent_shortest_path
+from tests.conftest import build_grid
+
+def build_rush_hour_network():
+    """
+    A highway (i1 -> i2 -> i4) that jams at 8am, and a longer side road (i1 -> i3 -> i4)
+    with flat congestion.
+    """
+    network = TrafficNetwork()
+    network.add_intersection(Intersection("i1", 0, 0))
+    network.add_intersection(Intersection("i2", 100, 0))
+    network.add_intersection(Intersection("i3", 0, 100))
+    network.add_intersection(Intersection("i4", 100, 100))
+
+    profiles = CongestionProfiles()
+    highway = profiles.add_profile([0, 6 * 3600, 8 * 3600, 10 * 3600], [0.0, 0.0, 4.0, 0.0])
+    side = profiles.add_profile([0], [0.5])
+
+    for road_id, source, target, profile in [("r1", "i1", "i2", highway), ("r2", "i2", "i4", highway),
+                                             ("r3", "i1", "i3", side), ("r4", "i3", "i4", side)]:
+        road = Road(road_id, source, target)
+        road.profile_id = profile
+        network.add_road(road)
+    return network, profiles
+
+def test_route_depends_on_departure_time():
+    network, profiles = build_rush_hour_network()
+
+    path, cost = time_dependent_shortest_path(network, "i1", "i4", 3 * 3600, profiles)
+    assert path == ["i1", "i2", "i4"]
+    assert abs(cost - 200) < 0.001
+
+    path, cost = time_dependent_shortest_path(network, "i1", "i4", 8 * 3600, profiles)
+    assert path == ["i1", "i3", "i4"]
+    assert abs(cost - 300) < 0.001
+
+def test_costs_are_taken_at_arrival_time():
+    network = TrafficNetwork()
+    for node_id, x in [("i1", 0), ("i2", 100), ("i3", 200)]:
+        network.add_intersection(Intersection(node_id, x, 0))
+
+    profiles = CongestionProfiles(period=1000)
+    # congestion jumps from 0 to 1 between t=100 and t=101
+    profile = profiles.add_profile([0, 100, 101, 999], [0.0, 0.0, 1.0, 1.0])
+    for road_id, source, target in [("r1", "i1", "i2"), ("r2", "i2", "i3")]:
+        road = Road(road_id, source, target)
+        road.profile_id = profile
+        network.add_road(road)
+
+    # first road is entered at t=0, the second at t=100 when it's still free
+    _, cost = time_dependent_shortest_path(network, "i1", "i3", 0, profiles)
+    assert abs(cost - 200) < 0.001
+
+    # leaving a bit later, the second road is entered after the jump
+    _, cost = time_dependent_shortest_path(network, "i1", "i3", 10, profiles)
+    assert abs(cost - 300) < 0.001
+
+def test_roads_without_profile_match_static_search():
+    network, profiles = build_rush_hour_network()
+    for road in network.roads.values():
+        road.profile_id = None
+    assert time_dependent_shortest_path(network, "i1", "i4", 8 * 3600, profiles) == \
+        a_star_shortest_path(network, "i1", "i4")
+
+def test_constant_profiles_match_static_search():
+    network = build_grid(6, seed=5)
+    #signal delays and BPR inputs, both of which a flat profile has to price like the static weights
+    delays = {node_id: i % 4 for i, node_id in enumerate(sorted(network.intersections))}
+    network.update_intersection_delays(delays)
+    for i, road in enumerate(network.roads.values()):
+        road.volume = 10.0 * (i % 7)
+        road.capacity = 40.0 if i % 3 else None
+
+    profiles = CongestionProfiles()
+    for road in network.roads.values():
+        road.profile_id = profiles.add_profile([0], [road.congestion])
+
+    pairs = [("n0_0", "n5_5"), ("n2_4", "n4_0"), ("n5_1", "n0_3")]
+    for formula in (None, BPRWeight()):
+        if formula is not None:
+            network.recompute_weights(formula)
+        for start, end in pairs:
+            _, expected = a_star_shortest_path(network, start, end)
+            _, cost = time_dependent_shortest_path(network, start, end, 9 * 3600, profiles)
+            assert abs(cost - expected) < 0.001
+
+def test_errors():
+    network, profiles = build_rush_hour_network()
+    assert time_dependent_shortest_path(network, "i1", "i1", 0, profiles) == (["i1"], 0)
+    with pytest.raises(ValueError):
+        time_dependent_shortest_path(network, "nope", "i4", 0, profiles)
+    network.add_intersection(Intersection("island", 500, 500))
+    with pytest.raises(ValueError):
+        time_dependent_shortest_path(network, "i1", "island", 0, profiles)
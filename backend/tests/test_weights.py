@@ -0,0 +1,43 @@
+import pytest
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+from models.weights import CongestionWeight, BPRWeight
+
+def test_congestion_weight():
+    road = Road("r1", "i1", "i2")
+    road.congestion = 0.8
+    formula = CongestionWeight()
+    assert abs(formula(5, road) - 9.0) < 0.001
+    assert formula.batch([5, 10], [road, road]) == [formula(5, road), formula(10, road)]
+
+def test_bpr_weight():
+    road = Road("r1", "i1", "i2")
+    formula = BPRWeight(alpha=0.15, beta=4)
+
+    # no capacity means free flow
+    assert formula(10, road) == 10
+
+    road.capacity = 100
+    road.volume = 100
+    assert abs(formula(10, road) - 11.5) < 0.001
+
+    road.volume = 200
+    assert abs(formula(10, road) - 10 * (1 + 0.15 * 16)) < 0.001
+    assert formula.batch([10], [road]) == [formula(10, road)]
+
+def test_network_uses_its_formula():
+    network = TrafficNetwork()
+    network.weight_formula = BPRWeight()
+    network.add_intersection(Intersection("i1", 0, 0))
+    network.add_intersection(Intersection("i2", 3, 4))
+
+    road = Road("r1", "i1", "i2")
+    road.capacity = 10
+    road.volume = 10
+    network.add_road(road)
+    assert abs(road.weight - 5 * 1.15) < 0.001
+
+    bulk = Road("r2", "i1", "i2")
+    network.add_roads([bulk])
+    assert bulk.weight == 5
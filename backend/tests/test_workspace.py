@@ -0,0 +1,87 @@
+import pytest
+import random
+import threading
+from models.intersection import Intersection
+from models.road import Road
+from models.network import TrafficNetwork
+from algos.pathfinding import a_star_shortest_path, dijkstra_tree
+from algos.workspace import SearchWorkspace
+
+def random_network(count, seed, roads_per_node=2):
+    rng = random.Random(seed)
+    network = TrafficNetwork()
+    for i in range(count):
+        network.add_intersection(Intersection(f"n{i}", rng.uniform(0, 100), rng.uniform(0, 100)))
+    for i in range(1, count):
+        #a random tree keeps everything connected, extra roads add loops
+        network.add_road(Road(f"t{i}", f"n{i}", f"n{rng.randrange(i)}"))
+        for j in range(roads_per_node - 1):
+            network.add_road(Road(f"x{i}_{j}", f"n{i}", f"n{rng.randrange(count)}"))
+    return network
+
+def exact_cost(compact, start_id, end_id):
+    distances, _ = dijkstra_tree(compact, compact.index_of(start_id))
+    return distances[compact.index_of(end_id)]
+
+def test_begin_grows_and_advances_generation():
+    workspace = SearchWorkspace()
+    first = workspace.begin(10)
+    assert len(workspace.stamps[0]) == 10 and workspace.stamps[1] == []
+    second = workspace.begin(25, sides=2)
+    assert second > first + 1
+    assert len(workspace.stamps[0]) == len(workspace.stamps[1]) == len(workspace.estimates) == 25
+    #never shrinks
+    workspace.begin(5)
+    assert len(workspace.g[0]) == 25
+
+@pytest.mark.parametrize("algorithm", ["astar", "bidirectional"])
+def test_reused_workspace_gives_fresh_results(algorithm):
+    workspace = SearchWorkspace()
+    rng = random.Random(5)
+    #alternate between a big and a small network, stale entries must never leak across
+    networks = [random_network(300, 1).compile(), random_network(40, 2).compile()]
+    for _ in range(60):
+        compact = rng.choice(networks)
+        start_id, end_id = rng.choice(compact.node_ids), rng.choice(compact.node_ids)
+        expected = a_star_shortest_path(compact, start_id, end_id, algorithm=algorithm,
+                                        workspace=SearchWorkspace())
+        result = a_star_shortest_path(compact, start_id, end_id, algorithm=algorithm, workspace=workspace)
+        assert result == expected
+        assert result[1] == pytest.approx(exact_cost(compact, start_id, end_id))
+
+def test_unreachable_after_reachable_search():
+    network = random_network(30, 3)
+    network.add_intersection(Intersection("island", 500, 500))
+    compact = network.compile()
+    workspace = SearchWorkspace()
+    a_star_shortest_path(compact, "n0", "n29", workspace=workspace)
+    for algorithm in ("astar", "bidirectional"):
+        with pytest.raises(ValueError):
+            a_star_shortest_path(compact, "n0", "island", algorithm=algorithm, workspace=workspace)
+    assert a_star_shortest_path(compact, "n29", "n0", workspace=workspace)[0][-1] == "n0"
+
+def test_each_thread_gets_its_own_workspace():
+    mine = SearchWorkspace.for_thread()
+    assert SearchWorkspace.for_thread() is mine
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(SearchWorkspace.for_thread()))
+    thread.start()
+    thread.join()
+    assert seen[0] is not mine
+
+def test_concurrent_searches_agree():
+    compact = random_network(400, 4).compile()
+    rng = random.Random(6)
+    pairs = [(rng.choice(compact.node_ids), rng.choice(compact.node_ids)) for _ in range(40)]
+    expected = [a_star_shortest_path(compact, s, e) for s, e in pairs]
+    results = [None] * 4
+
+    def work(slot):
+        results[slot] = [a_star_shortest_path(compact, s, e) for s, e in pairs]
+
+    threads = [threading.Thread(target=work, args=(slot,)) for slot in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(result == expected for result in results)